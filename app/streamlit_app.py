@@ -25,9 +25,12 @@ if __name__ == "__main__":
 # Şimdi import dene
 try:
     from src.rag_pipeline import RAGPipeline
+    from src.shared_pipeline import get_shared_pipeline
     from src.data_processor import PDFProcessor
     from src.embeddings import EmbeddingManager
     from src.vector_store import VectorStore
+    from src.logging_config import configure_logging
+    configure_logging()
     IMPORTS_OK = True
 except ImportError as e:
     IMPORTS_OK = False
@@ -181,36 +184,35 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Session state başlatma
-if 'pipeline' not in st.session_state:
-    st.session_state.pipeline = None
+PDF_PATH = "Data/2024-2028-İstanbul-bölge-planı-taslak.pdf"
+
+# Oturuma özel durum yalnızca sohbet geçmişidir; pipeline tüm oturumlarca paylaşılır
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
-if 'indexed' not in st.session_state:
-    st.session_state.indexed = False
 
 
-def initialize_pipeline(use_gemini):
-    """RAG Pipeline'ı başlatır"""
+def get_pipeline(create=False):
+    """
+    Süreç genelinde paylaşılan pipeline'ı döndürür.
+    
+    Gemini, API anahtarı varsa yapılandırılır; her oturum kendi seçimini
+    sorgu sırasında `use_gemini` ile iletir.
+    """
+    return get_shared_pipeline(PDF_PATH, create=create, use_gemini=True)
+
+
+def initialize_pipeline():
+    """RAG Pipeline'ı başlatır (başka bir oturum başlattıysa hazır olanı kullanır)"""
     try:
-        with st.spinner("🚀 RAG Pipeline başlatılıyor..."):
-            pdf_path = "Data/2024-2028-İstanbul-bölge-planı-taslak.pdf"
-            
-            # PDF varlık kontrolü
-            if not os.path.exists(pdf_path):
-                st.error(f"❌ PDF bulunamadı: {pdf_path}")
-                st.info("Lütfen PDF'i Data/ klasörüne ekleyin.")
-                return False
-            
-            pipeline = RAGPipeline(pdf_path=pdf_path, use_gemini=use_gemini)
-            
-            if not st.session_state.indexed:
-                with st.spinner("📚 Belge indeksleniyor... (Bu işlem birkaç dakika sürebilir)"):
-                    pipeline.index_document()
-                    st.session_state.indexed = True
-            
-            st.session_state.pipeline = pipeline
-            return True
+        # PDF varlık kontrolü
+        if not os.path.exists(PDF_PATH):
+            st.error(f"❌ PDF bulunamadı: {PDF_PATH}")
+            st.info("Lütfen PDF'i Data/ klasörüne ekleyin.")
+            return False
+        
+        with st.spinner("🚀 RAG Pipeline başlatılıyor... (İlk indeksleme birkaç dakika sürebilir)"):
+            get_pipeline(create=True)
+        return True
     except Exception as e:
         st.error(f"❌ Pipeline başlatma hatası: {e}")
         import traceback
@@ -218,19 +220,24 @@ def initialize_pipeline(use_gemini):
         return False
 
 
-def display_message(message, is_user=False):
-    """Chat mesajını gösterir"""
+def message_html(message, is_user=False):
+    """Chat mesajının HTML karşılığını döndürür"""
     message_type = "user" if is_user else "assistant"
     icon = "🙋" if is_user else "🤖"
     
-    st.markdown(f"""
+    return f"""
     <div class="chat-message {message_type}">
         <div class="message">
             <strong>{icon} {"Siz" if is_user else "Asistan"}:</strong><br>
             {message}
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+
+def display_message(message, is_user=False):
+    """Chat mesajını gösterir"""
+    st.markdown(message_html(message, is_user), unsafe_allow_html=True)
 
 
 def main():
@@ -258,15 +265,17 @@ def main():
         
         # Pipeline başlat butonu
         if st.button("🚀 Sistemi Başlat", use_container_width=True):
-            if initialize_pipeline(use_gemini):
+            if initialize_pipeline():
                 st.success("✅ Sistem hazır!")
         
         st.markdown("---")
         
         # İstatistikler
-        if st.session_state.pipeline:
+        pipeline = get_pipeline()
+        if pipeline:
             st.markdown("### 📊 İstatistikler")
-            stats = st.session_state.pipeline.get_stats()
+            stats = pipeline.get_stats()
+            ttft = stats['time_to_first_token_p50']
             
             st.markdown(f"""
             <div class="info-card">
@@ -274,7 +283,8 @@ def main():
                 <strong>Vector DB:</strong> {stats['vector_db_size']}<br>
                 <strong>Model:</strong> {stats['embedding_model'].split('/')[-1]}<br>
                 <strong>Embedding Boyutu:</strong> {stats['embedding_dimension']}<br>
-                <strong>Gemini:</strong> {"✅ Aktif" if stats['gemini_enabled'] else "❌ Pasif"}
+                <strong>Gemini:</strong> {"✅ Aktif" if use_gemini and stats['gemini_available'] else "❌ Pasif"}<br>
+                <strong>İlk Token (p50):</strong> {f"{ttft:.2f} sn" if ttft is not None else "-"}
             </div>
             """, unsafe_allow_html=True)
         
@@ -312,6 +322,8 @@ def main():
             for message in st.session_state.chat_history:
                 display_message(message["question"], is_user=True)
                 display_message(message["answer"], is_user=False)
+                if message.get("fallback"):
+                    st.warning("⚠️ Gemini cevap üretemedi, bu cevap Local Mode ile üretildi")
         
         # Soru input alanı
         st.markdown("<br>", unsafe_allow_html=True)
@@ -339,26 +351,36 @@ def main():
         
         # Soru işleme
         if ask_button and question:
-            if not st.session_state.pipeline:
+            if not pipeline:
                 st.warning("⚠️ Lütfen önce 'Sistemi Başlat' butonuna tıklayın!")
             else:
-                with st.spinner("🤔 Düşünüyorum..."):
-                    try:
-                        result = st.session_state.pipeline.query(question, n_results=3)
-                        
-                        # Chat geçmişine ekle
-                        st.session_state.chat_history.append({
-                            "question": question,
-                            "answer": result["answer"]
-                        })
-                        
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"❌ Hata: {e}")
-                        import traceback
-                        with st.expander("🔍 Detaylı Hata"):
-                            st.code(traceback.format_exc())
+                try:
+                    with chat_container:
+                        display_message(question, is_user=True)
+                        answer_placeholder = st.empty()
+                    
+                    with st.spinner("🤔 Düşünüyorum..."):
+                        stream = pipeline.stream_query(question, n_results=3, use_gemini=use_gemini)
+                    
+                    # Cevabı geldikçe göster
+                    for _ in stream:
+                        answer_placeholder.markdown(message_html(stream.answer + " ▌"),
+                                                    unsafe_allow_html=True)
+                    
+                    # Chat geçmişine ekle
+                    st.session_state.chat_history.append({
+                        "question": question,
+                        "answer": stream.answer,
+                        "fallback": stream.fell_back
+                    })
+                    
+                    st.rerun()
+                    
+                except Exception as e:
+                    st.error(f"❌ Hata: {e}")
+                    import traceback
+                    with st.expander("🔍 Detaylı Hata"):
+                        st.code(traceback.format_exc())
     
     with col2:
         st.markdown("### 📚 Hakkında")
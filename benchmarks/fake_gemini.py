@@ -0,0 +1,155 @@
+"""
+fake_gemini.py
+Benchmark'larda Gemini API yerine kullanılan, gecikmesi ayarlanabilir yerel model
+ve aynı modeli HTTP üzerinden sunan sahte LLM sunucusu
+
+Kullanım:
+    python -m benchmarks.fake_gemini --port 8900 --failure-rate 0.2
+    RAG_LLM_URL=http://127.0.0.1:8900/generate python main.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, List, Optional
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStreamResponse:
+    """`generate_content_async(..., stream=True)` cevabı gibi parça parça döner"""
+
+    def __init__(self, parts: List[str], token_delay: float):
+        self._parts = parts
+        self._token_delay = token_delay
+
+    async def __aiter__(self) -> AsyncIterator[FakeResponse]:
+        for part in self._parts:
+            await asyncio.sleep(self._token_delay)
+            yield FakeResponse(part)
+
+
+class FakeGeminiModel:
+    """
+    `genai.GenerativeModel` ile aynı çağrıları destekleyen sahte model.
+
+    Ağ gecikmesi `first_token_delay` (ilk parçaya kadar) ve `token_delay`
+    (parça başına) ile taklit edilir; cevap, prompt'taki belge içeriğinden
+    üretilir. Böylece benchmark'lar API anahtarı ve ağ olmadan, tekrarlanabilir
+    sürelerle çalışır.
+    """
+
+    def __init__(self, first_token_delay: float = 0.2, token_delay: float = 0.005,
+                 answer_words: int = 120):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.answer_words = answer_words
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def _answer_parts(self, prompt: str) -> List[str]:
+        words = prompt.split("BELGE İÇERİĞİ:")[-1].split()[:self.answer_words]
+        return [word + " " for word in words] or ["Cevap bulunamadı."]
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        self._count_call()
+        parts = self._answer_parts(prompt)
+        time.sleep(self.first_token_delay + self.token_delay * len(parts))
+        return FakeResponse("".join(parts))
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self._count_call()
+        parts = self._answer_parts(prompt)
+        await asyncio.sleep(self.first_token_delay)
+        if stream:
+            return FakeStreamResponse(parts, self.token_delay)
+        await asyncio.sleep(self.token_delay * len(parts))
+        return FakeResponse("".join(parts))
+
+
+def start_fake_llm_server(model: Optional[FakeGeminiModel] = None, port: int = 0,
+                          host: str = "127.0.0.1", failure_rate: float = 0.0,
+                          seed: int = 0) -> ThreadingHTTPServer:
+    """
+    Sahte modeli `POST /generate` (`{"prompt": ...}` -> `{"text": ...}`)
+    yolunda sunan sunucuyu arka plan thread'inde başlatır; `HTTPBackend`
+    ile kullanılır.
+
+    İsteklerin `failure_rate` oranı rastgele 429 veya 503 ile cevaplanır;
+    böylece yeniden deneme ve yedek cevap davranışı kota ve kesinti
+    olmadan denenebilir. `port=0` boş bir port seçer (`server.server_port`).
+
+    Returns:
+        Çalışan sunucu; sahte model `server.model` ile erişilir
+    """
+    model = model or FakeGeminiModel()
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.split("?")[0] != "/generate":
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with rng_lock:
+                fail = rng.random() < failure_rate
+                status = rng.choice((429, 503))
+            if fail:
+                self.send_error(status)
+                return
+            try:
+                prompt = json.loads(body.decode("utf-8"))["prompt"]
+            except (ValueError, KeyError):
+                self.send_error(400)
+                return
+
+            payload = json.dumps({"text": model.generate_content(prompt).text}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.model = model
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Gemini yerine kullanılacak sahte LLM sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="429/503 ile cevaplanan isteklerin oranı")
+    args = parser.parse_args(argv)
+
+    server = start_fake_llm_server(FakeGeminiModel(args.first_token_delay, args.token_delay),
+                                   args.port, args.host, args.failure_rate)
+    print(f"🤖 Sahte LLM: http://{args.host}:{server.server_port}/generate")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,574 @@
+"""
+run_benchmarks.py
+İndeksleme hızı ve sorgu gecikmesi için uçtan uca, çevrimdışı benchmark
+
+Kullanım:
+    python benchmarks/run_benchmarks.py --pages 100 --queries 50
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/onceki.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Proje root'unu path'e ekle
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.fake_gemini import FakeGeminiModel, start_fake_llm_server
+from benchmarks.synthetic_pdf import QUESTIONS, write_pdf
+from src.data_processor import PDFProcessor
+from src.embeddings import EmbeddingManager
+from src.logging_config import configure_logging
+from src.ivf_vector_store import IVFVectorStore
+from src.llm_client import HTTPBackend, LLMClient, LLMError, ModelBackend
+from src.numpy_vector_store import NumpyVectorStore
+from src.onnx_embeddings import cosine_agreement
+from src.quantization import QUANTIZATION_MODES, recall_at_k
+from src.query_server import MicroBatcher
+from src.rag_pipeline import RAGPipeline
+from src.text_chunker import LANGCHAIN_SEPARATORS, TextChunker
+
+
+BENCHMARK_VERSION = 1
+
+# Karşılaştırmada gösterilen metrikler ve yönleri (True: büyük olan iyi)
+COMPARED_METRICS = [
+    (("process_pdf", "pages_per_second"), True),
+    (("chunking", "mb_per_second"), True),
+    (("embed_documents", "chunks_per_second"), True),
+    (("embedding_backends", "onnx-int8", "chunks_per_second"), True),
+    (("embedding_backends", "onnx-int8", "min_cosine"), True),
+    (("add_documents", "{backend}", "inserts_per_second"), True),
+    (("query", "{backend}", "p50_ms"), False),
+    (("query", "{backend}", "p95_ms"), False),
+    (("query", "{backend}", "p99_ms"), False),
+    (("query", "{backend}", "retrieve", "p50_ms"), False),
+    (("quantization", "int8", "recall"), True),
+    (("quantization", "int8", "search_p50_ms"), False),
+    (("ann", "exact_p50_ms"), False),
+    (("query", "{backend}", "concurrent", "batched_qps"), True),
+    (("llm", "backend_calls"), False),
+]
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Ölçüm sırasında pipeline çıktılarını bastırır"""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def latency_summary(samples: List[float]) -> Dict:
+    """Saniye cinsinden ölçümlerden milisaniye yüzdelikleri"""
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_process_pdf(pdf_path: str, pages: int, extract_workers: int, verbose: bool) -> Dict:
+    processor = PDFProcessor(num_workers=extract_workers)
+    with quiet(not verbose):
+        started_at = time.perf_counter()
+        chunks = processor.process_pdf(pdf_path)
+        elapsed = time.perf_counter() - started_at
+    return {
+        "seconds": round(elapsed, 4),
+        "pages": pages,
+        "chunks": len(chunks),
+        "extract_workers": extract_workers,
+        "pages_per_second": round(pages / elapsed, 2),
+        "_chunks": chunks
+    }
+
+
+def bench_chunking(pdf_path: str, verbose: bool) -> Dict:
+    """
+    Chunking hızı (MB/sn): varsayılan ayraçlarla ve LangChain ayraçlarıyla
+    TextChunker, kuruluysa LangChain RecursiveCharacterTextSplitter.
+    `langchain_identical` LangChain ayraçlarıyla çıktının birebir aynı
+    olup olmadığını gösterir. `import_seconds` data_processor modülünün
+    yeni bir süreçte import süresidir.
+    """
+    processor = PDFProcessor()
+    with quiet(not verbose):
+        text = processor.extract_text_from_pdf(pdf_path) or ""
+    megabytes = len(text.encode("utf-8")) / 1e6
+
+    def throughput(splitter) -> Tuple[float, List[str]]:
+        started_at = time.perf_counter()
+        chunks = splitter.split_text(text)
+        return round(megabytes / (time.perf_counter() - started_at), 2), chunks
+
+    results = {"megabytes": round(megabytes, 3)}
+    results["mb_per_second"], _ = throughput(processor.chunker)
+    results["langchain_separators_mb_per_second"], native = throughput(
+        TextChunker(processor.chunk_size, processor.chunk_overlap, LANGCHAIN_SEPARATORS))
+    try:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+    except ImportError:
+        results["langchain_mb_per_second"] = results["langchain_identical"] = None
+    else:
+        results["langchain_mb_per_second"], reference = throughput(RecursiveCharacterTextSplitter(
+            chunk_size=processor.chunk_size, chunk_overlap=processor.chunk_overlap,
+            length_function=len, separators=list(LANGCHAIN_SEPARATORS)))
+        results["langchain_identical"] = native == reference
+
+    started_at = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import src.data_processor"], cwd=project_root, check=True)
+    results["import_seconds"] = round(time.perf_counter() - started_at, 3)
+    return results
+
+
+def bench_embeddings(embedder: EmbeddingManager, chunks: List[str], verbose: bool) -> Dict:
+    with quiet(not verbose):
+        started_at = time.perf_counter()
+        embeddings = embedder.embed_documents(chunks)
+        elapsed = time.perf_counter() - started_at
+    return {
+        "seconds": round(elapsed, 4),
+        "chunks": len(chunks),
+        "model": embedder.model_name,
+        "dimension": embedder.embedding_dimension,
+        "chunks_per_second": round(len(chunks) / elapsed, 2),
+        "_embeddings": embeddings
+    }
+
+
+def bench_embedding_backends(chunks: List[str], reference: List[List[float]],
+                             args: argparse.Namespace) -> Dict:
+    """
+    ONNX Runtime backend'lerinin (float32 ve int8) hızı, sorgu gecikmesi ve
+    ana (PyTorch) embedder'ın çıktısıyla cosine uyumu. Yüklenemeyen backend
+    (ONNX modeli yok, `onnx` paketi yok) hatasıyla kaydedilir.
+    """
+    results = {}
+    for name in args.embedding_backends:
+        with quiet(not args.verbose):
+            embedder = EmbeddingManager(model_name=args.embedding_model, backend="onnx",
+                                        onnx_options={"model_dir": args.onnx_model_dir,
+                                                      "quantize": name == "onnx-int8"})
+            try:
+                embedder.warm_up(background=False)
+            except (ImportError, RuntimeError, OSError) as error:
+                results[name] = {"error": str(error)}
+                continue
+
+            started_at = time.perf_counter()
+            embeddings = embedder.embed_documents(chunks)
+            elapsed = time.perf_counter() - started_at
+            samples = []
+            for question in QUESTIONS:
+                started_at = time.perf_counter()
+                embedder.embed_query(question)
+                samples.append(time.perf_counter() - started_at)
+
+        agreement = cosine_agreement(embeddings, reference)
+        results[name] = {
+            "seconds": round(elapsed, 4),
+            "chunks_per_second": round(len(chunks) / elapsed, 2),
+            "query_p50_ms": latency_summary(samples)["p50_ms"],
+            "min_cosine": agreement["min_cosine"],
+            "mean_cosine": agreement["mean_cosine"]
+        }
+    return results
+
+
+def bench_inserts(backend: str, chunks: List[str], embeddings: List[List[float]],
+                  work_dir: str, verbose: bool) -> Dict:
+    with quiet(not verbose):
+        store = RAGPipeline._create_vector_store(backend, os.path.join(work_dir, "inserts"))
+        started_at = time.perf_counter()
+        store.add_documents(chunks, embeddings)
+        elapsed = time.perf_counter() - started_at
+    return {
+        "seconds": round(elapsed, 4),
+        "inserts": len(chunks),
+        "inserts_per_second": round(len(chunks) / elapsed, 2)
+    }
+
+
+def bench_quantization(embedder: EmbeddingManager, embeddings: List[List[float]],
+                       args: argparse.Namespace) -> Dict:
+    """Her saklama modu için bellek, arama gecikmesi ve float32 aramaya göre recall@k"""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    rng = np.random.default_rng(args.seed)
+    # Sorular ve iki rastgele chunk'ın ortalaması (belgede tam karşılığı olmayan sorgular)
+    pairs = rng.integers(0, len(vectors), size=(max(args.queries, 16), 2))
+    queries = np.vstack([np.asarray(embedder.embed_queries(QUESTIONS), dtype=np.float32),
+                         vectors[pairs].mean(axis=1)])
+
+    results = {}
+    for mode in QUANTIZATION_MODES:
+        stats = recall_at_k(vectors, queries, mode, k=args.recall_k)
+        with quiet(not args.verbose):
+            store = NumpyVectorStore(quantization=mode)
+            store.add_documents([f"chunk {i}" for i in range(len(vectors))], vectors,
+                                ids=[str(i) for i in range(len(vectors))])
+        samples = []
+        for query in queries:
+            started_at = time.perf_counter()
+            store.query(query, n_results=args.n_results)
+            samples.append(time.perf_counter() - started_at)
+        results[mode] = dict(
+            {key: value for key, value in stats.items() if key != "mode"},
+            search_p50_ms=latency_summary(samples)["p50_ms"]
+        )
+    return results
+
+
+def bench_ann(embedder: EmbeddingManager, embeddings: List[List[float]],
+              args: argparse.Namespace) -> Dict:
+    """
+    IVF indeksi için nprobe'a göre recall@k / gecikme eğrisi.
+
+    Gerçek chunk embedding'lerinin etrafına gürültü eklenerek `--ann-size`
+    boyutunda bir koleksiyon üretilir; her nprobe değerinde recall tam
+    (brute-force) aramanın ilk k sonucuna göre ölçülür.
+    """
+    rng = np.random.default_rng(args.seed)
+    base = np.asarray(embeddings, dtype=np.float32)
+    vectors = base[rng.integers(0, len(base), args.ann_size)]
+    vectors = vectors + rng.normal(scale=0.03, size=vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    questions = np.asarray(embedder.embed_queries(QUESTIONS), dtype=np.float32)
+    queries = questions[rng.integers(0, len(questions), max(args.queries, 16))]
+    queries = queries + rng.normal(scale=0.03, size=queries.shape).astype(np.float32)
+
+    ids = [str(i) for i in range(len(vectors))]
+    with quiet(not args.verbose):
+        exact_store = NumpyVectorStore()
+        exact_store.add_documents(ids, vectors, ids=ids)
+        started_at = time.perf_counter()
+        ivf_store = IVFVectorStore(min_train_size=1)
+        ivf_store.add_documents(ids, vectors, ids=ids)
+        build_seconds = time.perf_counter() - started_at
+
+    k = args.recall_k
+    exact, exact_samples = [], []
+    for query in queries:
+        started_at = time.perf_counter()
+        exact.append(set(exact_store.query(query, k)[1]))
+        exact_samples.append(time.perf_counter() - started_at)
+
+    curve = []
+    for nprobe in args.nprobe:
+        hits, samples = 0, []
+        for query, expected in zip(queries, exact):
+            started_at = time.perf_counter()
+            found = ivf_store.query_batch([query], k, nprobe=nprobe)[0][1]
+            samples.append(time.perf_counter() - started_at)
+            hits += len(expected & set(found))
+        curve.append({"nprobe": nprobe, "recall": round(hits / (k * len(queries)), 4),
+                      "p50_ms": latency_summary(samples)["p50_ms"],
+                      "p95_ms": latency_summary(samples)["p95_ms"]})
+
+    return {
+        "vectors": len(vectors),
+        "lists": ivf_store.get_stats()["ivf_lists"],
+        "k": k,
+        "build_seconds": round(build_seconds, 4),
+        "exact_p50_ms": latency_summary(exact_samples)["p50_ms"],
+        "curve": curve
+    }
+
+
+def bench_queries(backend: str, pdf_path: str, embedder: EmbeddingManager, work_dir: str,
+                  args: argparse.Namespace) -> Dict:
+    with quiet(not args.verbose):
+        pipeline = RAGPipeline(pdf_path, index_dir=os.path.join(work_dir, "pipeline"),
+                               extract_workers=args.extract_workers, answer_cache_threshold=None,
+                               vector_backend=backend, embedder=embedder)
+        started_at = time.perf_counter()
+        pipeline.index_document()
+        index_seconds = time.perf_counter() - started_at
+
+        pipeline.set_llm_backend(ModelBackend(FakeGeminiModel(first_token_delay=args.first_token_delay,
+                                                              token_delay=args.token_delay)))
+        pipeline.use_gemini = True
+
+        questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.queries)]
+        for question in questions[:args.warmup]:
+            pipeline.query(question, n_results=args.n_results)
+
+        retrieve_samples, query_samples = [], []
+        for question in questions:
+            started_at = time.perf_counter()
+            pipeline.retrieve(question, n_results=args.n_results)
+            retrieve_samples.append(time.perf_counter() - started_at)
+
+            started_at = time.perf_counter()
+            pipeline.query(question, n_results=args.n_results)
+            query_samples.append(time.perf_counter() - started_at)
+
+        concurrent = bench_concurrency(pipeline, questions, args) if args.clients else None
+
+    return dict(latency_summary(query_samples),
+                index_seconds=round(index_seconds, 4),
+                retrieve=latency_summary(retrieve_samples),
+                concurrent=concurrent)
+
+
+def bench_concurrency(pipeline: RAGPipeline, questions: List[str], args: argparse.Namespace) -> Dict:
+    """
+    `--clients` eşzamanlı istemcide soru/sn: her istemcinin `query` çağırması
+    ile MicroBatcher üzerinden gruplanmış sorgular. Cevaplar local modda
+    üretilir; fark embedding ve aramanın gruplanmasından gelir.
+    """
+    # Önbellek isabeti olmasın diye her soru farklılaştırılır
+    workload = [f"{questions[i % len(questions)]} ({i})" for i in range(args.clients * 8)]
+
+    def throughput(ask) -> float:
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            list(executor.map(ask, workload))
+        return round(len(workload) / (time.perf_counter() - started_at), 2)
+
+    direct = throughput(lambda question: pipeline.query(question, n_results=args.n_results,
+                                                        use_gemini=False))
+    batcher = MicroBatcher(pipeline, max_batch_size=args.clients, max_wait=0.005)
+    try:
+        batched = throughput(lambda question: batcher.query(question, n_results=args.n_results,
+                                                            use_gemini=False))
+        batch_size = batcher.get_stats()["batch_size_p50"]
+    finally:
+        batcher.close()
+
+    return {"clients": args.clients, "direct_qps": direct, "batched_qps": batched,
+            "batch_size_p50": batch_size}
+
+
+def bench_llm(args: argparse.Namespace) -> Dict:
+    """
+    LLM çağrı katmanı: `--clients` thread birkaç popüler soruyu aynı anda
+    sorar; sahte LLM sunucusu isteklerin bir kısmını 429/503 ile reddeder.
+    Backend'e giden çağrı sayısı birleştirmenin, yedek cevaba düşen istek
+    sayısı yeniden denemelerin etkisini gösterir.
+    """
+    server = start_fake_llm_server(FakeGeminiModel(first_token_delay=args.first_token_delay,
+                                                   token_delay=args.token_delay),
+                                   failure_rate=args.llm_failure_rate, seed=args.seed)
+    client = LLMClient(HTTPBackend(f"http://127.0.0.1:{server.server_port}/generate"),
+                       requests_per_second=args.llm_rps, base_delay=0.05, max_delay=1.0,
+                       timeout=30.0, seed=args.seed)
+    clients = max(1, args.clients)
+    prompts = [f"BELGE İÇERİĞİ: {QUESTIONS[i % 4]}" for i in range(clients * 4)]
+
+    def ask(prompt: str) -> bool:
+        try:
+            client.generate(prompt)
+            return True
+        except LLMError:
+            return False
+
+    started_at = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            answered = sum(executor.map(ask, prompts))
+    finally:
+        server.shutdown()
+    stats = client.get_stats()
+    return {
+        "requests": len(prompts),
+        "answered": answered,
+        "backend_calls": server.model.calls,
+        "coalesced": stats["coalesced"],
+        "retries": stats["retries"],
+        "seconds": round(time.perf_counter() - started_at, 3)
+    }
+
+
+def run(args: argparse.Namespace) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as work_dir:
+        pdf_path = write_pdf(os.path.join(work_dir, "plan.pdf"), pages=args.pages, seed=args.seed)
+        print(f"📄 Sentetik PDF: {args.pages} sayfa, {os.path.getsize(pdf_path):,} bayt")
+
+        process = bench_process_pdf(pdf_path, args.pages, args.extract_workers, args.verbose)
+        chunks = process.pop("_chunks")
+        print(f"📖 process_pdf: {process['pages_per_second']} sayfa/sn ({process['chunks']} chunk)")
+        chunking = bench_chunking(pdf_path, args.verbose)
+        print(f"✂️ chunking: {chunking['mb_per_second']} MB/sn | LangChain "
+              f"{chunking['langchain_mb_per_second']} MB/sn | "
+              f"aynı çıktı: {chunking['langchain_identical']} | import {chunking['import_seconds']} sn")
+
+        with quiet(not args.verbose):
+            embedder = EmbeddingManager(model_name=args.embedding_model)
+        embed = bench_embeddings(embedder, chunks, args.verbose)
+        embeddings = embed.pop("_embeddings")
+        print(f"🧠 embed_documents: {embed['chunks_per_second']} chunk/sn")
+        embedding_backends = bench_embedding_backends(chunks, embeddings, args)
+        for name, stats in embedding_backends.items():
+            if "error" in stats:
+                print(f"🧠 {name}: atlandı ({stats['error']})")
+            else:
+                print(f"🧠 {name}: {stats['chunks_per_second']} chunk/sn | sorgu p50 {stats['query_p50_ms']} ms | "
+                      f"en düşük cosine {stats['min_cosine']:.4f}")
+
+        results = {
+            "benchmark_version": BENCHMARK_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {key: value for key, value in vars(args).items()
+                       if key not in ("output", "compare", "verbose")},
+            "process_pdf": process,
+            "chunking": chunking,
+            "embed_documents": embed,
+            "embedding_backends": embedding_backends,
+            "add_documents": {},
+            "query": {},
+            "quantization": bench_quantization(embedder, embeddings, args)
+        }
+        for mode, stats in results["quantization"].items():
+            print(f"🗜️ {mode}: {stats['bytes']:,} bayt | recall@{stats['k']} {stats['recall']:.3f} | "
+                  f"arama p50 {stats['search_p50_ms']} ms")
+
+        if args.ann_size:
+            ann = results["ann"] = bench_ann(embedder, embeddings, args)
+            print(f"🧭 IVF: {ann['vectors']:,} vektör, {ann['lists']} küme, "
+                  f"kurulum {ann['build_seconds']} sn | tam arama p50 {ann['exact_p50_ms']} ms")
+            for point in ann["curve"]:
+                print(f"   nprobe {point['nprobe']:>3}: recall@{ann['k']} {point['recall']:.3f} | "
+                      f"p50 {point['p50_ms']} ms")
+
+        llm = results["llm"] = bench_llm(args)
+        print(f"🤖 LLM: {llm['requests']} istek, {llm['backend_calls']} backend çağrısı | "
+              f"{llm['coalesced']} birleştirildi, {llm['retries']} yeniden deneme | "
+              f"{llm['answered']}/{llm['requests']} cevaplandı")
+
+        for backend in args.backends:
+            backend_dir = os.path.join(work_dir, backend)
+            inserts = bench_inserts(backend, chunks, embeddings, backend_dir, args.verbose)
+            results["add_documents"][backend] = inserts
+            print(f"💾 add_documents [{backend}]: {inserts['inserts_per_second']} kayıt/sn")
+
+            query = bench_queries(backend, pdf_path, embedder, backend_dir, args)
+            results["query"][backend] = query
+            print(f"❓ query [{backend}]: p50 {query['p50_ms']} ms | p95 {query['p95_ms']} ms | "
+                  f"p99 {query['p99_ms']} ms")
+            if query["concurrent"]:
+                concurrent = query["concurrent"]
+                print(f"👥 {concurrent['clients']} istemci [{backend}]: tek tek {concurrent['direct_qps']} soru/sn | "
+                      f"gruplu {concurrent['batched_qps']} soru/sn")
+
+    return results
+
+
+def _lookup(results: Dict, path: tuple):
+    for key in path:
+        if not isinstance(results, dict) or key not in results:
+            return None
+        results = results[key]
+    return results
+
+
+def compare(current: Dict, previous: Dict):
+    """İki benchmark sonucunu metrik metrik karşılaştırır"""
+    print(f"\n📊 KARŞILAŞTIRMA: {previous.get('git_commit')} -> {current.get('git_commit')}")
+    for template, higher_is_better in COMPARED_METRICS:
+        backends = current["config"]["backends"] if "{backend}" in template else [None]
+        for backend in backends:
+            path = tuple(backend if key == "{backend}" else key for key in template)
+            new, old = _lookup(current, path), _lookup(previous, path)
+            if new is None or old is None or not old:
+                continue
+            change = (new - old) / old * 100
+            better = change >= 0 if higher_is_better else change <= 0
+            print(f"  {'✅' if better else '⚠️'} {'.'.join(path)}: {old} -> {new} ({change:+.1f}%)")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="RAG pipeline benchmark'ı (çevrimdışı)")
+    parser.add_argument("--pages", type=int, default=50, help="Sentetik PDF sayfa sayısı")
+    parser.add_argument("--queries", type=int, default=40, help="Ölçülen sorgu sayısı")
+    parser.add_argument("--warmup", type=int, default=3, help="Ölçüm dışı ısınma sorgusu")
+    parser.add_argument("--n-results", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy"],
+                        choices=["chroma", "numpy"])
+    parser.add_argument("--extract-workers", type=int, default=1)
+    parser.add_argument("--embedding-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--embedding-backends", nargs="*", default=["onnx", "onnx-int8"],
+                        choices=["onnx", "onnx-int8"],
+                        help="Ana (PyTorch) embedder'la karşılaştırılan ONNX Runtime backend'leri")
+    parser.add_argument("--onnx-model-dir", help="ONNX model klasörü (varsayılan: yerel önbellek)")
+    parser.add_argument("--first-token-delay", type=float, default=0.2,
+                        help="Sahte Gemini'nin ilk parçaya kadar gecikmesi (sn)")
+    parser.add_argument("--token-delay", type=float, default=0.005,
+                        help="Sahte Gemini'nin parça başına gecikmesi (sn)")
+    parser.add_argument("--recall-k", type=int, default=10,
+                        help="Quantization karşılaştırmasında recall@k için k")
+    parser.add_argument("--ann-size", type=int, default=50_000,
+                        help="IVF recall/gecikme eğrisi için vektör sayısı (0: atla)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64],
+                        help="IVF eğrisinde denenecek nprobe değerleri")
+    parser.add_argument("--clients", type=int, default=16,
+                        help="Eşzamanlı istemci sayısı (0: gruplama karşılaştırmasını atla)")
+    parser.add_argument("--llm-rps", type=float, default=20.0,
+                        help="LLM çağrı katmanı ölçümünde saniyedeki en fazla çağrı")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.2,
+                        help="Sahte LLM sunucusunun 429/503 döndürme oranı")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Sonuç JSON dosyası "
+                                         "(varsayılan: benchmarks/results/<commit>-<zaman>.json)")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--verbose", action="store_true", help="Pipeline çıktılarını göster")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    configure_logging(None if args.verbose else "WARNING")
+
+    print("="*80)
+    print("⏱️  RAG PIPELINE BENCHMARK")
+    print("="*80 + "\n")
+
+    results = run(args)
+
+    output = args.output or os.path.join(
+        project_root, "benchmarks", "results",
+        f"{results['git_commit'] or 'local'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Sonuçlar kaydedildi: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
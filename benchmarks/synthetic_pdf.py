@@ -0,0 +1,118 @@
+"""
+synthetic_pdf.py
+Benchmark'lar için harici kütüphane gerektirmeden sentetik Türkçe PDF üretimi
+"""
+
+import random
+from typing import List
+
+
+# Standart Helvetica fontu Türkçe harflerin glifini içerir; WinAnsi'de
+# tanımsız kodlar /Differences ile bu gliflere eşlenir
+_TURKISH_CODES = {"ğ": 0x81, "Ğ": 0x8D, "ş": 0x8F, "Ş": 0x90, "ı": 0x9D, "İ": 0xA4}
+_DIFFERENCES = "[129 /gbreve 141 /Gbreve 143 /scedilla 144 /Scedilla 157 /dotlessi 164 /Idotaccent]"
+
+SECTIONS = [
+    "EKONOMİK KALKINMA", "ULAŞIM VE LOJİSTİK", "KENTSEL DÖNÜŞÜM", "ÇEVRE VE İKLİM",
+    "SOSYAL İÇERME", "TEKNOLOJİK DÖNÜŞÜM", "AFET YÖNETİMİ", "TURİZM VE KÜLTÜR"
+]
+
+WORDS = """
+istanbul bölge planı stratejik öncelik hedef politika tedbir ulaşım altyapısı
+metro hattı raylı sistem deniz ulaşımı bisiklet yolu kentsel dönüşüm deprem
+dirençli yapı stoku yeşil alan iklim değişikliği karbon salımı yenilenebilir
+enerji sürdürülebilir büyüme istihdam girişimcilik ihracat yüksek teknoloji
+ar-ge inovasyon dijital dönüşüm yapay zeka eğitim kalitesi sağlık hizmetleri
+sosyal içerme kadın istihdamı gençler engelli bireyler göç yaşam kalitesi
+turizm kültürel miras tarihi yarımada boğaz su kaynakları atık yönetimi
+lojistik merkez liman havalimanı finans merkezi yatırım ortamı kamu kurumu
+belediye kalkınma ajansı paydaş katılım izleme değerlendirme gösterge
+""".split()
+
+QUESTIONS = [
+    "İstanbul bölge planının ana hedefleri nelerdir?",
+    "Ulaşım altyapısı için hangi projeler planlanıyor?",
+    "Kentsel dönüşüm ve deprem riskine yönelik tedbirler nelerdir?",
+    "Yeşil alan ve iklim değişikliği politikaları neler?",
+    "Yüksek teknoloji ve Ar-Ge yatırımları nasıl desteklenecek?",
+    "Sosyal içerme kapsamında hangi gruplar hedefleniyor?",
+    "Turizm ve kültürel miras için öngörülen adımlar nelerdir?",
+    "Finans merkezi ve yatırım ortamı nasıl geliştirilecek?"
+]
+
+
+def _encode(text: str) -> bytes:
+    out = bytearray()
+    for char in text:
+        code = _TURKISH_CODES.get(char)
+        out += bytes([code]) if code is not None else char.encode("cp1252", errors="replace")
+    return bytes(out).replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 14))]
+    return " ".join(words).capitalize() + "."
+
+
+def page_lines(page_number: int, lines_per_page: int, rng: random.Random) -> List[str]:
+    """Bir sayfanın satırları: bölüm başlığı, paragraflar ve sayfa numarası"""
+    lines = []
+    if page_number % 4 == 1:
+        section = SECTIONS[(page_number // 4) % len(SECTIONS)]
+        lines += [f"{page_number // 4 + 1}. {section}", ""]
+    while len(lines) < lines_per_page:
+        lines.append(_sentence(rng))
+        if rng.random() < 0.15:
+            lines.append("")
+    return lines[:lines_per_page] + [str(page_number)]
+
+
+def write_pdf(path: str, pages: int = 50, lines_per_page: int = 45, seed: int = 0) -> str:
+    """
+    Bölge planına benzeyen sentetik Türkçe metinli bir PDF yazar.
+
+    Args:
+        path: Yazılacak dosya
+        pages: Sayfa sayısı
+        lines_per_page: Sayfa başına metin satırı
+        seed: Aynı seed aynı PDF'i üretir (commit'ler arası karşılaştırma için)
+    """
+    rng = random.Random(seed)
+    font_id = 3
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        font_id: (f"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding "
+                  f"<< /Type /Encoding /BaseEncoding /WinAnsiEncoding /Differences {_DIFFERENCES} >> >>").encode()
+    }
+
+    page_ids = []
+    for page_number in range(1, pages + 1):
+        page_id, content_id = 2 + 2 * page_number, 3 + 2 * page_number
+        text = b" ".join(b"(" + _encode(line) + b") Tj T*"
+                         for line in page_lines(page_number, lines_per_page, rng))
+        content = b"BT /F1 9 Tf 16 TL 40 800 Td " + text + b" ET"
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                            f"/Resources << /Font << /F1 {font_id} 0 R >> >> "
+                            f"/Contents {content_id} 0 R >>").encode()
+        page_ids.append(page_id)
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += b"%d 0 obj\n" % object_id + objects[object_id] + b"\nendobj\n"
+
+    size = max(objects) + 1
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for object_id in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[object_id] if object_id in offsets else b"0000000000 65535 f \n"
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
@@ -3,6 +3,7 @@ main.py
 RAG Chatbot'un komut satırından çalıştırılması
 """
 
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -12,17 +13,36 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from src.rag_pipeline import RAGPipeline
+from src.corpus_pipeline import CorpusPipeline
+from src.index_snapshot import SNAPSHOT_SUFFIX
+from src.logging_config import configure_logging
+from src.metrics import start_metrics_server
+
+
+async def print_stream(stream):
+    """Cevap parçalarını geldikçe ekrana yazar"""
+    print("💬 CEVAP:")
+    async for delta in stream:
+        print(delta, end="", flush=True)
+    
+    if stream.fell_back:
+        print("\n\n⚠️ Gemini cevap üretemedi, bu cevap Local Mode ile üretildi")
+    if stream.time_to_first_token is not None:
+        print(f"\n\n⏱️ İlk token: {stream.time_to_first_token:.2f} sn | "
+              f"Toplam: {stream.total_time:.2f} sn\n")
 
 
 def main():
     """Ana fonksiyon"""
     
+    configure_logging()
+    
     print("="*80)
     print("🏛️  AKBANK RAG CHATBOT - İSTANBUL BÖLGE PLANI")
     print("="*80 + "\n")
     
-    # PDF yolu
-    pdf_path = "Data/2024-2028-İstanbul-bölge-planı-taslak.pdf"
+    # PDF yolu; klasör verilirse içindeki tüm PDF'ler (corpus modu), .ragsnap verilirse snapshot
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "Data/2024-2028-İstanbul-bölge-planı-taslak.pdf"
     
     # PDF varlık kontrolü
     if not os.path.exists(pdf_path):
@@ -41,11 +61,26 @@ def main():
     print("\n" + "="*80 + "\n")
     
     # RAG Pipeline oluştur
-    pipeline = RAGPipeline(pdf_path=pdf_path, use_gemini=use_gemini)
+    if pdf_path.endswith(SNAPSHOT_SUFFIX):
+        # Önceden oluşturulmuş snapshot: PDF okunmaz, yeniden embed edilmez
+        pipeline = RAGPipeline.from_snapshot(pdf_path, use_gemini=use_gemini)
+    elif os.path.isdir(pdf_path):
+        pipeline = CorpusPipeline(corpus_dir=pdf_path, use_gemini=use_gemini)
+    else:
+        pipeline = RAGPipeline(pdf_path=pdf_path, use_gemini=use_gemini)
+    
+    # Embedding modeli arka planda yüklenirken mevcut indeks açılır
+    pipeline.embedder.warm_up()
     
     # Belgeyi indeksle
     pipeline.index_document()
     
+    # RAG_METRICS_PORT verilirse metrikler http://127.0.0.1:<port>/metrics adresinden sunulur
+    metrics_port = os.getenv("RAG_METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(pipeline.metrics, port=int(metrics_port))
+        print(f"📈 Metrikler: http://127.0.0.1:{metrics_port}/metrics")
+    
     # İstatistikleri göster
     print("\n📊 SİSTEM İSTATİSTİKLERİ:")
     stats = pipeline.get_stats()
@@ -57,7 +92,8 @@ def main():
     print("💬 İNTERAKTİF SORU-CEVAP MODU")
     print("="*80)
     print("Çıkmak için 'quit' yazın")
-    print("Modu değiştirmek için 'mode' yazın\n")
+    print("Modu değiştirmek için 'mode' yazın")
+    print("Aşama sürelerini görmek için 'metrics' yazın\n")
     
     while True:
         try:
@@ -74,10 +110,17 @@ def main():
                 pipeline.use_gemini = not pipeline.use_gemini
                 mode_text = "Gemini API" if pipeline.use_gemini else "Local Mode"
                 print(f"🔄 Mod değiştirildi: {mode_text}\n")
+                if pipeline.use_gemini and pipeline.llm_client is None:
+                    print("⚠️ Gemini API yapılandırılmadı, cevaplar Local Mode ile üretilecek\n")
+                continue
+            
+            if question.lower() == 'metrics':
+                print(pipeline.export_metrics())
                 continue
             
-            # Soruyu işle
-            result = pipeline.query(question, n_results=3)
+            # Soruyu işle, cevabı geldikçe yazdır
+            stream = pipeline.stream_query(question, n_results=3)
+            asyncio.run(print_stream(stream))
             
         except KeyboardInterrupt:
             print("\n\n👋 Program sonlandırıldı!")
@@ -0,0 +1,107 @@
+"""
+answer_cache.py
+Yakın anlamlı sorular için embedding benzerliğine dayalı cevap önbelleği
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Daha önce cevaplanan soruların embedding'lerini cevaplarıyla birlikte
+    saklar. Yeni sorunun embedding'i kayıtlı bir soruya `similarity_threshold`
+    üzerinde benziyorsa kayıtlı cevap döndürülür.
+
+    Kayıtlar `ttl_seconds` sonra geçersiz olur; kayıt sayısı `max_entries`'i
+    aşınca en uzun süredir kullanılmayan kayıt silinir (LRU).
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, max_entries: int = 256,
+                 ttl_seconds: float = 3600):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items()
+                   if now - entry["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, embedding: List[float], namespace: Hashable = None) -> Optional[Dict]:
+        """
+        En benzer kayıtlı sorunun sonucunu döndürür, eşik aşılmazsa None.
+
+        Args:
+            embedding: Yeni sorunun embedding'i
+            namespace: Yalnızca aynı namespace ile kaydedilmiş cevaplar
+                eşleşir (örn. üretim modu ve getirilen belge sayısı)
+        """
+        query = self._normalize(embedding)
+
+        with self._lock:
+            self._expire(time.time())
+            keys = [key for key, entry in self._entries.items() if entry["namespace"] == namespace]
+
+            if keys:
+                matrix = np.stack([self._entries[key]["embedding"] for key in keys])
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+
+                if similarities[best] >= self.similarity_threshold:
+                    key = keys[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(self._entries[key]["result"], similarity=float(similarities[best]))
+
+            self.misses += 1
+            return None
+
+    def store(self, embedding: List[float], result: Dict, namespace: Hashable = None):
+        """Sorunun embedding'ini ve pipeline sonucunu önbelleğe ekler"""
+        with self._lock:
+            self._entries[self._next_key] = {
+                "embedding": self._normalize(embedding),
+                "result": dict(result),
+                "namespace": namespace,
+                "created_at": time.time()
+            }
+            self._next_key += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Tüm kayıtları siler (indeks değiştiğinde çağrılır)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """İsabet/ıska sayaçları ve doluluk bilgisi"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "similarity_threshold": self.similarity_threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
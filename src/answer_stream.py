@@ -0,0 +1,134 @@
+"""
+answer_stream.py
+Cevabı parça parça (token streaming) tüketmeyi sağlayan akış nesnesi
+"""
+
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Tüm akışların üretildiği, arka plan thread'inde çalışan event loop.
+
+    Gemini'nin async istemcisi oluşturulduğu loop'a bağlı kaldığından
+    akışlar, tüketici hangi thread'de ya da loop'ta olursa olsun hep bu
+    loop üzerinde üretilir.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="answer-stream-loop",
+                             daemon=True).start()
+    return _loop
+
+
+async def _anext(iterator: AsyncIterator[str]) -> str:
+    return await iterator.__anext__()
+
+
+class AnswerStream:
+    """
+    Bir sorunun cevabını metin parçaları (delta) halinde üreten akış.
+
+    `async for delta in stream` veya `for delta in stream` ile bir kez
+    tüketilebilir. Akış bittiğinde `answer`, `time_to_first_token` ve
+    `result()` tam cevaba ait bilgileri içerir.
+    """
+
+    def __init__(self, question: str, sources: List[str], source_documents: List[str],
+                 deltas: Callable[["AnswerStream"], AsyncIterator[str]],
+                 started_at: Optional[float] = None,
+                 on_complete: Optional[Callable[["AnswerStream"], None]] = None,
+                 cached: bool = False, source_metadata: Optional[List[Dict]] = None):
+        """
+        Args:
+            question: Soru
+            sources: Getirilen belgelerin ID'leri
+            source_documents: Getirilen belgelerin metinleri
+            deltas: Akışı alıp cevap parçalarını üreten async iterator döndüren
+                fonksiyon (üretici, örn. `fell_back` alanını güncelleyebilir)
+            started_at: Sorgunun başladığı an (time.perf_counter); ilk token
+                süresi bu andan itibaren ölçülür
+            on_complete: Akış tamamen tüketildiğinde çağrılır
+            cached: Cevap önbellekten mi geliyor
+            source_metadata: Getirilen belgelerin metadata'ları (sayfa, bölüm)
+        """
+        self.question = question
+        self.sources = sources
+        self.source_documents = source_documents
+        self.source_metadata = source_metadata if source_metadata is not None else []
+        self.cached = cached
+        self.fell_back = False
+        self.time_to_first_token = None
+        self.total_time = None
+
+        self._deltas = deltas(self)
+        self._started_at = started_at if started_at is not None else time.perf_counter()
+        self._on_complete = on_complete
+        self._parts = []
+        self._consumed = False
+
+    @property
+    def answer(self) -> str:
+        """Şu ana kadar üretilen cevap metni"""
+        return "".join(self._parts)
+
+    def _start(self):
+        if self._consumed:
+            raise RuntimeError("AnswerStream yalnızca bir kez tüketilebilir")
+        self._consumed = True
+
+    def _advance(self):
+        return asyncio.run_coroutine_threadsafe(_anext(self._deltas), _background_loop())
+
+    def _record(self, delta: str) -> str:
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self._started_at
+        self._parts.append(delta)
+        return delta
+
+    def _finish(self):
+        self.total_time = time.perf_counter() - self._started_at
+        if self._on_complete:
+            self._on_complete(self)
+
+    async def __aiter__(self):
+        self._start()
+        while True:
+            try:
+                delta = await asyncio.wrap_future(self._advance())
+            except StopAsyncIteration:
+                break
+            yield self._record(delta)
+        self._finish()
+
+    def __iter__(self):
+        self._start()
+        while True:
+            try:
+                delta = self._advance().result()
+            except StopAsyncIteration:
+                break
+            yield self._record(delta)
+        self._finish()
+
+    def result(self) -> Dict:
+        """RAGPipeline.query ile aynı biçimde sonuç sözlüğü"""
+        return {
+            "question": self.question,
+            "answer": self.answer,
+            "sources": self.sources,
+            "source_documents": self.source_documents,
+            "source_metadata": self.source_metadata,
+            "cached": self.cached,
+            "fallback": self.fell_back,
+            "time_to_first_token": self.time_to_first_token
+        }
@@ -0,0 +1,356 @@
+"""
+chunk_store.py
+Chunk metinlerini tek bir (memory-map edilen) UTF-8 tamponunda, chunk'ları
+(başlangıç, bitiş) bayt konumu çiftleri olarak tutan kompakt metin deposu
+"""
+
+import mmap
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Örtüşme kontrolü için tamponun sonundan bellekte tutulan en fazla bayt
+_TAIL_BYTES = 1 << 16
+# Mevcut tampon yeni depoya kopyalanırken tek seferde okunan bayt
+_COPY_BLOCK_BYTES = 1 << 22
+
+
+def _paths(path: str):
+    return path + ".utf8", path + ".offsets.npy"
+
+
+def _map(text_path: str):
+    with open(text_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # Boş dosya memory-map edilemez
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+
+def grow_rows(array: np.ndarray, used: int, needed: int) -> np.ndarray:
+    """
+    İlk `used` satırı koruyarak en az `needed` satırlık, yazılabilir dizi
+    döndürür. Kapasite yetmezse (en az) iki katına çıkarılır; böylece sona
+    tek tek yapılan eklemelerin toplam kopyalama maliyeti doğrusal kalır.
+    Kapasite yetiyorsa ve dizi yazılabilirse aynı dizi döndürülür.
+    """
+    if needed <= len(array) and array.flags.writeable:
+        return array
+    grown = np.empty((max(needed, 2 * len(array), 16),) + array.shape[1:], dtype=array.dtype)
+    grown[:used] = array[:used]
+    return grown
+
+
+class ChunkStore:
+    """
+    Chunk metinlerinin salt okunur deposu.
+
+    Metin bir kez, UTF-8 olarak tek tamponda tutulur; her chunk `(n, 2)`
+    int64 dizisinde bir (başlangıç, bitiş) bayt çiftidir. Ardışık
+    chunk'ların örtüşen kısmı tamponda bir kez yer alır (bkz.
+    `ChunkStoreWriter`). Diskteki depo memory-map edilerek açılır: metin
+    süreç belleğine kopyalanmaz, sayfalar işletim sisteminin önbelleğinden
+    okunur ve aynı indeksi açan süreçler arasında paylaşılır. Chunk metni
+    yalnızca istendiğinde (`store[i]`) tampondan çözülür.
+
+    `extend` yeni metinleri yerinde, tamponun (diskteki depoda `.utf8`
+    dosyasının) sonuna ekler; mevcut tampon kopyalanmaz. Konum dizisi
+    bellekte büyür ve `flush` ile diske yazılır. Silinen ve değişen
+    satırların baytları `compact` ile geri kazanılır.
+    """
+
+    def __init__(self, buffer=b"", offsets: Optional[np.ndarray] = None,
+                 path: Optional[str] = None):
+        """
+        Args:
+            buffer: UTF-8 tampon; bytes, mmap veya (snapshot içindeki bölüm
+                için) memoryview
+            offsets: `(n, 2)` int64 (başlangıç, bitiş) bayt konumları
+            path: Depo diskten açıldıysa dosya ön eki
+        """
+        self._buffer = buffer
+        self._offsets = offsets if offsets is not None else np.zeros((0, 2), dtype=np.int64)
+        # `_offsets` kapasitesi iki katına çıkarak büyür; dolu satır sayısı
+        self._count = len(self._offsets)
+        self.path = path
+        # Tamponun sonunun karşılık geldiği kaynak metin karakteri; sonraki
+        # `extend` ilk chunk'ın örtüşmesini buradan bulur (diskten açılınca bilinmez)
+        self.covered_chars: Optional[int] = None
+
+    @classmethod
+    def open(cls, path: str) -> "ChunkStore":
+        """`path.utf8` ve `path.offsets.npy` dosyalarını memory-map ederek açar"""
+        text_path, offsets_path = _paths(path)
+        return cls(_map(text_path), np.load(offsets_path, mmap_mode="r"), path)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return all(os.path.exists(p) for p in _paths(path))
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], char_starts: Optional[Iterable[Optional[int]]] = None,
+                   path: Optional[str] = None) -> "ChunkStore":
+        """Metinlerden depo oluşturur (`path` verilirse diske yazıp memory-map eder)"""
+        writer = ChunkStoreWriter(path)
+        starts = char_starts if char_starts is not None else iter(lambda: None, 0)
+        for text, char_start in zip(texts, starts):
+            writer.add(text, char_start)
+        return writer.finish()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, row: int) -> str:
+        start, end = self._offsets[row]
+        return str(self._buffer[int(start):int(end)], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self)):
+            yield self[row]
+
+    @property
+    def buffer(self):
+        return self._buffer
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self._offsets[:self._count]
+
+    def get_many(self, rows: Sequence[int]) -> List[str]:
+        return [self[row] for row in rows]
+
+    def take(self, rows: Sequence[int], char_starts: Optional[Sequence[Optional[int]]] = None,
+             path: Optional[str] = None) -> "ChunkStore":
+        """Yalnızca verilen satırları (bu sırayla) içeren yeni depo; tampon sıkıştırılır"""
+        return self.from_texts((self[row] for row in rows), char_starts, path=path)
+
+    def extend(self, texts: Sequence[str], char_starts: Optional[Sequence[Optional[int]]] = None,
+               replace: Optional[Dict[int, str]] = None) -> "ChunkStore":
+        """
+        Metinleri depoya yerinde ekler, `replace` ile verilen satırların
+        metnini değiştirir ve depoyu döndürür. Yalnızca yeni baytlar tamponun
+        sonuna yazılır; değişen satırların eski baytları `compact` ile
+        sıkıştırılana kadar tamponda kalır.
+        """
+        writer = ChunkStoreWriter(base=self)
+        starts = char_starts if char_starts is not None else [None] * len(texts)
+        for text, char_start in zip(texts, starts):
+            writer.add(text, char_start)
+        replaced = [(row, writer.add(text, None, record=False)) for row, text in (replace or {}).items()]
+
+        self._append(b"".join(writer._parts))
+        added = np.array(writer._offsets, dtype=np.int64).reshape(-1, 2)
+        self._offsets = grow_rows(self._offsets, self._count, self._count + len(added))
+        self._offsets[self._count:self._count + len(added)] = added
+        for row, span in replaced:
+            self._offsets[row] = span
+        self._count += len(added)
+        self.covered_chars = writer.covered_chars
+        return self
+
+    def _append(self, data: bytes):
+        if not data:
+            return
+        if not self.path:
+            if not isinstance(self._buffer, bytearray):
+                self._buffer = bytearray(self._buffer)
+            self._buffer += data
+            return
+        text_path = _paths(self.path)[0]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Boş depoda dosyada yarım kalmış eski bir yazımın baytları olabilir
+        with open(text_path, "ab" if len(self._buffer) else "wb") as f:
+            f.write(data)
+        self._buffer = _map(text_path)
+
+    def move_rows(self, sources: Sequence[int], targets: Sequence[int], length: int):
+        """
+        `sources` satırlarının konumlarını `targets` satırlarına taşır ve
+        depoyu ilk `length` satıra kısaltır (silinen satırların yerine sondaki
+        satırlar konur). Silinen satırların baytları `compact` ile sıkıştırılana
+        kadar tamponda kalır.
+        """
+        self._offsets = grow_rows(self._offsets, self._count, self._count)
+        self._offsets[list(targets)] = self._offsets[list(sources)]
+        self._count = length
+
+    def _live_intervals(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Satırların kullandığı bayt aralıklarının birleşimi: başlangıca göre
+        satır sırası, her (sıralı) satırın aralık numarası ve aralıkların
+        başlangıç/bitişleri. Örtüşen chunk'lar aynı aralığa düşer.
+        """
+        offsets = self.offsets
+        order = np.argsort(offsets[:, 0], kind="stable")
+        starts, ends = offsets[order, 0], offsets[order, 1]
+        opens = np.ones(len(order), dtype=bool)
+        opens[1:] = starts[1:] > np.maximum.accumulate(ends)[:-1]
+        first_rows = np.flatnonzero(opens)
+        return order, np.cumsum(opens) - 1, starts[first_rows], np.maximum.reduceat(ends, first_rows)
+
+    def dead_bytes(self) -> int:
+        """Hiçbir satırın kullanmadığı (silinen veya değişen satırlardan kalan) tampon baytları"""
+        if not len(self):
+            return len(self._buffer)
+        _, _, interval_starts, interval_ends = self._live_intervals()
+        return len(self._buffer) - int((interval_ends - interval_starts).sum())
+
+    def compact(self, max_dead_ratio: float = 0.5) -> bool:
+        """
+        Ölü baytlar tamponun `max_dead_ratio` oranını geçtiyse tamponu yalnızca
+        kullanılan aralıklarla yeniden yazar; satır sırası ve örtüşen
+        chunk'ların paylaştığı baytlar korunur. Diskteki depoda dosyalar
+        atomik olarak değiştirilir ve eski memory-map kapatılır.
+
+        Returns:
+            Depo sıkıştırıldıysa True
+        """
+        size = len(self._buffer)
+        if not size or self.dead_bytes() <= max_dead_ratio * size:
+            return False
+
+        offsets = np.array(self.offsets, dtype=np.int64).reshape(-1, 2)
+        parts: List[bytes] = []
+        if len(offsets):
+            order, interval_of, interval_starts, interval_ends = self._live_intervals()
+            lengths = interval_ends - interval_starts
+            new_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            offsets[order] += (new_starts - interval_starts)[interval_of][:, None]
+            parts = [bytes(self._buffer[int(start):int(end)])
+                     for start, end in zip(interval_starts, interval_ends)]
+            if interval_ends[-1] != size:
+                # Tamponun sonu değişti; sonraki `extend` örtüşmeyi bulamaz
+                self.covered_chars = None
+        else:
+            self.covered_chars = None
+
+        if not self.path:
+            self._buffer, self._offsets, self._count = b"".join(parts), offsets, len(offsets)
+            return True
+
+        text_path, offsets_path = _paths(self.path)
+        with open(text_path + ".tmp", "wb") as f:
+            for part in parts:
+                f.write(part)
+        np.save(offsets_path + ".tmp.npy", offsets)
+        os.replace(text_path + ".tmp", text_path)
+        os.replace(offsets_path + ".tmp.npy", offsets_path)
+        self.close()
+        self._buffer, self._offsets, self._count = _map(text_path), offsets, len(offsets)
+        return True
+
+    def flush(self):
+        """Diskteki deponun konum dosyasını atomik olarak yazar (metin `extend` ile yazılmıştır)"""
+        if not self.path:
+            return
+        text_path, offsets_path = _paths(self.path)
+        if not os.path.exists(text_path):
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            open(text_path, "wb").close()
+        np.save(offsets_path + ".tmp.npy", np.ascontiguousarray(self.offsets))
+        os.replace(offsets_path + ".tmp.npy", offsets_path)
+
+    def save(self, path: str) -> "ChunkStore":
+        """Depoyu diske yazar, memory-map edilmiş kopyasını döndürür"""
+        writer = ChunkStoreWriter(path)
+        writer.write_raw(self._buffer)
+        return writer.finish(prefix=np.array(self.offsets, dtype=np.int64).reshape(-1, 2))
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def get_stats(self) -> Dict:
+        """
+        Bellek kullanımı: `text_bytes` tampon, `offset_bytes` konum dizisi;
+        `chunk_bytes` chunk'lar ayrı ayrı UTF-8 saklansaydı gereken boyut
+        (fark örtüşmelerden kazanılan alandır).
+        """
+        offsets = self.offsets
+        lengths = offsets[:, 1] - offsets[:, 0] if len(self) else np.zeros(0)
+        return {
+            "chunks": len(self),
+            "text_bytes": len(self._buffer),
+            "offset_bytes": int(offsets.nbytes),
+            "chunk_bytes": int(lengths.sum()),
+            "memory_mapped": not isinstance(self._buffer, (bytes, bytearray))
+        }
+
+
+class ChunkStoreWriter:
+    """
+    ChunkStore'u sırayla eklenen chunk'lardan oluşturur.
+
+    `char_start` chunk'ın kaynak metindeki karakter konumudur. Bir önceki
+    chunk'la örtüşen chunk'ların yalnızca yeni kısmı tampona yazılır; örtüşen
+    kısım tamponun sonuyla birebir aynı değilse (konum bilinmiyor veya
+    tutarsız) chunk'ın tamamı yazılır. `path` verilirse tampon doğrudan
+    dosyaya yazılır, bellekte yalnızca konumlar ve son birkaç chunk kalır.
+    `base` verilirse yazılan baytlar o deponun tamponunun devamı sayılır
+    (bkz. `ChunkStore.extend`).
+    """
+
+    def __init__(self, path: Optional[str] = None, base: Optional[ChunkStore] = None):
+        self.path = path
+        self._offsets: List[tuple] = []
+        self._size = len(base.buffer) if base is not None else 0
+        self._tail = bytes(base.buffer[-_TAIL_BYTES:]) if base is not None else b""
+        # Tamponun sonunun karşılık geldiği kaynak metin karakteri
+        self.covered_chars: Optional[int] = base.covered_chars if base is not None else None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(_paths(path)[0] + ".tmp", "wb")
+        else:
+            self._parts: List[bytes] = []
+
+    def write_raw(self, data):
+        """Tampona konum kaydetmeden bayt ekler (mevcut bir deponun tamponu)"""
+        # Büyük (memory-map edilmiş) tamponlar bloklar halinde kopyalanır
+        for start in range(0, len(data), _COPY_BLOCK_BYTES):
+            block = data[start:start + _COPY_BLOCK_BYTES]
+            if self.path:
+                self._file.write(block)
+            else:
+                self._parts.append(bytes(block))
+            self._size += len(block)
+            self._tail = (self._tail + block)[-_TAIL_BYTES:]
+        self.covered_chars = None
+
+    def add(self, text: str, char_start: Optional[int] = None, record: bool = True) -> tuple:
+        """Chunk'ı ekler, (başlangıç, bitiş) bayt konumunu döndürür"""
+        overlap = 0
+        if char_start is not None and self.covered_chars is not None:
+            overlap = self.covered_chars - char_start
+        encoded = text.encode("utf-8")
+
+        shared = text[:overlap].encode("utf-8") if 0 < overlap <= len(text) else b""
+        if shared and self._tail.endswith(shared):
+            start = self._size - len(shared)
+            self.write_raw(encoded[len(shared):])
+        else:
+            start = self._size
+            self.write_raw(encoded)
+
+        self.covered_chars = char_start + len(text) if char_start is not None else None
+        span = (start, start + len(encoded))
+        if record:
+            self._offsets.append(span)
+        return span
+
+    def finish(self, prefix: Optional[np.ndarray] = None) -> ChunkStore:
+        """Depoyu tamamlar; `prefix` eklenen chunk'lardan önce gelen konumlardır"""
+        offsets = np.array(self._offsets, dtype=np.int64).reshape(-1, 2)
+        if prefix is not None:
+            offsets = np.concatenate([prefix, offsets])
+        if not self.path:
+            store = ChunkStore(b"".join(self._parts), offsets)
+        else:
+            text_path, offsets_path = _paths(self.path)
+            self._file.close()
+            np.save(offsets_path + ".tmp.npy", offsets)
+            os.replace(text_path + ".tmp", text_path)
+            os.replace(offsets_path + ".tmp.npy", offsets_path)
+            store = ChunkStore.open(self.path)
+        store.covered_chars = self.covered_chars
+        return store
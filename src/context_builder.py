@@ -0,0 +1,130 @@
+"""
+context_builder.py
+Getirilen chunk'lardan token bütçesine sığan, tekrarsız prompt bağlamı oluşturma
+"""
+
+import math
+from typing import Callable, List, Optional, Sequence
+
+# Token sayısı için kaba tahmin: ortalama karakter / token oranı
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Metnin token sayısını karakter uzunluğundan tahmin eder"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def overlap_length(left: str, right: str, max_overlap: int, min_overlap: int = 16) -> int:
+    """
+    `left`'in sonu ile `right`'ın başında ortak olan en uzun metnin uzunluğu.
+
+    `min_overlap` karakterden kısa eşleşmeler tesadüf sayılır ve 0 döner.
+    """
+    for length in range(min(max_overlap, len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+class _Span:
+    """Belgede art arda gelen chunk'lardan birleştirilmiş kesintisiz metin"""
+
+    def __init__(self, position: int, text: str, rank: int):
+        self.start = position
+        self.end = position
+        self.text = text
+        self.rank = rank
+
+
+class ContextBuilder:
+    """
+    Getirilen chunk'ları prompt bağlamına dönüştürür.
+
+    Belgede komşu olan chunk'lar, `chunk_overlap` nedeniyle tekrarlanan
+    kısımları atılarak tek bir kesintisiz metne birleştirilir; aynı metne
+    sahip chunk'lar bir kez alınır. Oluşan parçalar en iyi sıradaki
+    chunk'larına göre önceliklendirilip `max_tokens` bütçesine sığdığı kadar
+    eklenir ve belgedeki sıralarıyla bağlama yazılır.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = 1500, max_overlap: int = 200,
+                 token_counter: Callable[[str], int] = estimate_tokens,
+                 separator: str = "\n\n"):
+        """
+        Args:
+            max_tokens: Bağlamın en fazla token sayısı (None: sınırsız)
+            max_overlap: Komşu chunk'lar arasında aranacak en uzun ortak metin
+                (chunking'deki `chunk_overlap`)
+            token_counter: Metnin token sayısını döndüren fonksiyon
+            separator: Birbirinden kopuk parçalar arasına konan ayraç
+        """
+        self.max_tokens = max_tokens
+        self.max_overlap = max_overlap
+        self.token_counter = token_counter
+        self.separator = separator
+
+    def merge(self, documents: Sequence[str],
+              positions: Sequence[Optional[int]]) -> List[_Span]:
+        """
+        Chunk'ları belgedeki konumlarına göre birleştirir.
+
+        Args:
+            documents: Getirilen chunk metinleri (en alakalıdan başlayarak)
+            positions: Her chunk'ın belgedeki sırası (bilinmiyorsa None)
+        """
+        seen_texts = set()
+        located, unlocated = {}, []
+        for rank, (text, position) in enumerate(zip(documents, positions)):
+            if text in seen_texts:
+                continue
+            seen_texts.add(text)
+            if position is None:
+                unlocated.append(_Span(-1, text, rank))
+            else:
+                located[position] = _Span(position, text, rank)
+
+        spans = []
+        for position in sorted(located):
+            chunk = located[position]
+            previous = spans[-1] if spans else None
+            if previous is None or position != previous.end + 1:
+                spans.append(chunk)
+                continue
+
+            overlap = overlap_length(previous.text, chunk.text, self.max_overlap)
+            # Örtüşme bulunamasa da chunk'lar belgede art arda gelir
+            joiner = "" if overlap else "\n"
+            previous.text = previous.text + joiner + chunk.text[overlap:]
+            previous.end = position
+            previous.rank = min(previous.rank, chunk.rank)
+
+        return spans + unlocated
+
+    def build(self, documents: Sequence[str],
+              positions: Optional[Sequence[Optional[int]]] = None) -> str:
+        """Chunk'lardan bütçeye sığan bağlam metnini oluşturur"""
+        if positions is None:
+            positions = [None] * len(documents)
+        spans = self.merge(documents, positions)
+
+        if self.max_tokens is None:
+            selected = spans
+        else:
+            selected, used = [], 0
+            separator_tokens = self.token_counter(self.separator)
+            for span in sorted(spans, key=lambda item: item.rank):
+                tokens = self.token_counter(span.text) + (separator_tokens if selected else 0)
+                if used + tokens <= self.max_tokens:
+                    selected.append(span)
+                    used += tokens
+
+            if not selected and spans:
+                # En alakalı parça tek başına bütçeyi aşıyor; kırpılarak kullanılır
+                best = min(spans, key=lambda item: item.rank)
+                best.text = best.text[:self.max_tokens * CHARS_PER_TOKEN]
+                selected = [best]
+
+        # Konumu bilinen parçalar belgedeki sırayla, diğerleri alaka sırasıyla
+        selected.sort(key=lambda item: (item.start < 0, item.start if item.start >= 0 else item.rank))
+        return self.separator.join(span.text for span in selected)
@@ -0,0 +1,362 @@
+"""
+corpus_pipeline.py
+Bir klasördeki tüm PDF'leri belge başına shard'lara indeksleyen ve sorguları
+shard'lara paralel dağıtan çok belgeli RAG pipeline
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.context_builder import ContextBuilder
+from src.data_processor import document_id_for
+from src.embeddings import EmbeddingManager
+from src.lexical_index import reciprocal_rank_fusion
+from src.metadata_filter import normalize_filters
+from src.llm_client import LLMBackend
+from src.metrics import MetricsRegistry
+from src.rag_pipeline import RAGPipeline
+
+
+logger = logging.getLogger(__name__)
+
+
+# Corpus sonuçlarındaki ID'ler "<shard>#<chunk>" biçimindedir; aynı metin
+# farklı belgelerde geçebildiğinden chunk ID'si tek başına benzersiz değildir
+SHARD_SEPARATOR = "#"
+
+
+def discover_pdfs(corpus_dir: str) -> List[Tuple[str, str]]:
+    """
+    Klasördeki PDF'leri (bölge, yol) çiftleri olarak sıralı döndürür.
+
+    Bölge, PDF'in `corpus_dir` altındaki ilk seviye klasörüdür
+    (örn. `Data/istanbul/2024-2028.pdf` -> "istanbul"); kök klasördeki
+    PDF'lerin bölgesi "" olur.
+    """
+    found = []
+    for root, dirs, files in os.walk(corpus_dir):
+        dirs.sort()
+        relative = os.path.relpath(root, corpus_dir)
+        region = "" if relative == "." else relative.split(os.sep)[0]
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                found.append((region, os.path.join(root, name)))
+    return found
+
+
+def shard_id_for(corpus_dir: str, pdf_path: str) -> str:
+    """PDF'in corpus içindeki uzantısız göreli yolu (örn. "istanbul/2024-2028")"""
+    relative = os.path.splitext(os.path.relpath(pdf_path, corpus_dir))[0]
+    return relative.replace(os.sep, "/")
+
+
+class CorpusPipeline(RAGPipeline):
+    """
+    Çok belgeli RAG pipeline'ı.
+
+    Klasördeki her PDF kendi vector store'u, BM25 indeksi ve manifest'i olan
+    ayrı bir shard'dır (bir `RAGPipeline`); bir plan değiştiğinde yalnızca
+    onun shard'ı yeniden indekslenir. Sorgular filtreye uyan shard'lara
+    thread havuzunda paralel gönderilir, shard'ların sıralı sonuçları heap
+    ile birleştirilip en iyi `n_results` tanesi alınır. Embedding modeli,
+    cevap önbelleği ve Gemini bağlantısı tüm shard'lar için ortaktır;
+    `query`, `stream_query` ve `query_batch` RAGPipeline ile aynıdır.
+    """
+
+    def __init__(self, corpus_dir: str, use_gemini: bool = False,
+                 index_dir: Optional[str] = "index_store",
+                 extract_workers: Optional[int] = None,
+                 answer_cache_threshold: Optional[float] = 0.95,
+                 vector_backend: str = "chroma", hybrid_search: bool = True,
+                 context_token_budget: Optional[int] = 1500,
+                 max_workers: int = 8, metrics: Optional[MetricsRegistry] = None,
+                 vector_quantization: str = "float32",
+                 vector_store_options: Optional[Dict] = None,
+                 llm_backend: Optional[LLMBackend] = None,
+                 llm_options: Optional[Dict] = None, llm_fallback: bool = True,
+                 embedding_backend: str = "torch", embedding_options: Optional[Dict] = None):
+        """
+        Args:
+            corpus_dir: PDF'lerin bulunduğu klasör (alt klasörler bölgeleri belirtir)
+            max_workers: Sorguları shard'lara dağıtan en fazla thread sayısı
+            Diğerleri: RAGPipeline ile aynı; shard'ların tamamına uygulanır
+        """
+        self.pdf_path = corpus_dir
+        self.corpus_dir = corpus_dir
+        self.index_dir = index_dir
+        self.region = ""
+        self.vector_backend = vector_backend
+        self.hybrid_search = hybrid_search
+
+        logger.info(f"🚀 Corpus Pipeline başlatılıyor: {corpus_dir}")
+        self._init_shared_state(use_gemini, metrics, answer_cache_threshold,
+                                llm_backend, llm_options, llm_fallback)
+        self._shard_search_seconds = self.metrics.histogram(
+            "rag_shard_search_seconds", "Shard başına arama süresi", labels=("shard",))
+        self._shard_chunks = self.metrics.gauge(
+            "rag_shard_chunks", "Shard başına chunk sayısı", labels=("shard",))
+
+        pdfs = discover_pdfs(corpus_dir)
+        if not pdfs:
+            raise ValueError(f"❌ Klasörde PDF bulunamadı: {corpus_dir}")
+
+        self.embedder = EmbeddingManager(
+            cache_path=os.path.join(index_dir, "embedding_cache.sqlite") if index_dir else None,
+            backend=embedding_backend, onnx_options=embedding_options
+        )
+        self.shards: Dict[str, RAGPipeline] = {}
+        for region, pdf_path in pdfs:
+            shard_id = shard_id_for(corpus_dir, pdf_path)
+            self.shards[shard_id] = RAGPipeline(
+                pdf_path=pdf_path,
+                index_dir=os.path.join(index_dir, "shards", *shard_id.split("/")) if index_dir else None,
+                extract_workers=extract_workers,
+                answer_cache_threshold=None,
+                vector_backend=vector_backend,
+                hybrid_search=hybrid_search,
+                context_token_budget=context_token_budget,
+                embedder=self.embedder,
+                region=region,
+                metrics=self.metrics,
+                vector_quantization=vector_quantization,
+                vector_store_options=vector_store_options
+            )
+
+        first_shard = next(iter(self.shards.values()))
+        self.context_builder = ContextBuilder(max_tokens=context_token_budget,
+                                              max_overlap=first_shard.pdf_processor.chunk_overlap)
+        # Shard -> bağlam oluştururken kullanılan global chunk konumu başlangıcı
+        self._position_offsets: Dict[str, int] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(self.shards))),
+                                            thread_name_prefix="shard-search")
+        logger.info(f"✅ Corpus Pipeline hazır ({len(self.shards)} shard)")
+
+    @classmethod
+    def from_snapshot(cls, snapshot_path: str, *args, **kwargs):
+        raise ValueError("❌ Corpus snapshot'tan açılamaz; shard'lar RAGPipeline.from_snapshot ile ayrı ayrı açılabilir")
+
+    def save_snapshot(self, path: str, quantization: Optional[str] = None) -> Dict:
+        raise ValueError("❌ Corpus tek snapshot'a yazılamaz; shard'ların save_snapshot'ı ayrı ayrı kullanılabilir")
+
+    @property
+    def chunks(self) -> None:
+        """Corpus'un tek bir chunk deposu yoktur; metinler shard'ların `chunks`'ındadır"""
+        return None
+
+    def is_index_current(self, expected: Optional[Dict] = None) -> bool:
+        """Tüm shard'ların indeksi güncel mi?"""
+        return all(shard.is_index_current() for shard in self.shards.values())
+
+    def index_document(self, force: bool = False, streaming: bool = False,
+                       window_size: int = 64, queue_depth: int = 4) -> bool:
+        """
+        Tüm shard'ları indeksler; güncel olan shard'lar atlanır.
+
+        Returns:
+            En az bir shard güncellendiyse True
+        """
+        with self._index_lock:
+            started_at = time.perf_counter()
+            updated = [
+                shard_id for shard_id, shard in self.shards.items()
+                if shard.index_document(force, streaming, window_size, queue_depth)
+            ]
+
+            offset = 0
+            for shard_id, shard in self.shards.items():
+                self._position_offsets[shard_id] = offset
+                # Farklı belgelerin chunk'ları bağlamda komşu sayılmasın
+                offset += shard.chunk_count + 1
+            self.chunk_count = sum(shard.chunk_count for shard in self.shards.values())
+
+            if updated and self.answer_cache:
+                self.answer_cache.clear()
+
+            # Shard'lar aynı metrik kaydını paylaşır; toplam değerler en son yazılır
+            if updated:
+                self._index_duration.set(time.perf_counter() - started_at)
+            self._update_index_gauges()
+            logger.info(f"📚 {len(updated)}/{len(self.shards)} shard güncellendi "
+                        f"({self.chunk_count} chunk)")
+            return bool(updated)
+
+    def _update_index_gauges(self):
+        for shard_id, shard in self.shards.items():
+            self._shard_chunks.set(shard.chunk_count, shard=shard_id)
+        self._index_chunks.set(self.chunk_count)
+        self._lexical_postings.set(sum(shard.lexical_index.get_stats()["postings"]
+                                       for shard in self.shards.values()))
+
+    def select_shards(self, filters: Optional[Dict] = None) -> List[str]:
+        """Belge ve bölge filtrelerine uyan shard'ların ID'leri"""
+        filters = normalize_filters(filters) or {}
+        return [
+            shard_id for shard_id, shard in self.shards.items()
+            if ("document_id" not in filters or document_id_for(shard.pdf_path) in filters["document_id"])
+            and ("region" not in filters or shard.region in filters["region"])
+        ]
+
+    def _search_shard(self, shard_id: str, method: str, queries: List[str], n_results: int,
+                      query_embeddings: List[List[float]], filters: Optional[Dict],
+                      nprobe: Optional[int] = None) -> List:
+        with self._shard_search_seconds.time(shard=shard_id):
+            return getattr(self.shards[shard_id], method)(queries, n_results, query_embeddings,
+                                                          filters, nprobe)
+
+    def retrieve_batch(self, queries: List[str], n_results: int = 5,
+                       query_embeddings: Optional[List[List[float]]] = None,
+                       filters: Optional[Dict] = None,
+                       nprobe: Optional[int] = None) -> List[Dict]:
+        """
+        Sorguları seçilen shard'lara paralel gönderir ve sonuçları birleştirir.
+
+        Sorgular bir kez embed edilir. Hibrit aramada her shard füzyon
+        öncesi aday listelerini döndürür ve RRF tüm shard'ların genel
+        sıralamaları üzerinde bir kez uygulanır; shard içi RRF skorları
+        shard'lar arasında karşılaştırılamaz. Vektör aramasında shard
+        sonuçları mesafeye göre birleştirilir. Sonuçlardaki ID'ler
+        "<shard>#<chunk>" biçimindedir.
+        """
+        if not queries:
+            return []
+        if query_embeddings is None:
+            query_embeddings = self.embedder.embed_queries(queries)
+
+        shard_ids = self.select_shards(filters)
+        method = "retrieve_candidates" if self.hybrid_search else "retrieve_batch"
+        futures = [
+            self._executor.submit(self._search_shard, shard_id, method, queries, n_results,
+                                  query_embeddings, filters, nprobe)
+            for shard_id in shard_ids
+        ]
+        shard_results = [future.result() for future in futures]
+
+        merge = self._fuse_shards if self.hybrid_search else self._merge
+        return [
+            merge(shard_ids, [results[i] for results in shard_results], n_results)
+            for i in range(len(queries))
+        ]
+
+    @staticmethod
+    def _ranked(shard_index: int, result: Dict) -> Iterator[Tuple[float, int, int]]:
+        for position, distance in enumerate(result["distances"]):
+            yield distance, shard_index, position
+
+    def _merge(self, shard_ids: List[str], results: List[Dict], n_results: int) -> Dict:
+        """Shard'ların mesafeye göre sıralı sonuçlarını heap ile birleştirip ilk `n_results`'ı alır"""
+        merged = itertools.islice(
+            heapq.merge(*(self._ranked(i, result) for i, result in enumerate(results))),
+            n_results
+        )
+
+        fused = {"documents": [], "ids": [], "distances": [], "metadatas": []}
+        for _, shard_index, position in merged:
+            result = results[shard_index]
+            fused["documents"].append(result["documents"][position])
+            fused["ids"].append(f"{shard_ids[shard_index]}{SHARD_SEPARATOR}{result['ids'][position]}")
+            fused["distances"].append(result["distances"][position])
+            fused["metadatas"].append(result["metadatas"][position])
+        return fused
+
+    def _fuse_shards(self, shard_ids: List[str], candidates: List[Tuple], n_results: int) -> Dict:
+        """
+        Shard'ların vektör adaylarını mesafeye, BM25 adaylarını skora göre tek
+        sıralamada toplar ve iki genel sıralamayı RRF ile birleştirir.
+
+        BM25 skorları shard'ın kendi IDF istatistikleriyle hesaplandığından
+        shard'lar arasında yalnızca yaklaşık olarak karşılaştırılabilir.
+        """
+        texts, distances = {}, {}
+        dense_ranked, lexical_ranked = [], []
+        for shard_id, (dense, lexical) in zip(shard_ids, candidates):
+            for document, chunk_id, distance in zip(*dense):
+                qualified_id = f"{shard_id}{SHARD_SEPARATOR}{chunk_id}"
+                texts[qualified_id] = document
+                distances[qualified_id] = distance
+                dense_ranked.append((distance, qualified_id))
+            lexical_ranked.extend((-score, f"{shard_id}{SHARD_SEPARATOR}{chunk_id}")
+                                  for chunk_id, score in zip(*lexical))
+        dense_ranked.sort()
+        lexical_ranked.sort()
+
+        fused = reciprocal_rank_fusion([[qualified_id for _, qualified_id in dense_ranked],
+                                        [qualified_id for _, qualified_id in lexical_ranked]])[:n_results]
+        ids = [qualified_id for qualified_id, _ in fused]
+
+        # Yalnızca BM25 ile bulunanların metni shard'ın vector store'undan okunur
+        missing: Dict[str, List[str]] = {}
+        for qualified_id in ids:
+            if qualified_id not in texts:
+                shard_id, _, chunk_id = qualified_id.rpartition(SHARD_SEPARATOR)
+                missing.setdefault(shard_id, []).append(chunk_id)
+        for shard_id, chunk_ids in missing.items():
+            documents = self.shards[shard_id].vector_store.get_by_ids(chunk_ids)
+            texts.update((f"{shard_id}{SHARD_SEPARATOR}{chunk_id}", document)
+                         for chunk_id, document in zip(chunk_ids, documents))
+
+        metadatas = []
+        for qualified_id in ids:
+            shard_id, _, chunk_id = qualified_id.rpartition(SHARD_SEPARATOR)
+            metadatas.append(self.shards[shard_id]._chunk_metadata.get(chunk_id, {}))
+        return {
+            "documents": [texts[qualified_id] for qualified_id in ids],
+            "ids": ids,
+            # Yalnızca BM25 ile bulunan belgelerin vektör mesafesi bilinmiyor
+            "distances": [distances.get(qualified_id) for qualified_id in ids],
+            "metadatas": metadatas,
+            "scores": [score for _, score in fused]
+        }
+
+    def build_context(self, retrieval: Dict) -> str:
+        """Getirilen belgelerden bağlamı oluşturur; yalnızca aynı belgedeki komşu chunk'lar birleşir"""
+        positions = []
+        for qualified_id in retrieval["ids"]:
+            shard_id, _, chunk_id = qualified_id.rpartition(SHARD_SEPARATOR)
+            position = self.shards[shard_id]._chunk_positions.get(chunk_id)
+            positions.append(None if position is None
+                             else self._position_offsets.get(shard_id, 0) + position)
+        return self.context_builder.build(retrieval["documents"], positions)
+
+    def get_stats(self) -> Dict:
+        """Pipeline ve shard bazında istatistikler"""
+        shards = {}
+        for shard_id, shard in self.shards.items():
+            shards[shard_id] = {
+                "pdf_path": shard.pdf_path,
+                "region": shard.region,
+                "total_chunks": shard.chunk_count,
+                "vector_db_size": shard.vector_store.count(),
+                "vector_bytes": shard.vector_store.get_stats().get("matrix_bytes"),
+                "chunk_text_bytes": shard.chunks.get_stats()["text_bytes"] if shard.chunks is not None else 0,
+                "searches": self._shard_search_seconds.count(shard=shard_id),
+                "search_latency_p50": self._shard_search_seconds.quantile(0.5, shard=shard_id)
+            }
+
+        return {
+            "pdf_path": self.corpus_dir,
+            "total_chunks": self.chunk_count,
+            "vector_db_size": sum(stats["vector_db_size"] for stats in shards.values()),
+            "index_dir": self.index_dir,
+            "vector_backend": self.vector_backend,
+            "vector_bytes": sum(stats["vector_bytes"] or 0 for stats in shards.values()),
+            "chunk_text_bytes": sum(stats["chunk_text_bytes"] for stats in shards.values()),
+            "embedding_model": self.embedder.model_name,
+            "embedding_dimension": self.embedder.embedding_dimension,
+            "embedding_cache": self.embedder.get_cache_stats(),
+            "answer_cache": self.answer_cache.get_stats() if self.answer_cache else None,
+            "context_token_budget": self.context_builder.max_tokens,
+            "gemini_enabled": self.use_gemini,
+            "gemini_available": self.llm_client is not None,
+            "llm": self.llm_client.get_stats() if self.llm_client else None,
+            "time_to_first_token_last": self._ttft_samples[-1] if self._ttft_samples else None,
+            "time_to_first_token_p50": statistics.median(self._ttft_samples) if self._ttft_samples else None,
+            "query_latency_p95": self._stage_seconds.quantile(0.95, stage="total"),
+            "shard_count": len(self.shards),
+            "shards": shards
+        }
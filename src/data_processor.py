@@ -3,47 +3,193 @@ data_processor.py
 PDF belgelerini okuma ve metin parçalama (chunking) işlemleri
 """
 
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import logging
+import os
+import re
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.text_chunker import DEFAULT_SEPARATORS, TextChunker
+
+
+logger = logging.getLogger(__name__)
+
+# Her işçiye düşen sayfa sayısı bunun altındaysa süreç havuzu kurmaya değmez
+MIN_PAGES_PER_WORKER = 8
+
+# Sayfanın başında veya sonunda tek başına duran sayfa numarası satırı
+_PAGE_NUMBER_PATTERN = re.compile(r"^\s*\d{1,4}\s*\n|\n\s*\d{1,4}\s*$")
+# "2.1 Ekonomik Yapı" gibi numaralı başlıklar
+_NUMBERED_HEADING_PATTERN = re.compile(r"^\d+(?:\.\d+)*\.?\s+[A-ZÇĞİÖŞÜ]")
+MAX_HEADING_LENGTH = 80
+
+
+def clean_page_text(text: str) -> str:
+    """Sayfa metninden sayfa numarası satırlarını atar"""
+    return _PAGE_NUMBER_PATTERN.sub("", text.strip())
+
+
+def is_heading(line: str) -> bool:
+    """Satır bir bölüm başlığına benziyor mu? (numaralı veya tamamı büyük harf)"""
+    line = line.strip()
+    if not line or len(line) > MAX_HEADING_LENGTH or line[-1] in ".,;:":
+        return False
+    if _NUMBERED_HEADING_PATTERN.match(line):
+        return True
+    letters = [char for char in line if char.isalpha()]
+    return len(letters) >= 3 and all(char.isupper() for char in letters)
+
+
+def open_pdf(pdf_path: str):
+    """PDF okuyucusu; PyPDF2 yalnızca bir PDF açılacağı zaman import edilir"""
+    from PyPDF2 import PdfReader
+    return PdfReader(pdf_path)
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """[start, end) aralığındaki sayfaların metnini çıkarır (işçi süreçte çalışır)"""
+    reader = open_pdf(pdf_path)
+    return [clean_page_text(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def document_id_for(pdf_path: str) -> str:
+    """PDF yolundan belge ID'si üretir (uzantısız dosya adı)"""
+    return os.path.splitext(os.path.basename(pdf_path))[0]
+
+
+class _PageMap:
+    """
+    Birleştirilmiş metindeki karakter konumlarını sayfa numarasına ve
+    o konumda geçerli bölüm başlığına eşler.
+    """
+    
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        self.length = 0
+        self._page_offsets, self._page_numbers = [], []
+        self._heading_offsets, self._headings = [], []
+    
+    def add_page(self, page_number: int, text: str) -> str:
+        """Sayfayı metnin sonuna ekler, eklenen metni döndürür"""
+        self._page_offsets.append(self.length)
+        self._page_numbers.append(page_number)
+        
+        offset = self.length
+        for line in text.split("\n"):
+            if is_heading(line):
+                self._heading_offsets.append(offset)
+                self._headings.append(line.strip())
+            offset += len(line) + 1
+        
+        appended = text + "\n"
+        self.length += len(appended)
+        return appended
+    
+    def _page_at(self, offset: int) -> int:
+        return self._page_numbers[max(bisect_right(self._page_offsets, offset) - 1, 0)]
+    
+    def locate(self, start: int, end: int) -> Dict:
+        """[start, end) aralığındaki chunk'ın metadata'sı"""
+        heading = bisect_right(self._heading_offsets, start) - 1
+        return {
+            "document_id": self.document_id,
+            "page_start": self._page_at(start),
+            "page_end": self._page_at(max(end - 1, start)),
+            # Birleştirilmiş metindeki karakter konumu; ardışık chunk'ların
+            # örtüşmesi ChunkStore'da bu konumlardan bulunur
+            "char_start": start,
+            "char_end": end,
+            # ChromaDB metadata'sı None kabul etmez
+            "section": self._headings[heading] if heading >= 0 else ""
+        }
 
 
 class PDFProcessor:
     """PDF belgelerini işleyen sınıf"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 num_workers: Optional[int] = 1,
+                 separators: Sequence[str] = DEFAULT_SEPARATORS):
+        """
+        Args:
+            chunk_size: Chunk başına en fazla karakter
+            chunk_overlap: Ardışık chunk'lar arası örtüşme
+            num_workers: Sayfa çıkarımı için süreç sayısı (None: CPU sayısı, 1: seri)
+            separators: Chunk sınırı olarak öncelik sırasıyla denenen ayraçlar
+                (bkz. `TextChunker`; `LANGCHAIN_SEPARATORS` eski bölücüyle
+                aynı chunk'ları üretir)
+        """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.chunker = TextChunker(chunk_size, chunk_overlap, separators)
+    
+    @property
+    def separators(self) -> Tuple[str, ...]:
+        return self.chunker.separators
+    
+    def _page_ranges(self, total_pages: int, num_workers: int) -> List[Tuple[int, int]]:
+        # Yük dengesi için işçi başına iki aralık; her aralık PDF'i bir kez açar
+        n_ranges = min(total_pages, num_workers * 2)
+        step, remainder = divmod(total_pages, n_ranges)
+        ranges, start = [], 0
+        for i in range(n_ranges):
+            end = start + step + (1 if i < remainder else 0)
+            ranges.append((start, end))
+            start = end
+        return ranges
+    
+    def extract_pages(self, pdf_path: str, num_workers: Optional[int] = None) -> List[str]:
+        """
+        PDF'in sayfa metinlerini sırasıyla döndürür (boş sayfalar için "").
+        Sayfa başı/sonundaki sayfa numarası satırları atılır.
+        
+        Sayfa aralıkları süreç havuzundaki işçilere dağıtılır; sonuçlar
+        sayfa sırası korunarak birleştirilir.
+        """
+        num_workers = num_workers or self.num_workers
+        reader = open_pdf(pdf_path)
+        total_pages = len(reader.pages)
+        
+        logger.info(f"📖 PDF okunuyor: {pdf_path} ({total_pages} sayfa)")
+        
+        num_workers = min(num_workers, total_pages // MIN_PAGES_PER_WORKER)
+        if num_workers <= 1:
+            return [clean_page_text(page.extract_text() or "")
+                    for page in tqdm(reader.pages, desc="Sayfalar işleniyor")]
         
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        logger.info(f"⚙️ {num_workers} süreç ile paralel okuma")
+        ranges = self._page_ranges(total_pages, num_workers)
+        pages = []
+        
+        with ProcessPoolExecutor(max_workers=num_workers) as executor, \
+                tqdm(total=total_pages, desc="Sayfalar işleniyor") as progress:
+            results = executor.map(
+                _extract_page_range,
+                [pdf_path] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges]
+            )
+            for page_texts in results:
+                pages.extend(page_texts)
+                progress.update(len(page_texts))
+        
+        return pages
     
     def extract_text_from_pdf(self, pdf_path: str) -> Optional[str]:
         """PDF dosyasından metin çıkarır"""
         try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            
-            print(f"📖 PDF okunuyor: {pdf_path}")
-            print(f"📄 Toplam sayfa sayısı: {len(reader.pages)}")
+            pages = self.extract_pages(pdf_path)
+            text = "".join(page_text + "\n" for page_text in pages if page_text)
             
-            for i, page in enumerate(tqdm(reader.pages, desc="Sayfalar işleniyor")):
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            
-            print(f"✅ PDF başarıyla okundu!")
-            print(f"📊 Toplam karakter: {len(text):,}")
+            logger.info(f"✅ PDF okundu: {len(text):,} karakter")
             
             return text
             
         except Exception as e:
-            print(f"❌ PDF okuma hatası: {e}")
+            logger.error(f"❌ PDF okuma hatası: {e}")
             return None
     
     def split_text(self, text: str) -> List[str]:
@@ -51,13 +197,66 @@ class PDFProcessor:
         if not text:
             return []
         
-        chunks = self.text_splitter.split_text(text)
+        chunks = self.chunker.split_text(text)
         
-        print(f"✂️ Metin bölümlendi!")
-        print(f"📊 Toplam chunk sayısı: {len(chunks)}")
+        logger.info(f"✂️ Metin {len(chunks)} chunk'a bölündü")
         
         return chunks
     
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        """PDF sayfalarının metnini tek tek üretir (tüm belge bellekte tutulmaz)"""
+        reader = open_pdf(pdf_path)
+        
+        logger.info(f"📖 PDF okunuyor: {pdf_path} ({len(reader.pages)} sayfa)")
+        
+        for page in tqdm(reader.pages, desc="Sayfalar işleniyor"):
+            yield clean_page_text(page.extract_text() or "")
+    
+    def iter_chunks(self, pages: Iterable[str], document_id: str = "") -> Iterator[Tuple[str, Dict]]:
+        """
+        Sayfa akışını (chunk, metadata) akışına çevirir.
+        
+        Sayfalar birleştirilmiş metin üzerinde `TextChunker.iter_spans` ile
+        bölünür: bir chunk ancak sonraki sayfalar onu değiştiremeyecekse
+        yayınlanır ve bellekte yalnızca henüz kesinleşmemiş birkaç chunk'lık
+        metin kalır. Chunk'lar ve metadata'ları `split_pages` ile birebir
+        aynıdır; akışlı ve toplu indeksleme aynı chunk ID'lerini üretir.
+        """
+        page_map = _PageMap(document_id)
+        texts = (page_map.add_page(page_number, page_text)
+                 for page_number, page_text in enumerate(pages, start=1) if page_text)
+        for start, end, chunk in self.chunker.iter_spans(texts):
+            yield chunk, page_map.locate(start, end)
+    
+    def split_pages(self, pages: List[str], document_id: str = "") -> Tuple[List[str], List[Dict]]:
+        """
+        Sayfa metinlerini chunk'lara böler ve her chunk'ın metadata'sını döndürür.
+        
+        Metadata: `document_id`, chunk'ın başladığı ve bittiği sayfa
+        (`page_start`, `page_end`, 1'den başlar) ve chunk'ın başında geçerli
+        olan bölüm başlığı (`section`).
+        """
+        page_map = _PageMap(document_id)
+        text = "".join(page_map.add_page(page_number, page_text)
+                       for page_number, page_text in enumerate(pages, start=1) if page_text)
+        
+        spans = self.chunker.split_offsets(text)
+        logger.info(f"✂️ Metin {len(spans)} chunk'a bölündü")
+        return ([text[start:end] for start, end in spans],
+                [page_map.locate(start, end) for start, end in spans])
+    
+    def process_pdf_with_metadata(self, pdf_path: str,
+                                  document_id: Optional[str] = None) -> Tuple[List[str], List[Dict]]:
+        """PDF'i okur, chunk'lara böler ve chunk metadata'larıyla döndürür"""
+        try:
+            pages = self.extract_pages(pdf_path)
+        except Exception as e:
+            logger.error(f"❌ PDF okuma hatası: {e}")
+            return [], []
+        
+        logger.info(f"✅ PDF okundu: {len(pages)} sayfa")
+        return self.split_pages(pages, document_id or document_id_for(pdf_path))
+    
     def process_pdf(self, pdf_path: str) -> List[str]:
         """PDF'i okur ve chunk'lara böler"""
         text = self.extract_text_from_pdf(pdf_path)
@@ -0,0 +1,193 @@
+"""
+embedding_cache.py
+Model adı ve metin hash'i ile anahtarlanan kalıcı (SQLite) embedding önbelleği
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Embedding'leri (model adı, normalize edilmiş metin hash'i) anahtarıyla
+    diskte saklayan önbellek.
+
+    Kayıt sayısı `max_entries`'i aşınca en uzun süredir kullanılmayan
+    kayıtlar silinir (LRU). Vektörler float32 olarak saklanır.
+
+    Okumalar diske yazmaz: isabetlerin kullanım zamanı bellekte biriktirilir
+    ve `put_many` ile ya da birikim `_TOUCH_FLUSH_SIZE` kayda veya
+    `_TOUCH_FLUSH_SECONDS` süreye ulaşınca tek işlemde yazılır. Süreç
+    beklenmedik şekilde biterse yalnızca bu zamanlar (LRU sırası) kaybolur.
+    """
+
+    # SQLite'ın tek sorguda kabul ettiği parametre sayısı sınırlı
+    _LOOKUP_BATCH = 500
+    # Biriken kullanım zamanlarının diske yazılma eşikleri
+    _TOUCH_FLUSH_SIZE = 1000
+    _TOUCH_FLUSH_SECONDS = 30.0
+
+    def __init__(self, path: str, max_entries: int = 100_000):
+        """
+        Args:
+            path: SQLite dosyasının yolu
+            max_entries: Önbellekte tutulacak en fazla embedding sayısı
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Anahtar -> henüz yazılmamış son kullanım zamanı
+        self._touched: Dict[str, int] = {}
+        self._touched_at = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL ile NORMAL: commit'ler fsync beklemez, veritabanı yine tutarlı kalır
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+        # Kayıt sayısı açılışta bir kez sayılır, sonra yazımlarla güncellenir
+        self._entries = self._count()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Unicode (NFC) ve boşluk farklılıklarını giderir"""
+        return unicodedata.normalize("NFC", " ".join(text.split()))
+
+    @classmethod
+    def make_key(cls, model_name: str, text: str) -> str:
+        payload = f"{model_name}\x00{cls.normalize(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Metinlerin embedding'lerini döndürür; önbellekte olmayanlar için None"""
+        keys = [self.make_key(model_name, text) for text in texts]
+        found = {}
+
+        with self._lock:
+            for i in range(0, len(keys), self._LOOKUP_BATCH):
+                batch = keys[i:i + self._LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time_ns()
+                self._touched.update((key, now) for key in found)
+                if (len(self._touched) >= self._TOUCH_FLUSH_SIZE
+                        or time.monotonic() - self._touched_at >= self._TOUCH_FLUSH_SECONDS):
+                    self._flush_touched()
+                    self._conn.commit()
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return [
+            np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None
+            for key in keys
+        ]
+
+    def put_many(self, model_name: str, texts: List[str], vectors: List[List[float]]):
+        """Embedding'leri önbelleğe yazar, gerekirse eski kayıtları siler"""
+        now = time.time_ns()
+        rows = {
+            key: (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in ((self.make_key(model_name, text), vector)
+                                for text, vector in zip(texts, vectors))
+        }
+
+        with self._lock:
+            existing = self._existing(list(rows))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows.values()
+            )
+            self._entries += len(rows) - existing
+            for key in rows:
+                self._touched.pop(key, None)
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def flush(self):
+        """Biriken kullanım zamanlarını diske yazar"""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched = {}
+        self._touched_at = time.monotonic()
+
+    def _existing(self, keys: List[str]) -> int:
+        """Verilen anahtarlardan önbellekte bulunanların sayısı"""
+        existing = 0
+        for i in range(0, len(keys), self._LOOKUP_BATCH):
+            batch = keys[i:i + self._LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            existing += self._conn.execute(
+                f"SELECT COUNT(*) FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchone()[0]
+        return existing
+
+    def _evict(self):
+        excess = self._entries - self.max_entries
+        if excess > 0:
+            deleted = self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (excess,)
+            ).rowcount
+            self._entries -= deleted
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        """Önbelleği boşaltır ve sayaçları sıfırlar"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._touched = {}
+            self._entries = 0
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict:
+        """İsabet/ıska sayaçları ve doluluk bilgisi"""
+        entries = self._entries
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,46 +1,282 @@
 """
 embeddings.py
-HuggingFace embedding modeli yönetimi
+HuggingFace embedding modeli yönetimi (PyTorch veya ONNX Runtime backend'i)
 """
 
-from langchain.embeddings import HuggingFaceEmbeddings
-from typing import List
+import glob
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
 import numpy as np
 
+from src.embedding_cache import EmbeddingCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def _model_directories(model_name: str) -> List[str]:
+    """Modelin yerel klasörü ve HuggingFace / sentence-transformers önbellekleri"""
+    if os.path.isdir(model_name):
+        return [model_name]
+    
+    hf_home = os.getenv("HF_HOME", os.path.join(os.path.expanduser("~"), ".cache", "huggingface"))
+    hub_cache = os.getenv("HF_HUB_CACHE", os.path.join(hf_home, "hub"))
+    st_home = os.getenv("SENTENCE_TRANSFORMERS_HOME",
+                        os.path.join(os.path.expanduser("~"), ".cache", "torch", "sentence_transformers"))
+    return (sorted(glob.glob(os.path.join(hub_cache, f"models--{model_name.replace('/', '--')}",
+                                          "snapshots", "*")))
+            + [os.path.join(st_home, model_name.replace("/", "_"))])
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def model_config_dimension(model_name: str) -> Optional[int]:
+    """
+    Embedding boyutunu modeli yüklemeden, indirilmiş model dosyalarından okur.
+    
+    Sırasıyla Dense katmanının çıkışı, Pooling katmanının boyutu ve
+    transformer'ın gizli katman boyutuna bakılır. Model henüz indirilmemişse None.
+    """
+    for directory in _model_directories(model_name):
+        for filename, key in (("2_Dense/config.json", "out_features"),
+                              ("1_Pooling/config.json", "word_embedding_dimension"),
+                              ("config.json", "hidden_size"),
+                              ("config.json", "dim")):
+            config = _read_json(os.path.join(directory, filename))
+            if config and isinstance(config.get(key), int):
+                return config[key]
+    return None
+
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+
+class SentenceTransformerEmbeddings:
+    """sentence-transformers modelini LangChain HuggingFaceEmbeddings arayüzüyle sarar"""
+    
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        
+        self.model_name = model_name
+        self.client = SentenceTransformer(model_name, device="cpu")
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.encode(list(texts), normalize_embeddings=True).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
 
 class EmbeddingManager:
     """Embedding işlemlerini yöneten sınıf"""
     
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 cache_path: Optional[str] = None, cache_max_entries: int = 100_000,
+                 dimension: Optional[int] = None, backend: str = "torch",
+                 onnx_options: Optional[Dict] = None):
         """
+        Model (ve torch) ilk embedding isteğinde ya da `warm_up` ile yüklenir;
+        nesnenin oluşturulması anlıktır.
+        
         Args:
             model_name: HuggingFace model adı
+            cache_path: Verilirse embedding'ler bu SQLite dosyasında önbelleğe alınır
+            cache_max_entries: Önbellekte tutulacak en fazla embedding sayısı
+            dimension: Biliniyorsa embedding boyutu (örn. indeks manifest'inden)
+            backend: "torch" (HuggingFaceEmbeddings) veya "onnx" (modelin
+                ONNX sürümü, ONNX Runtime ile; torch yüklenmez)
+            onnx_options: OnnxEmbeddings ayarları, örn. `{"model_dir":
+                "models/minilm-onnx", "quantize": True}` (int8)
+        
+        ONNX (özellikle int8) çıktısı torch'unkiyle birebir aynı olmadığından
+        önbellek anahtarları ve indeks manifest'i backend'i de içerir (bkz.
+        `model_key`): backend değişince indeks yeniden oluşturulur, önbellekteki
+        torch embedding'leri karışmaz. Uyum `check_parity` ile ölçülür.
         """
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"❌ Bilinmeyen embedding backend'i: {backend} "
+                             f"(seçenekler: {', '.join(EMBEDDING_BACKENDS)})")
         self.model_name = model_name
+        self.backend = backend
+        self.onnx_options = dict(onnx_options or {})
+        self.cache = EmbeddingCache(cache_path, max_entries=cache_max_entries) if cache_path else None
+        self._dimension = dimension
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._warm_up_thread: Optional[threading.Thread] = None
+    
+    @property
+    def backend_label(self) -> str:
+        """Embedding'leri üreten backend: `"torch"`, `"onnx"` veya `"onnx-int8"`"""
+        if self.backend == "onnx" and self.onnx_options.get("quantize"):
+            return "onnx-int8"
+        return self.backend
+    
+    @property
+    def model_key(self) -> str:
+        """Önbellek anahtarlarında kullanılan model kimliği, örn. `"<model>|onnx-int8"` (torch: model adı)"""
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}|{self.backend_label}"
+    
+    @property
+    def embedding_model(self):
+        """HuggingFace embedding modeli; ilk erişimde yüklenir"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+    
+    def _load_model(self):
+        logger.info(f"🧠 Embedding modeli yükleniyor: {self.model_name} ({self.backend})")
+        model = self._load_onnx_model() if self.backend == "onnx" else self._load_torch_model()
+        if self._dimension is None:
+            self._dimension = model_config_dimension(self.model_name)
+        if self._dimension is None:
+            # Model dosyalarında boyut bulunamazsa test embedding ile öğren
+            self._dimension = len(model.embed_query("test"))
+        logger.info(f"✅ Embedding modeli hazır (boyut: {self._dimension})")
+        return model
+    
+    def _load_onnx_model(self):
+        from src.onnx_embeddings import OnnxEmbeddings
         
-        print(f"🧠 Embedding modeli yükleniyor: {model_name}")
-        
-        # HuggingFace embeddings oluştur
-        self.embedding_model = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        
-        print(f"✅ Embedding modeli hazır!")
+        return OnnxEmbeddings.from_pretrained(self.model_name, **self.onnx_options)
+    
+    def _load_torch_model(self):
+        # langchain ve torch importu saniyeler sürer; yalnızca model gerektiğinde yapılır
+        try:
+            from langchain.embeddings import HuggingFaceEmbeddings
+        except ImportError:
+            # Snapshot'tan açılan servislerde LangChain kurulu olmayabilir
+            model = SentenceTransformerEmbeddings(self.model_name)
+        else:
+            model = HuggingFaceEmbeddings(
+                model_name=self.model_name,
+                model_kwargs={'device': 'cpu'},
+                encode_kwargs={'normalize_embeddings': True}
+            )
+        return model
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+    
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Modeli ilk sorgudan önce yükler.
         
-        # Test embedding ile boyutu öğren
-        test_embedding = self.embed_query("test")
-        self.embedding_dimension = len(test_embedding)
-        print(f"📊 Embedding boyutu: {self.embedding_dimension}")
+        Args:
+            background: True ise yükleme daemon thread'inde yapılır ve thread
+                döner; bu sırada gelen embedding istekleri yüklemenin bitmesini bekler
+        """
+        if self._model is not None:
+            return None
+        if not background:
+            self.embedding_model
+            return None
+        if self._warm_up_thread is None or not self._warm_up_thread.is_alive():
+            self._warm_up_thread = threading.Thread(target=lambda: self.embedding_model,
+                                                    name="embedding-warm-up", daemon=True)
+            self._warm_up_thread.start()
+        return self._warm_up_thread
+    
+    @property
+    def embedding_dimension(self) -> int:
+        """
+        Embedding boyutu. Sırasıyla verilen/manifest'ten gelen değer ve
+        indirilmiş model dosyaları denenir; ikisi de yoksa model yüklenir.
+        """
+        if self._dimension is None:
+            self._dimension = model_config_dimension(self.model_name)
+        if self._dimension is None:
+            self.embedding_model
+        return self._dimension
+    
+    def set_dimension(self, dimension: Optional[int]):
+        """Boyut henüz bilinmiyorsa dışarıdan (indeks manifest'i) verilen değeri kullanır"""
+        if self._dimension is None and dimension:
+            self._dimension = int(dimension)
     
     def embed_query(self, text: str) -> List[float]:
         """Tek bir metin için embedding oluşturur"""
-        return self.embedding_model.embed_query(text)
+        if self.cache is None:
+            return self.embedding_model.embed_query(text)
+        
+        cached = self.cache.get_many(self.model_key, [text])[0]
+        if cached is not None:
+            return cached
+        
+        embedding = self.embedding_model.embed_query(text)
+        self.cache.put_many(self.model_key, [text], [embedding])
+        return embedding
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Birden fazla metin için embedding oluşturur"""
-        return self.embedding_model.embed_documents(texts)
+        if self.cache is None:
+            return self.embedding_model.embed_documents(texts)
+        
+        embeddings = self.cache.get_many(self.model_key, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self.embedding_model.embed_documents(missing_texts)
+            self.cache.put_many(self.model_key, missing_texts, computed)
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+        
+        return embeddings
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Birden fazla soru için tek model çağrısında embedding oluşturur.
+        
+        Kullanılan sentence-transformers modelleri soru ve belge için aynı
+        kodlamayı yaptığından toplu belge embedding'i kullanılır.
+        """
+        return self.embed_documents(texts)
+    
+    def check_parity(self, texts: Optional[List[str]] = None, min_cosine: float = 0.99,
+                     reference: Optional["EmbeddingManager"] = None) -> Dict:
+        """
+        Bu backend'in embedding'lerini PyTorch çıktısıyla karşılaştırır.
+        
+        Önbellek atlanır, iki model de doğrudan çalıştırılır. Rapor metin
+        başına cosine benzerliğinin en küçüğünü ve ortalamasını içerir;
+        `passed`, en küçük benzerlik `min_cosine`'in üzerindeyse True'dur.
+        
+        Args:
+            texts: Karşılaştırılacak metinler (varsayılan: örnek cümleler)
+            reference: Referans yönetici (varsayılan: aynı modelin torch backend'i)
+        """
+        from src.onnx_embeddings import PARITY_SAMPLES, cosine_agreement
+        
+        texts = list(texts or PARITY_SAMPLES)
+        reference = reference or EmbeddingManager(self.model_name, backend="torch")
+        report = cosine_agreement(self.embedding_model.embed_documents(texts),
+                                  reference.embedding_model.embed_documents(texts), min_cosine)
+        report.update(backend=self.backend, quantized=bool(self.onnx_options.get("quantize")))
+        if report["passed"]:
+            logger.info(f"✅ Parity: {self.backend} en düşük cosine {report['min_cosine']:.4f}")
+        else:
+            logger.warning(f"⚠️ Parity eşiğin altında: {self.backend} en düşük cosine "
+                           f"{report['min_cosine']} < {min_cosine}")
+        return report
+    
+    def get_cache_stats(self) -> Optional[Dict]:
+        """Embedding önbelleği istatistikleri (önbellek kapalıysa None)"""
+        return self.cache.get_stats() if self.cache else None
     
     def calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """İki embedding arasındaki cosine similarity hesaplar"""
@@ -55,5 +291,9 @@ class EmbeddingManager:
             "model_name": self.model_name,
             "embedding_dimension": self.embedding_dimension,
             "device": "cpu",
-            "normalization": True
+            "backend": self.backend_label,
+            "quantized": bool(self.onnx_options.get("quantize")),
+            "loaded": self.is_loaded,
+            "normalization": True,
+            "cache": self.get_cache_stats()
         }
\ No newline at end of file
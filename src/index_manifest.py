@@ -0,0 +1,90 @@
+"""
+index_manifest.py
+Kalıcı indeks için manifest (PDF hash'i, chunking parametreleri, model ve backend) yönetimi
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+
+MANIFEST_VERSION = 2
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Dosyanın SHA-256 özetini parça parça okuyarak hesaplar"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """İndeksin hangi girdilerle oluşturulduğunu kaydeden manifest dosyası"""
+
+    # İndeksin geçerliliğini belirleyen alanlar
+    KEYS = ("version", "pdf_sha256", "chunk_size", "chunk_overlap", "separators",
+            "embedding_model", "embedding_backend", "collection_name", "vector_backend")
+
+    def __init__(self, index_dir: str, filename: str = "manifest.json"):
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, filename)
+
+    @staticmethod
+    def build(pdf_path: str, chunk_size: int, chunk_overlap: int,
+              embedding_model: str, collection_name: str,
+              vector_backend: str = "chroma",
+              separators: Sequence[str] = (),
+              embedding_backend: str = "torch") -> Dict:
+        """
+        Mevcut girdilerden beklenen manifest'i oluşturur. `embedding_backend`
+        embedding'leri üreten backend'dir ("torch", "onnx", "onnx-int8");
+        aynı modelin farklı backend'le üretilmiş embedding'leri karıştırılmaz.
+        """
+        return {
+            "version": MANIFEST_VERSION,
+            "pdf_path": os.path.abspath(pdf_path),
+            "pdf_sha256": file_sha256(pdf_path),
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "separators": list(separators),
+            "embedding_model": embedding_model,
+            "embedding_backend": embedding_backend,
+            "collection_name": collection_name,
+            "vector_backend": vector_backend
+        }
+
+    def load(self) -> Optional[Dict]:
+        """Kayıtlı manifest'i okur, yoksa veya bozuksa None döndürür"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, manifest: Dict):
+        """Manifest'i atomik olarak diske yazar"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        data = dict(manifest, created_at=datetime.now().isoformat(timespec="seconds"))
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Manifest'i siler (indeks yeniden oluşturulurken çağrılır)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def matches(self, expected: Dict) -> bool:
+        """Kayıtlı manifest beklenen girdilerle birebir uyuşuyor mu?"""
+        current = self.load()
+        if current is None:
+            return False
+        return all(current.get(key) == expected.get(key) for key in self.KEYS)
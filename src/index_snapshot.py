@@ -0,0 +1,293 @@
+"""
+index_snapshot.py
+İndeksin (chunk metinleri, metadata, embedding matrisi, manifest) tek dosyalık,
+memory-map edilerek açılan taşınabilir snapshot'ı
+
+Kullanım:
+    python -m src.index_snapshot build Data/plan.pdf -o plan.ragsnap
+    python -m src.index_snapshot info plan.ragsnap --verify
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.chunk_store import ChunkStore
+from src.lexical_index import BM25Index
+from src.quantization import mode_of
+
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_MAGIC = b"RAGSNAP\x00"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".ragsnap"
+
+# Dosya başı: magic, sürüm, JSON başlığın bayt uzunluğu
+_PREAMBLE = struct.Struct("<8sIQ")
+# Bölümler bu sınıra hizalanır; diziler memory-map edildiğinde hizalı okunur
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_snapshot(path: str, manifest: Dict, ids: List[str], metadatas: List[Dict],
+                   embeddings: np.ndarray, chunks: ChunkStore,
+                   scales: Optional[np.ndarray] = None,
+                   lexical_index: Optional[BM25Index] = None) -> Dict:
+    """
+    Snapshot dosyasını atomik olarak yazar, başlığını döndürür.
+
+    Dosya düzeni: sabit uzunlukta giriş (magic, sürüm, başlık uzunluğu),
+    JSON başlık (manifest, ID'ler, metadata'lar, bölüm konumları) ve
+    `_ALIGN` sınırına hizalanmış ham bölümler: embedding matrisi, int8
+    ölçekleri, chunk metinlerinin UTF-8 tamponu ve bayt konumları, BM25
+    posting dizileri. Satırlar chunk sırasındadır; i. embedding, i. ID ve
+    i. chunk aynı kayda aittir.
+
+    Args:
+        embeddings: Saklanma biçiminde (float32, float16 veya int8) matris
+        chunks: Chunk metinleri, `ids` ile aynı sırada
+        scales: int8 matrisin satır ölçekleri
+        lexical_index: `ids` üzerinde kurulmuş BM25 indeksi; verilirse açılışta
+            metinler yeniden tokenize edilmez
+    """
+    if not (len(ids) == len(metadatas) == len(embeddings) == len(chunks)):
+        raise ValueError("❌ Snapshot için ID, metadata, embedding ve chunk sayıları eşit olmalı")
+
+    arrays = {
+        "embeddings": np.ascontiguousarray(embeddings),
+        "text": np.frombuffer(chunks.buffer, dtype=np.uint8) if len(chunks.buffer) else
+        np.zeros(0, dtype=np.uint8),
+        "offsets": np.ascontiguousarray(chunks.offsets, dtype=np.int64)
+    }
+    if embeddings.dtype == np.int8:
+        arrays["scales"] = np.ascontiguousarray(scales, dtype=np.float32)
+    terms = None
+    if lexical_index is not None and len(lexical_index):
+        terms, lexical_arrays = lexical_index.to_arrays()
+        arrays.update((f"bm25_{name}", np.ascontiguousarray(array))
+                      for name, array in lexical_arrays.items())
+
+    # Bölüm konumları veri alanının başına göredir; başlık uzunluğundan bağımsızdır
+    sections, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        sections[name] = {"offset": offset, "nbytes": int(array.nbytes),
+                          "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset += array.nbytes
+
+    digest = hashlib.sha256()
+    for array in arrays.values():
+        digest.update(memoryview(array).cast("B"))
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "manifest": manifest,
+        "chunk_count": len(ids),
+        "quantization": mode_of(embeddings),
+        "sha256": digest.hexdigest(),
+        "sections": sections,
+        "bm25_terms": terms,
+        "ids": ids,
+        "metadatas": metadatas
+    }
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(_PREAMBLE.size + len(encoded))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + sections[name]["offset"])
+            f.write(memoryview(array).cast("B"))
+    os.replace(tmp_path, path)
+
+    logger.info(f"📦 Snapshot yazıldı: {path} ({len(ids)} chunk, "
+                f"{os.path.getsize(path) / 1e6:.1f} MB)")
+    return header
+
+
+class IndexSnapshot:
+    """
+    Memory-map edilmiş snapshot dosyası.
+
+    Embedding matrisi, ölçekler ve chunk konumları dosya üzerindeki
+    NumPy görünümleridir; chunk metinleri dosyadaki tampondan okunur.
+    Aynı snapshot'ı açan süreçler sayfaları işletim sisteminin önbelleğinden
+    paylaşır, açılışta yalnızca JSON başlık okunur.
+    """
+
+    def __init__(self, path: str, header: Dict, buffer: mmap.mmap, data_start: int):
+        self.path = path
+        self.header = header
+        self._buffer = buffer
+        self._data_start = data_start
+
+    @classmethod
+    def open(cls, path: str, verify: bool = False) -> "IndexSnapshot":
+        """
+        Snapshot'ı açar.
+
+        Args:
+            verify: True ise bölümlerin SHA-256 özeti başlıktakiyle
+                karşılaştırılır (tüm dosya okunur)
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(buffer) < _PREAMBLE.size:
+            raise ValueError(f"❌ Geçersiz snapshot dosyası: {path}")
+        magic, version, header_length = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"❌ Geçersiz snapshot dosyası: {path}")
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"❌ Desteklenmeyen snapshot sürümü: {version} "
+                             f"(en fazla {SNAPSHOT_VERSION})")
+
+        header = json.loads(str(buffer[_PREAMBLE.size:_PREAMBLE.size + header_length], "utf-8"))
+        snapshot = cls(path, header, buffer, _aligned(_PREAMBLE.size + header_length))
+
+        end = max((section["offset"] + section["nbytes"] for section in header["sections"].values()),
+                  default=0)
+        if len(buffer) < snapshot._data_start + end:
+            raise ValueError(f"❌ Snapshot dosyası eksik: {path}")
+        if verify and snapshot.checksum() != header["sha256"]:
+            raise ValueError(f"❌ Snapshot özeti uyuşmuyor: {path}")
+
+        logger.info(f"📦 Snapshot açıldı: {path} ({header['chunk_count']} chunk)")
+        return snapshot
+
+    def _array(self, name: str) -> Optional[np.ndarray]:
+        section = self.header["sections"].get(name)
+        if section is None:
+            return None
+        dtype = np.dtype(section["dtype"])
+        count = section["nbytes"] // dtype.itemsize
+        array = np.frombuffer(self._buffer, dtype=dtype, count=count,
+                              offset=self._data_start + section["offset"])
+        return array.reshape(section["shape"])
+
+    def checksum(self) -> str:
+        """Bölümlerin SHA-256 özeti (dosyadaki sırayla)"""
+        digest = hashlib.sha256()
+        for name in self.header["sections"]:
+            digest.update(memoryview(self._array(name)).cast("B"))
+        return digest.hexdigest()
+
+    @property
+    def manifest(self) -> Dict:
+        return self.header["manifest"]
+
+    @property
+    def quantization(self) -> str:
+        return self.header["quantization"]
+
+    @property
+    def ids(self) -> List[str]:
+        return self.header["ids"]
+
+    @property
+    def metadatas(self) -> List[Dict]:
+        return self.header["metadatas"]
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self._array("embeddings")
+
+    @property
+    def scales(self) -> Optional[np.ndarray]:
+        return self._array("scales")
+
+    @property
+    def chunks(self) -> ChunkStore:
+        section = self.header["sections"]["text"]
+        start = self._data_start + section["offset"]
+        return ChunkStore(memoryview(self._buffer)[start:start + section["nbytes"]],
+                          self._array("offsets"), self.path)
+
+    @property
+    def lexical_index(self) -> Optional[BM25Index]:
+        """Snapshot'a yazılmış BM25 indeksi (yoksa None)"""
+        if self.header.get("bm25_terms") is None:
+            return None
+        arrays = {name: self._array(f"bm25_{name}") for name in ("offsets", "postings", "weights")}
+        return BM25Index().load_arrays(self.ids, self.header["bm25_terms"], arrays)
+
+    def get_stats(self) -> Dict:
+        """Snapshot bilgileri"""
+        sections = self.header["sections"]
+        return {
+            "path": self.path,
+            "version": self.header["version"],
+            "created_at": self.header["created_at"],
+            "chunk_count": self.header["chunk_count"],
+            "quantization": self.quantization,
+            "embedding_model": self.manifest.get("embedding_model"),
+            "embedding_dimension": self.manifest.get("embedding_dimension"),
+            "file_bytes": len(self._buffer),
+            "section_bytes": {name: section["nbytes"] for name, section in sections.items()}
+        }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Taşınabilir indeks snapshot'ı oluşturma ve inceleme")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="PDF'i indeksleyip snapshot dosyası yazar")
+    build.add_argument("pdf_path", help="İndekslenecek PDF dosyası")
+    build.add_argument("-o", "--output", help=f"Snapshot dosyası (varsayılan: <pdf>{SNAPSHOT_SUFFIX})")
+    build.add_argument("--index-dir", default="index_store",
+                       help="Ara indeks klasörü; güncelse yeniden embed edilmez")
+    build.add_argument("--backend", default="numpy", choices=["chroma", "numpy", "ivf"])
+    build.add_argument("--quantization", default="float32", choices=["float32", "float16", "int8"],
+                       help="Snapshot'taki embedding matrisinin saklanma biçimi")
+    build.add_argument("--streaming", action="store_true", help="PDF'i sayfa sayfa indeksle")
+    build.add_argument("--embedding-backend", default="torch", choices=["torch", "onnx"],
+                       help="Embedding modelinin çalıştırılacağı backend")
+    build.add_argument("--onnx-model-dir", help="ONNX model klasörü (bkz. python -m src.onnx_embeddings export)")
+    build.add_argument("--onnx-int8", action="store_true", help="Dinamik int8 quantize edilmiş ONNX modeli")
+
+    info = commands.add_parser("info", help="Snapshot başlığını gösterir")
+    info.add_argument("snapshot_path")
+    info.add_argument("--verify", action="store_true", help="Bölümlerin SHA-256 özetini doğrula")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    from src.logging_config import configure_logging
+    # rag_pipeline bu modülü import ettiğinden döngüsel import olmaması için burada
+    from src.rag_pipeline import RAGPipeline
+
+    args = parse_args(argv)
+    configure_logging()
+
+    if args.command == "build":
+        output = args.output or os.path.splitext(args.pdf_path)[0] + SNAPSHOT_SUFFIX
+        pipeline = RAGPipeline(args.pdf_path, index_dir=args.index_dir, vector_backend=args.backend,
+                               answer_cache_threshold=None, embedding_backend=args.embedding_backend,
+                               embedding_options={"model_dir": args.onnx_model_dir,
+                                                  "quantize": args.onnx_int8})
+        pipeline.index_document(streaming=args.streaming)
+        pipeline.save_snapshot(output, quantization=args.quantization)
+        print(output)
+    else:
+        snapshot = IndexSnapshot.open(args.snapshot_path, verify=args.verify)
+        print(json.dumps(snapshot.get_stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
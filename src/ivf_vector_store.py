@@ -0,0 +1,313 @@
+"""
+ivf_vector_store.py
+Büyük koleksiyonlar için IVF (inverted file) yaklaşık en yakın komşu araması
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.chunk_store import ChunkStore, grow_rows
+from src.numpy_vector_store import NumpyVectorStore, rank_rows
+from src.quantization import dequantize, dot_scores
+
+
+logger = logging.getLogger(__name__)
+
+# Küme merkezleri eğitilirken kullanılan en fazla örnek (liste başına)
+TRAIN_SAMPLES_PER_LIST = 64
+# Bir atama bloğunda float32'ye açılan satır sayısı
+ASSIGN_BLOCK_ROWS = 8192
+
+
+def _kmeans(vectors: np.ndarray, n_lists: int, iterations: int,
+            rng: np.random.Generator) -> np.ndarray:
+    """Kare L2 mesafesiyle k-means; boş kalan kümeler rastgele örneklerle yeniden başlatılır"""
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(vectors, centroids)
+        counts = np.bincount(assignments, minlength=n_lists)
+        empty = counts == 0
+        # Kümeye göre sıralanmış satırların toplamı tek reduceat ile alınır
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[~empty]
+        centroids[~empty] = np.add.reduceat(vectors[order], starts, axis=0) / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+    return centroids
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    scores = 2.0 * (vectors @ centroids.T) - np.einsum("ij,ij->i", centroids, centroids)
+    return scores.argmax(axis=1).astype(np.int32)
+
+
+class IVFVectorStore(NumpyVectorStore):
+    """
+    NumpyVectorStore'un IVF indeksli hali.
+
+    Embedding'ler k-means ile `n_lists` kümeye ayrılır; her küme satır
+    numaralarının bir listesidir. Sorgu en yakın `nprobe` kümenin satırlarını tam
+    olarak skorlar, böylece taranan satır sayısı koleksiyonun yaklaşık
+    `nprobe / n_lists`'i kadardır. `nprobe` büyüdükçe recall tam aramaya
+    yaklaşır, gecikme artar.
+
+    Yeni satırlar mevcut merkezlere atanıp yalnızca kendi listelerinin
+    sonuna eklenir (yeniden eğitim gerekmez); silinen satırlar yalnızca
+    kendi listelerinden çıkarılır. Koleksiyon eğitildiği boyutun `retrain_factor` katına çıkınca merkezler
+    yeniden eğitilir. `min_train_size`'ın altındaki koleksiyonlarda arama
+    tam (brute-force) yapılır. Merkezler ve atamalar matrisin yanına
+    `.ivf.npz` olarak yazılır.
+    """
+
+    def __init__(self, collection_name: str = "istanbul_bolge_plani",
+                 persist_directory: Optional[str] = None,
+                 quantization: str = "float32", n_lists: Optional[int] = None,
+                 nprobe: int = 8, min_train_size: int = 4096,
+                 retrain_factor: float = 4.0, train_iterations: int = 10, seed: int = 0):
+        """
+        Args:
+            n_lists: Küme sayısı (None: eğitim anında yaklaşık √N)
+            nprobe: Sorgu başına taranan varsayılan küme sayısı
+            min_train_size: İndeksin eğitileceği en küçük koleksiyon boyutu
+            retrain_factor: Eğitimdeki boyutun kaç katında yeniden eğitileceği
+            train_iterations: k-means iterasyon sayısı
+            seed: Eğitimde örnekleme ve başlangıç merkezleri için seed
+            Diğerleri: NumpyVectorStore ile aynı
+        """
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.train_iterations = train_iterations
+        self.seed = seed
+
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        # Diskten okunan atamalar (chunk ID -> küme); yüklenince satırlara aktarılır
+        self._saved_lists: Dict[str, int] = {}
+        # Küme başına satır numaraları (kapasitesi iki katına çıkarak büyür) ve dolu uzunlukları
+        self._lists: List[np.ndarray] = []
+        self._list_sizes = np.zeros(0, dtype=np.int64)
+        # Satır -> küme ve satırın kendi listesindeki yeri
+        self._row_list = np.zeros(0, dtype=np.int32)
+        self._row_slot = np.zeros(0, dtype=np.int64)
+
+        super().__init__(collection_name, persist_directory, quantization)
+
+    @property
+    def _ivf_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection_name}.ivf.npz")
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _set_records(self, embeddings: np.ndarray, ids: List[str],
+                     documents: ChunkStore, metadata: List[Dict],
+                     scales: Optional[np.ndarray] = None):
+        super()._set_records(embeddings, ids, documents, metadata, scales)
+        if self._needs_training():
+            self._train_or_clear()
+        else:
+            assignments = np.fromiter((self._saved_lists.get(chunk_id, -1) for chunk_id in ids),
+                                      dtype=np.int32, count=len(ids))
+            new_rows = np.flatnonzero(assignments < 0)
+            if len(new_rows):
+                assignments[new_rows] = self._assign(new_rows)
+            self._set_lists(assignments)
+        self._saved_lists = {}
+
+    def _needs_training(self) -> bool:
+        return self._centroids is None or self._count > self.retrain_factor * self._trained_size
+
+    def _train_or_clear(self):
+        if self._count >= self.min_train_size:
+            self.train()
+        else:
+            self._centroids = None
+            self._set_lists(np.zeros(0, dtype=np.int32))
+
+    def _rows_added(self, rows: np.ndarray):
+        if self._needs_training():
+            self._train_or_clear()
+            return
+        self._append_to_lists(rows, self._assign(rows))
+
+    def _rows_changed(self, rows: np.ndarray):
+        if self._centroids is None:
+            return
+        self._remove_from_lists(rows)
+        self._append_to_lists(rows, self._assign(rows))
+
+    def _rows_removed(self, removed: Sequence[int], sources: Sequence[int], targets: Sequence[int]):
+        if self._centroids is None:
+            return
+        self._remove_from_lists(removed)
+        # Sondan taşınan satırların listelerdeki numarası yeni yerleriyle değiştirilir
+        for source, target in zip(sources, targets):
+            list_id, slot = self._row_list[source], self._row_slot[source]
+            self._lists[list_id][slot] = target
+            self._row_list[target], self._row_slot[target] = list_id, slot
+
+    def _assign(self, rows: np.ndarray) -> np.ndarray:
+        """Satırları en yakın küme merkezine atar (bloklar halinde)"""
+        assignments = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), ASSIGN_BLOCK_ROWS):
+            block = rows[start:start + ASSIGN_BLOCK_ROWS]
+            vectors = dequantize(self._embeddings[block], self._scales[block])
+            assignments[start:start + len(block)] = _nearest(vectors, self._centroids)
+        return assignments
+
+    def _set_lists(self, assignments: np.ndarray):
+        """Listeleri tüm satırların atamalarından yeniden kurar"""
+        n_lists = len(self._centroids) if self._centroids is not None else 0
+        order = np.argsort(assignments, kind="stable")
+        sizes = np.bincount(assignments, minlength=n_lists).astype(np.int64)
+        starts = np.cumsum(sizes) - sizes
+        # Her liste kendi dizisinde tutulur; sonuna eklemek diğerlerini etkilemez
+        self._lists = [part.copy() for part in np.split(order, starts[1:])] if n_lists else []
+        self._list_sizes = sizes
+        self._row_list = assignments.astype(np.int32)
+        self._row_slot = np.empty(len(assignments), dtype=np.int64)
+        self._row_slot[order] = np.arange(len(assignments)) - starts[assignments[order]]
+        self._generation += 1
+
+    def _append_to_lists(self, rows: np.ndarray, assignments: np.ndarray):
+        needed = int(rows.max()) + 1
+        self._row_list = grow_rows(self._row_list, len(self._row_list), needed)
+        self._row_slot = grow_rows(self._row_slot, len(self._row_slot), needed)
+        self._row_list[rows] = assignments
+
+        order = np.argsort(assignments, kind="stable")
+        list_ids, starts = np.unique(assignments[order], return_index=True)
+        for list_id, group in zip(list_ids.tolist(), np.split(rows[order], starts[1:])):
+            size = int(self._list_sizes[list_id])
+            self._lists[list_id] = grow_rows(self._lists[list_id], size, size + len(group))
+            self._lists[list_id][size:size + len(group)] = group
+            self._row_slot[group] = np.arange(size, size + len(group))
+            self._list_sizes[list_id] = size + len(group)
+
+    def _remove_from_lists(self, rows: Sequence[int]):
+        # Çıkan satırın yerine listesinin son elemanı konur
+        for row in rows:
+            list_id, slot = self._row_list[row], self._row_slot[row]
+            last = self._list_sizes[list_id] - 1
+            moved = self._lists[list_id][last]
+            self._lists[list_id][slot] = moved
+            self._row_slot[moved] = slot
+            self._list_sizes[list_id] = last
+        self._generation += 1
+
+    def train(self, n_lists: Optional[int] = None):
+        """
+        Küme merkezlerini mevcut embedding'lerden (yeniden) eğitir ve tüm
+        satırları yeniden atar.
+        """
+        with self._lock:
+            total = len(self._ids)
+            if total == 0:
+                return
+            n_lists = n_lists or self.n_lists or int(np.sqrt(total))
+            n_lists = max(1, min(n_lists, total))
+
+            rng = np.random.default_rng(self.seed)
+            sample_size = min(total, n_lists * TRAIN_SAMPLES_PER_LIST)
+            sample = np.sort(rng.choice(total, sample_size, replace=False))
+            vectors = dequantize(self._embeddings[sample], self._scales[sample])
+
+            self._centroids = _kmeans(vectors, n_lists, self.train_iterations, rng)
+            self._trained_size = total
+            self._set_lists(self._assign(np.arange(total)))
+        logger.info(f"🧭 IVF indeksi eğitildi: {n_lists} küme, {total} belge")
+
+    def _load(self):
+        if os.path.exists(self._ivf_path):
+            state = np.load(self._ivf_path)
+            self._centroids = state["centroids"] if len(state["centroids"]) else None
+            self._trained_size = int(state["trained_size"])
+            self._saved_lists = dict(zip(state["ids"].tolist(), state["assignments"].tolist()))
+        super()._load()
+
+    def _write(self, matrix: bool):
+        super()._write(matrix)
+        if not matrix:
+            return
+
+        ivf_tmp = self._ivf_path + ".tmp.npz"
+        trained = self._centroids is not None
+        np.savez(ivf_tmp, centroids=self._centroids if trained else np.zeros((0, 0), dtype=np.float32),
+                 trained_size=self._trained_size,
+                 ids=np.array(self._ids if trained else [], dtype=str),
+                 assignments=self._row_list[:self._count] if trained else np.zeros(0, dtype=np.int32))
+        os.replace(ivf_tmp, self._ivf_path)
+
+    def reset(self):
+        with self._lock:
+            self._centroids, self._trained_size, self._saved_lists = None, 0, {}
+            if self.persist_directory and os.path.exists(self._ivf_path):
+                os.remove(self._ivf_path)
+            super().reset()
+
+    def query_batch(self, query_embeddings: List[List[float]], n_results: int = 5,
+                    filters: Optional[Dict] = None,
+                    nprobe: Optional[int] = None) -> List[Tuple[List[str], List[str], List[float]]]:
+        """
+        En yakın `nprobe` kümedeki satırlar arasından en yakın belgeleri getirir.
+
+        İndeks henüz eğitilmediyse tam arama yapılır. Filtreler taranan
+        satırlara uygulanır; çok dar filtrelerde `nprobe` artırılmalıdır.
+        """
+        with self._lock:
+            trained = self._centroids is not None
+        if not trained:
+            return super().query_batch(query_embeddings, n_results, filters)
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        while True:
+            with self._lock:
+                centroids = self._centroids
+                if centroids is None:
+                    break
+                generation = self._generation
+                embeddings, scales, norms = self._embeddings, self._scales, self._squared_norms
+                lists, sizes = list(self._lists), self._list_sizes.copy()
+                mask = self._columns.mask(filters) if filters else None
+
+            n_probe = max(1, min(nprobe or self.nprobe, len(centroids)))
+            probes, _ = rank_rows(2.0 * (queries @ centroids.T)
+                                  - np.einsum("ij,ij->i", centroids, centroids), n_probe)
+
+            found = []
+            for query, probed in zip(queries, probes):
+                rows = np.concatenate([lists[i][:sizes[i]] for i in probed])
+                if mask is not None:
+                    rows = rows[mask[rows]]
+                k = min(n_results, len(rows))
+                if k == 0:
+                    found.append(((), ()))
+                    continue
+
+                scores = 2.0 * dot_scores(embeddings[rows], scales[rows], query[None, :]) - norms[rows]
+                top, top_scores = rank_rows(scores, k)
+                found.append((rows[top[0]], float(query @ query) - top_scores[0]))
+
+            # Arada satırlar silindi veya listeler yeniden kurulduysa sorgu tekrarlanır
+            with self._lock:
+                if self._generation == generation:
+                    return [self._rows_result(rows, distances) for rows, distances in found]
+        return super().query_batch(query_embeddings, n_results, filters)
+
+    def get_stats(self) -> Dict:
+        """Veritabanı ve IVF indeksi istatistikleri"""
+        stats = super().get_stats()
+        sizes = self._list_sizes if self._centroids is not None else np.zeros(0)
+        stats.update({
+            "ivf_trained": self.is_trained,
+            "ivf_lists": len(self._centroids) if self._centroids is not None else 0,
+            "ivf_nprobe": self.nprobe,
+            "ivf_largest_list": int(sizes.max()) if len(sizes) else 0
+        })
+        return stats
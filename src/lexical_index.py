@@ -0,0 +1,180 @@
+"""
+lexical_index.py
+Türkçe'ye duyarlı ters indeks (inverted index), BM25 skorlama ve
+reciprocal rank fusion
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Kesme işaretinden sonraki ekler (İstanbul'un) kelimeyle birlikte yakalanıp atılır
+_TOKEN_PATTERN = re.compile(r"\w+(?:['’]\w+)?", re.UNICODE)
+_APOSTROPHE_PATTERN = re.compile(r"['’]")
+
+# Sık geçen ve ayırt edici olmayan kelimeler (soru kalıpları dahil)
+TURKISH_STOPWORDS = frozenset("""
+acaba ama ancak artık aslında az bazı belki ben beri bile bir biri birkaç biz bu
+buna bunda bundan bunu bunun çok çünkü da daha de defa diye en gibi göre hem hep
+her hiç için ile ise kadar ki kim mı mi mu mü nasıl ne neden nedir nelerdir neler
+nerede nereye niye o olan olarak oldu olduğu olmak olup on ona ondan onlar onu
+onun sonra şey şu tüm ve veya ya yani yine
+""".split())
+
+# Uzundan kısaya sıralı çekim ekleri; kök en az MIN_STEM_LENGTH harf kalacak şekilde atılır
+TURKISH_SUFFIXES = tuple(sorted("""
+larının lerinin larında lerinde larından lerinden larına lerine sından sinden
+ları leri ların lerin lara lere larda lerde lardan lerden
+sının sinin sına sine sında sinde
+nın nin nun nün dır dir dur dür tır tir tur tür
+dan den tan ten nda nde ndan nden
+ını ini unu ünü ına ine una üne
+lar ler
+ın in un ün sı si su sü da de ta te ya ye yı yi yu yü
+ı i u ü a e
+""".split(), key=len, reverse=True))
+
+MIN_STEM_LENGTH = 4
+
+
+def turkish_lower(text: str) -> str:
+    """Türkçe kurallarına göre küçük harfe çevirir (I → ı, İ → i)"""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def stem(token: str, max_passes: int = 2) -> str:
+    """Hafif ek atma: en uzun uyan çekim ekini kökü fazla kısaltmadan siler"""
+    for _ in range(max_passes):
+        for suffix in TURKISH_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+                token = token[:-len(suffix)]
+                break
+        else:
+            break
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Metni küçük harfe çevirip kelimelere ayırır, stopword'leri atar ve kökleri döndürür"""
+    tokens = (_APOSTROPHE_PATTERN.split(token, 1)[0]
+              for token in _TOKEN_PATTERN.findall(turkish_lower(text)))
+    return [stem(token) for token in tokens
+            if len(token) > 1 and token not in TURKISH_STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Birden fazla sıralamayı reciprocal rank fusion ile birleştirir.
+
+    Her belge her sıralamadaki konumu için 1 / (k + sıra) puan alır.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    BM25 skorlamalı ters indeks.
+
+    Posting listeleri CSR düzeninde iki bitişik dizide tutulur: belge
+    numaraları (int32) ve önceden hesaplanmış BM25 ağırlıkları (float32).
+    Sorgu, terim başına bir dilim okuyup skor dizisine eklemekten ibarettir.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self._vocabulary: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: List[str], texts: Iterable[str]) -> "BM25Index":
+        """Belgelerden indeksi (yeniden) oluşturur; metinler bir kez, sırayla okunur"""
+        term_counts = [Counter(tokenize(text)) for text in texts]
+        doc_lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) if len(doc_lengths) and doc_lengths.mean() > 0 else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        n_docs = len(term_counts)
+        vocabulary, offsets, docs_parts, weight_parts = {}, [0], [], []
+        for term_id, (term, entries) in enumerate(postings.items()):
+            docs = np.fromiter((doc for doc, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            idf = np.log(1.0 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[docs] / avg_length)
+
+            vocabulary[term] = term_id
+            docs_parts.append(docs)
+            weight_parts.append((idf * tfs * (self.k1 + 1.0) / (tfs + norm)).astype(np.float32))
+            offsets.append(offsets[-1] + len(entries))
+
+        self.ids = list(ids)
+        self._vocabulary = vocabulary
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._postings = np.concatenate(docs_parts) if docs_parts else np.zeros(0, dtype=np.int32)
+        self._weights = np.concatenate(weight_parts) if weight_parts else np.zeros(0, dtype=np.float32)
+        return self
+
+    def to_arrays(self) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """Terimler (terim numarası sırasıyla) ve CSR dizileri; snapshot'a yazmak için"""
+        return list(self._vocabulary), {"offsets": self._offsets, "postings": self._postings,
+                                        "weights": self._weights}
+
+    def load_arrays(self, ids: List[str], terms: List[str], arrays: Dict[str, np.ndarray]) -> "BM25Index":
+        """`to_arrays` çıktısından (örn. memory-map edilmiş diziler) indeksi kopyalamadan kurar"""
+        self.ids = list(ids)
+        self._vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        self._offsets, self._postings, self._weights = \
+            arrays["offsets"], arrays["postings"], arrays["weights"]
+        return self
+
+    def scores(self, query: str) -> np.ndarray:
+        """Tüm belgeler için BM25 skorları"""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self._vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            # Bir terim için belge numaraları tekildir, doğrudan eklenebilir
+            scores[self._postings[start:end]] += self._weights[start:end]
+        return scores
+
+    def search(self, query: str, n_results: int = 5,
+               candidate_mask: Optional[np.ndarray] = None) -> Tuple[List[str], List[float]]:
+        """En yüksek BM25 skorlu belgelerin ID'leri ve skorları"""
+        if n_results <= 0 or not self.ids:
+            return [], []
+
+        scores = self.scores(query)
+        if candidate_mask is not None:
+            scores = np.where(candidate_mask, scores, 0.0)
+
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > n_results:
+            matched = matched[np.argpartition(-scores[matched], n_results - 1)[:n_results]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [self.ids[i] for i in matched], [float(scores[i]) for i in matched]
+
+    def get_stats(self) -> Dict:
+        return {
+            "documents": len(self.ids),
+            "terms": len(self._vocabulary),
+            "postings": int(len(self._postings)),
+            "postings_bytes": int(self._postings.nbytes + self._weights.nbytes + self._offsets.nbytes)
+        }
@@ -0,0 +1,381 @@
+"""
+llm_client.py
+Cevap üretimi için LLM çağrı katmanı: aynı prompt'ların birleştirilmesi,
+token bucket hız sınırı, süre sınırı içinde jitter'lı yeniden deneme ve
+değiştirilebilir backend'ler (Gemini, HTTP)
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Dict, Optional
+
+from src.metrics import MetricsRegistry
+
+
+logger = logging.getLogger(__name__)
+
+# Geçici kabul edilen HTTP durum kodları (kota, aşırı yük, ağ geçidi hataları)
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+# google.api_core hata sınıflarından yeniden denenebilecek olanlar (import etmeden adla eşlenir)
+RETRYABLE_GOOGLE_ERRORS = ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+                           "InternalServerError", "DeadlineExceeded", "GatewayTimeout")
+# LLMClient'ın varsayılan hız sınırı (saniyedeki çağrı); yoğun trafikte kota
+# hatalarını yeniden denemeye bırakmak yerine çağrıları önden yayar
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+
+
+class LLMError(RuntimeError):
+    """LLM çağrısı yeniden denemelere rağmen başarısız oldu"""
+
+
+class LLMTimeoutError(LLMError):
+    """LLM çağrısı süre sınırı içinde tamamlanamadı"""
+
+
+class LLMBackend:
+    """
+    Prompt'u modele gönderen backend'lerin temel sınıfı.
+
+    Alt sınıflar `generate` metodunu yazar; `stream` varsayılan olarak
+    cevabın tamamını tek parça halinde verir. `is_retryable` hatanın geçici
+    olup olmadığına (kota, ağ, aşırı yük) karar verir.
+    """
+
+    name = "llm"
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        yield await asyncio.to_thread(self.generate, prompt, timeout)
+
+    def is_retryable(self, error: Exception) -> bool:
+        return not isinstance(error, (ValueError, TypeError))
+
+
+class ModelBackend(LLMBackend):
+    """
+    `generate_content` / `generate_content_async` sunan bir model nesnesi
+    üzerinde backend (`genai.GenerativeModel` veya benchmark'lardaki sahte model).
+    """
+
+    name = "model"
+
+    def __init__(self, model):
+        self.model = model
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        google-generativeai 0.3.x `generate_content` süre sınırı almadığından
+        çağrı ayrı thread'de yapılır ve sonucu en fazla `timeout` kadar beklenir.
+        """
+        if timeout is None:
+            return self.model.generate_content(prompt).text
+
+        future: Future = Future()
+
+        def run():
+            try:
+                future.set_result(self.model.generate_content(prompt).text)
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="llm-generate", daemon=True).start()
+        try:
+            return future.result(timeout=max(0.0, timeout))
+        except FutureTimeoutError as e:
+            raise TimeoutError(f"{self.name} {timeout:.1f} sn içinde cevap vermedi") from e
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """İsteğin açılması ve parçaların gelmesi `timeout` içinde bitmezse asyncio.TimeoutError"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        response = await asyncio.wait_for(self.model.generate_content_async(prompt, stream=True), timeout)
+        chunks = response.__aiter__()
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+            except StopAsyncIteration:
+                return
+            if chunk.text:
+                yield chunk.text
+
+    def is_retryable(self, error: Exception) -> bool:
+        if type(error).__name__ in RETRYABLE_GOOGLE_ERRORS:
+            return True
+        return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+class GeminiBackend(ModelBackend):
+    """Google Gemini API; google.generativeai yalnızca bu backend oluşturulurken import edilir"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        super().__init__(genai.GenerativeModel(model_name))
+        self.model_name = model_name
+
+
+class HTTPBackend(LLMBackend):
+    """
+    JSON HTTP servisi üzerinde backend: `POST {url}` gövdesi
+    `{"prompt": ...}`, cevabı `{"text": ...}`. Yük testlerinde ve
+    testlerde Gemini yerine yerel sahte LLM sunucusu
+    (`python -m benchmarks.fake_gemini`) kullanmak içindir.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, default_timeout: float = 60.0):
+        self.url = url
+        self.default_timeout = default_timeout
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        request = urllib.request.Request(
+            self.url, data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=timeout or self.default_timeout) as response:
+            return json.loads(response.read().decode("utf-8"))["text"]
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code in RETRYABLE_STATUS
+        return isinstance(error, (urllib.error.URLError, ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """
+    Saniyede `rate` token dolan, en fazla `capacity` token tutan kova.
+
+    `reserve` token'ı hemen ayırır ve token'ın dolması için beklenecek süreyi
+    döndürür; böylece aynı kova hem thread'lerde (`time.sleep`) hem de
+    asyncio'da (`asyncio.sleep`) kullanılabilir ve bekleyenler sırayla çıkar.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("❌ Token bucket hızı pozitif olmalı")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Bir token ayırır.
+
+        Returns:
+            Beklenmesi gereken süre (saniye); token `max_wait` içinde
+            dolmayacaksa hiçbir şey ayırmadan None
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1.0
+            return wait
+
+
+class LLMClient:
+    """
+    Backend'e giden çağrıları yöneten istemci.
+
+    - Aynı anda işlenen aynı prompt tek çağrıyla cevaplanır; sonradan gelenler
+      ilk çağrının sonucunu bekler (popüler bir soru N kez ücretlendirilmez).
+    - Çağrılar `requests_per_second` hızında token bucket ile sınırlanır
+      (varsayılan `DEFAULT_REQUESTS_PER_SECOND`), `max_concurrency`
+      eşzamanlı çağrı sayısını sınırlar.
+    - Geçici hatalar (kota, ağ) üstel ve tam jitter'lı beklemeyle `timeout`
+      süresi dolana kadar en fazla `max_retries` kez yeniden denenir. Kalıcı
+      hatalar ve süre aşımı `LLMError` / `LLMTimeoutError` olarak yükseltilir;
+      yedek cevaba geçme kararı çağırana aittir.
+
+    Akışlı üretimde (`stream`) birleştirme yapılmaz; yeniden deneme yalnızca
+    ilk parça gelmeden önce yapılır.
+    """
+
+    def __init__(self, backend: LLMBackend,
+                 requests_per_second: Optional[float] = DEFAULT_REQUESTS_PER_SECOND,
+                 burst: Optional[float] = None, max_concurrency: Optional[int] = None,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 8.0,
+                 timeout: float = 60.0, metrics: Optional[MetricsRegistry] = None,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            backend: Prompt'u modele gönderen backend
+            requests_per_second: Saniyedeki en fazla çağrı (None veya 0: sınırsız)
+            burst: Token bucket kapasitesi, art arda yapılabilecek çağrı sayısı
+                (None: saniyelik hız kadar)
+            max_concurrency: Aynı anda süren en fazla çağrı (None: sınırsız)
+            max_retries: Geçici hatalarda en fazla yeniden deneme sayısı
+            base_delay: İlk yeniden denemeden önceki en uzun bekleme; her
+                denemede iki katına çıkar
+            max_delay: Yeniden denemeler arasındaki bekleme üst sınırı
+            timeout: Çağrı başına varsayılan süre sınırı (bekleme ve denemeler dahil)
+            metrics: Çağrı, hata, yeniden deneme ve birleştirme sayaçlarının
+                yazılacağı kayıt
+            seed: Jitter için rastgele sayı üreteci seed'i
+        """
+        self.backend = backend
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.bucket = TokenBucket(requests_per_second, burst) if requests_per_second else None
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._random = random.Random(seed)
+        # Prompt -> süren çağrının sonucu
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        metrics = metrics or MetricsRegistry()
+        self._calls_total = metrics.counter(
+            "rag_llm_calls_total", "LLM backend çağrı sayısı (yeniden denemeler dahil)")
+        self._errors_total = metrics.counter(
+            "rag_llm_errors_total", "Hata ile sonuçlanan LLM backend çağrısı sayısı")
+        self._retries_total = metrics.counter(
+            "rag_llm_retries_total", "Geçici hata sonrası yeniden denenen LLM çağrıları")
+        self._coalesced_total = metrics.counter(
+            "rag_llm_coalesced_total", "Süren aynı prompt'un sonucunu paylaşan istekler")
+        self._throttle_seconds = metrics.histogram(
+            "rag_llm_throttle_seconds", "Hız sınırı nedeniyle çağrı öncesi beklenen süre")
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return time.monotonic() + (timeout if timeout is not None else self.timeout)
+
+    def _backoff(self, attempt: int) -> float:
+        """Tam jitter: [0, min(max_delay, base_delay * 2^attempt)] aralığında rastgele"""
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _throttle_wait(self, deadline: float) -> float:
+        """Hız sınırı için beklenecek süre; süre sınırı içinde token yoksa LLMTimeoutError"""
+        if self.bucket is None:
+            return 0.0
+        wait = self.bucket.reserve(max_wait=deadline - time.monotonic())
+        if wait is None:
+            raise LLMTimeoutError("❌ LLM hız sınırı nedeniyle süre sınırı içinde çağrı yapılamadı")
+        self._throttle_seconds.observe(wait)
+        return wait
+
+    def _retry_wait(self, error: Exception, attempt: int, deadline: float) -> float:
+        """Hata yeniden denenecekse beklenecek süre, denenmeyecekse uygun hatayı yükseltir"""
+        self._errors_total.inc()
+        if not self.backend.is_retryable(error):
+            raise LLMError(f"❌ {self.backend.name} hatası: {error}") from error
+        if attempt >= self.max_retries:
+            raise LLMError(f"❌ {self.backend.name} hatası ({attempt + 1} deneme): {error}") from error
+
+        delay = self._backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            raise LLMTimeoutError(f"❌ {self.backend.name} süre sınırı doldu: {error}") from error
+        self._retries_total.inc()
+        logger.warning(f"⚠️ {self.backend.name} geçici hata, {delay:.2f} sn sonra yeniden denenecek: {error}")
+        return delay
+
+    def _call(self, prompt: str, deadline: float) -> str:
+        attempt = 0
+        while True:
+            time.sleep(self._throttle_wait(deadline))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMTimeoutError(f"❌ {self.backend.name} süre sınırı doldu")
+            if self._slots and not self._slots.acquire(timeout=remaining):
+                raise LLMTimeoutError(f"❌ {self.backend.name} eşzamanlılık sınırında süre doldu")
+            try:
+                self._calls_total.inc()
+                return self.backend.generate(prompt, timeout=deadline - time.monotonic())
+            except Exception as e:
+                error = e
+            finally:
+                if self._slots:
+                    self._slots.release()
+            time.sleep(self._retry_wait(error, attempt, deadline))
+            attempt += 1
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Prompt'un cevabını üretir; aynı prompt için süren bir çağrı varsa onu bekler.
+
+        Raises:
+            LLMTimeoutError: Süre sınırı doldu
+            LLMError: Kalıcı hata veya yeniden denemeler tükendi
+        """
+        deadline = self._deadline(timeout)
+        with self._lock:
+            future = self._inflight.get(prompt)
+            owner = future is None
+            if owner:
+                future = self._inflight[prompt] = Future()
+
+        if not owner:
+            self._coalesced_total.inc()
+            try:
+                return future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError as e:
+                raise LLMTimeoutError(f"❌ {self.backend.name} süre sınırı doldu") from e
+
+        try:
+            text = self._call(prompt, deadline)
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(prompt, None)
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Cevabı parça parça üretir; ilk parçadan önceki geçici hatalar yeniden denenir"""
+        deadline = self._deadline(timeout)
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._throttle_wait(deadline))
+            if self._slots and not await asyncio.to_thread(
+                    self._slots.acquire, True, max(0.0, deadline - time.monotonic())):
+                raise LLMTimeoutError(f"❌ {self.backend.name} eşzamanlılık sınırında süre doldu")
+            emitted = False
+            try:
+                self._calls_total.inc()
+                async for delta in self.backend.stream(prompt, timeout=deadline - time.monotonic()):
+                    emitted = True
+                    yield delta
+                return
+            except Exception as e:
+                if emitted:
+                    self._errors_total.inc()
+                    raise LLMError(f"❌ {self.backend.name} akışı yarıda kesildi: {e}") from e
+                error = e
+            finally:
+                if self._slots:
+                    self._slots.release()
+            await asyncio.sleep(self._retry_wait(error, attempt, deadline))
+            attempt += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": self.backend.name,
+            "requests_per_second": self.bucket.rate if self.bucket else None,
+            "max_concurrency": self.max_concurrency,
+            "inflight": len(self._inflight),
+            "calls": self._calls_total.value(),
+            "errors": self._errors_total.value(),
+            "retries": self._retries_total.value(),
+            "coalesced": self._coalesced_total.value()
+        }
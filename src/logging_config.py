@@ -0,0 +1,43 @@
+"""
+logging_config.py
+Uygulama genelinde log seviyesi ve biçiminin ayarlanması
+"""
+
+import logging
+import os
+from typing import Optional, Union
+
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def configure_logging(level: Optional[Union[str, int]] = None,
+                      fmt: Optional[str] = None) -> logging.Logger:
+    """
+    `src` paketinin loglarını stderr'e yazacak şekilde ayarlar.
+
+    Args:
+        level: Log seviyesi ("DEBUG", "INFO", ...). Verilmezse `RAG_LOG_LEVEL`
+            ortam değişkeni, o da yoksa INFO kullanılır
+        fmt: Log biçimi. Verilmezse `RAG_LOG_FORMAT` veya varsayılan biçim
+
+    Returns:
+        `src` paketinin logger'ı
+    """
+    level = level or os.getenv("RAG_LOG_LEVEL", "INFO")
+    if isinstance(level, str):
+        level = level.upper()
+    fmt = fmt or os.getenv("RAG_LOG_FORMAT", DEFAULT_FORMAT)
+
+    logger = logging.getLogger("src")
+    logger.setLevel(level)
+
+    handler = next((h for h in logger.handlers if getattr(h, "_rag_handler", False)), None)
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler._rag_handler = True
+        logger.addHandler(handler)
+        # Kök logger'a ayrıca yazılıp iki kez görünmesin
+        logger.propagate = False
+    handler.setFormatter(logging.Formatter(fmt))
+    return logger
@@ -0,0 +1,115 @@
+"""
+metadata_filter.py
+Chunk metadata'sı üzerinde arama öncesi filtreleme (sayfa aralığı, bölüm, belge)
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+FILTER_KEYS = ("document_id", "region", "section", "page_range")
+
+
+def normalize_filters(filters: Optional[Dict]) -> Optional[Dict]:
+    """
+    Filtreleri doğrular ve tek biçime getirir.
+
+    Desteklenen anahtarlar:
+        document_id: Belge ID'si veya ID listesi
+        region: Bölge adı veya listesi (corpus modunda shard grubu)
+        section: Bölüm başlığı (tam eşleşme)
+        page_range: (ilk, son) sayfa; bu aralıkla kesişen chunk'lar seçilir
+
+    Returns:
+        Boş filtre için None, aksi halde değerleri liste/tuple'a çevrilmiş sözlük
+    """
+    if not filters:
+        return None
+
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"❌ Bilinmeyen filtre: {', '.join(sorted(unknown))} "
+                         f"(seçenekler: {', '.join(FILTER_KEYS)})")
+
+    normalized = {}
+    if filters.get("document_id") is not None:
+        document_ids = filters["document_id"]
+        if isinstance(document_ids, str):
+            document_ids = [document_ids]
+        normalized["document_id"] = tuple(document_ids)
+    if filters.get("region") is not None:
+        regions = filters["region"]
+        if isinstance(regions, str):
+            regions = [regions]
+        normalized["region"] = tuple(regions)
+    if filters.get("section") is not None:
+        normalized["section"] = filters["section"]
+    if filters.get("page_range") is not None:
+        first, last = filters["page_range"]
+        if first > last:
+            raise ValueError(f"❌ Geçersiz sayfa aralığı: {first}-{last}")
+        normalized["page_range"] = (int(first), int(last))
+
+    return normalized or None
+
+
+def filter_key(filters: Optional[Dict]) -> Optional[Tuple]:
+    """Filtrelerin hashlenebilir karşılığı (önbellek anahtarlarında kullanılır)"""
+    filters = normalize_filters(filters)
+    return tuple(sorted(filters.items())) if filters else None
+
+
+def to_chroma_where(filters: Optional[Dict]) -> Optional[Dict]:
+    """Filtreleri ChromaDB `where` ifadesine çevirir"""
+    filters = normalize_filters(filters)
+    if not filters:
+        return None
+
+    conditions = []
+    if "document_id" in filters:
+        conditions.append({"document_id": {"$in": list(filters["document_id"])}})
+    if "region" in filters:
+        conditions.append({"region": {"$in": list(filters["region"])}})
+    if "section" in filters:
+        conditions.append({"section": filters["section"]})
+    if "page_range" in filters:
+        first, last = filters["page_range"]
+        conditions.append({"page_end": {"$gte": first}})
+        conditions.append({"page_start": {"$lte": last}})
+
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+class MetadataColumns:
+    """
+    Filtrelenen metadata alanlarının sütun düzeninde kopyası.
+
+    Filtre, kayıt başına Python döngüsü yerine birkaç vektörel
+    karşılaştırmayla bir boolean maskeye çevrilir.
+    """
+
+    def __init__(self, metadata: List[Dict]):
+        self.page_start = np.array([item.get("page_start", 0) for item in metadata], dtype=np.int32)
+        self.page_end = np.array([item.get("page_end", 0) for item in metadata], dtype=np.int32)
+        self.document_id = np.array([item.get("document_id", "") for item in metadata], dtype=object)
+        self.region = np.array([item.get("region", "") for item in metadata], dtype=object)
+        self.section = np.array([item.get("section", "") for item in metadata], dtype=object)
+
+    def mask(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """Filtreye uyan kayıtlar için True olan maske (filtre yoksa None)"""
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+
+        mask = np.ones(len(self.page_start), dtype=bool)
+        if "document_id" in filters:
+            mask &= np.isin(self.document_id, list(filters["document_id"]))
+        if "region" in filters:
+            mask &= np.isin(self.region, list(filters["region"]))
+        if "section" in filters:
+            mask &= self.section == filters["section"]
+        if "page_range" in filters:
+            first, last = filters["page_range"]
+            mask &= (self.page_end >= first) & (self.page_start <= last)
+        return mask
@@ -0,0 +1,491 @@
+"""
+numpy_vector_store.py
+Tek bir (float32, float16 veya int8) matris üzerinde çalışan, süreç içi (brute-force) vector store
+"""
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.chunk_store import ChunkStore, grow_rows
+from src.vector_store import content_chunk_ids
+from src.metadata_filter import MetadataColumns
+from src.quantization import check_mode, dequantize, dot_scores, mode_of, quantize, squared_norms
+
+
+logger = logging.getLogger(__name__)
+
+# Silinen ve değişen chunk'ların baytları metin tamponunun bu oranını geçince
+# tampon sıkıştırılır (bkz. `ChunkStore.compact`)
+COMPACT_DEAD_RATIO = 0.5
+
+
+def rank_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Her sorgu satırı için en yüksek `k` skorun sütun indekslerini ve
+    skorlarını azalan sırada döndürür (`argpartition` + yalnızca k elemanı sıralama).
+    """
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.tile(np.arange(scores.shape[1]), (len(scores), 1))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+class NumpyVectorStore:
+    """
+    VectorStore ile aynı arayüze sahip NumPy tabanlı vector store.
+
+    Tüm embedding'ler bitişik bir matriste tutulur; arama tek bir
+    matris-vektör çarpımı ve `argpartition` ile yapılır. Matris `.npy`
+    olarak diske yazılır ve açılışta memory-map edilir. Mesafeler
+    ChromaDB'nin varsayılanı olan kare L2 mesafesi olarak döndürülür.
+    Birden fazla sorgu tek bir matris-matris çarpımıyla cevaplanır.
+    Metadata filtreleri skorlamadan önce uygulanır; yalnızca uyan satırlar
+    çarpıma girer.
+
+    Matris varsayılan olarak float32'dir; `quantization="float16"` matrisi
+    yarı boyutta, `"int8"` satır başına bir ölçekle dörtte bir boyutta
+    saklar; skorlar sıkıştırılmış matris üzerinde bloklar halinde hesaplanır.
+
+    Belge metinleri bir `ChunkStore`'da (`.chunks.utf8` + `.chunks.offsets.npy`)
+    tutulur ve açılışta matris gibi memory-map edilir; JSON kayıt dosyasında
+    yalnızca ID'ler ve metadata bulunur. Metin yalnızca sonuç döndürülürken
+    tampondan çözülür. Silinen ve değişen chunk'ların baytları tamponun
+    yarısını geçince güncelleme sonunda tampon sıkıştırılır.
+
+    Matris kapasitesi iki katına çıkarak büyüyen bir tamponda tutulur; ekleme
+    yalnızca yeni satırları yazar, silme silinen satırların yerine sondaki
+    satırları taşır. `bulk_update` bloğu içindeki değişiklikler blok
+    bitince tek seferde diske yazılır.
+    """
+
+    def __init__(self, collection_name: str = "istanbul_bolge_plani",
+                 persist_directory: Optional[str] = None,
+                 quantization: str = "float32"):
+        """
+        Args:
+            collection_name: Koleksiyon adı (dosya adlarında kullanılır)
+            persist_directory: Verilirse matris ve kayıtlar bu klasöre yazılır
+            quantization: Embedding'lerin saklanma biçimi ("float32", "float16", "int8")
+        """
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+        self.quantization = check_mode(quantization)
+        self._lock = threading.RLock()
+        # Satırlar silindiğinde veya yerinde değiştiğinde artar (bkz. `query_batch`)
+        self._generation = 0
+        # İç içe `bulk_update` sayısı ve blok bitince yazılacak değişiklik
+        # (None: yok, False: yalnızca kayıtlar, True: matris de)
+        self._bulk_depth = 0
+        self._pending_write: Optional[bool] = None
+
+        self._set_records(self._empty_matrix(0), [], ChunkStore(path=self._chunks_path), [])
+
+        if persist_directory and os.path.exists(self._matrix_path):
+            self._load()
+            logger.info(f"✅ Mevcut koleksiyon yüklendi: {collection_name} ({self.count()} belge)")
+        else:
+            logger.info(f"✅ Yeni koleksiyon oluşturuldu: {collection_name}")
+
+    @property
+    def _matrix_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection_name}.npy")
+
+    @property
+    def _records_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection_name}.json")
+
+    @property
+    def _scales_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection_name}.scales.npy")
+
+    @property
+    def _chunks_path(self) -> Optional[str]:
+        """ChunkStore dosyalarının ön eki (kalıcı değilse None: metin bellekte tutulur)"""
+        if not self.persist_directory:
+            return None
+        return os.path.join(self.persist_directory, f"{self.collection_name}.chunks")
+
+    def _empty_matrix(self, dimension: int) -> np.ndarray:
+        return quantize(np.zeros((0, dimension), dtype=np.float32), self.quantization)[0]
+
+    def _set_records(self, embeddings: np.ndarray, ids: List[str],
+                     documents: ChunkStore, metadata: List[Dict],
+                     scales: Optional[np.ndarray] = None):
+        # Tamponlar ilk `_count` satırdan sonra boş kapasite içerebilir
+        self._matrix = embeddings
+        self._scale_rows = scales if scales is not None else np.ones(len(ids), dtype=np.float32)
+        self._norm_rows = squared_norms(embeddings, self._scale_rows) if len(ids) else \
+            np.zeros(0, dtype=np.float32)
+        self._count = len(ids)
+        self._ids = ids
+        self._documents = documents
+        self._metadata = metadata
+        self._column_cache: Optional[MetadataColumns] = None
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        self._generation += 1
+
+    @property
+    def _embeddings(self) -> np.ndarray:
+        return self._matrix[:self._count]
+
+    @property
+    def _scales(self) -> np.ndarray:
+        return self._scale_rows[:self._count]
+
+    @property
+    def _squared_norms(self) -> np.ndarray:
+        return self._norm_rows[:self._count]
+
+    @property
+    def _columns(self) -> MetadataColumns:
+        # Filtre sütunları her değişiklikte değil, ilk filtreli sorguda kurulur
+        if self._column_cache is None:
+            self._column_cache = MetadataColumns(self._metadata)
+        return self._column_cache
+
+    @property
+    def chunks(self) -> ChunkStore:
+        """Belge metinlerinin deposu (satır sırasıyla)"""
+        return self._documents
+
+    def _reserve(self, rows: int):
+        """Matris, ölçek ve norm tamponlarını en az `rows` satırlık ve yazılabilir yapar"""
+        self._matrix = grow_rows(self._matrix, self._count, rows)
+        self._scale_rows = grow_rows(self._scale_rows, self._count, rows)
+        self._norm_rows = grow_rows(self._norm_rows, self._count, rows)
+
+    def _rows_added(self, rows: np.ndarray):
+        """Sona satırlar eklendikten sonra çağrılır (alt sınıflar için)"""
+
+    def _rows_changed(self, rows: np.ndarray):
+        """Mevcut satırların embedding'leri değiştikten sonra çağrılır (alt sınıflar için)"""
+
+    def _rows_removed(self, removed: Sequence[int], sources: Sequence[int], targets: Sequence[int]):
+        """
+        Satırlar silinmeden hemen önce çağrılır (alt sınıflar için): `removed`
+        silinen satırlar, `sources` yerleri `targets` olacak sondaki satırlar.
+        """
+
+    def _load(self):
+        with open(self._records_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        embeddings = np.load(self._matrix_path, mmap_mode="r")
+        scales = np.load(self._scales_path) if embeddings.dtype == np.int8 else None
+
+        if "documents" in records:
+            # Eski biçim: metinler JSON içinde; ChunkStore'a taşınır
+            documents = ChunkStore.from_texts(records["documents"],
+                                              [item.get("char_start") for item in records["metadatas"]],
+                                              path=self._chunks_path)
+            rewrite = True
+        else:
+            documents = ChunkStore.open(self._chunks_path)
+            rewrite = False
+
+        if mode_of(embeddings) != self.quantization:
+            # Farklı modla yazılmış matris bu moda çevrilip yeniden yazılır
+            embeddings, scales = quantize(dequantize(embeddings, scales if scales is not None else
+                                                     np.ones(len(embeddings), dtype=np.float32)),
+                                          self.quantization)
+            self._set_records(embeddings, records["ids"], documents, records["metadatas"], scales)
+            self._persist()
+            return
+        self._set_records(embeddings, records["ids"], documents, records["metadatas"], scales)
+        if rewrite:
+            self._persist(matrix=False)
+
+    @contextmanager
+    def bulk_update(self) -> Iterator["NumpyVectorStore"]:
+        """
+        Blok içindeki eklemeler, silmeler ve metadata güncellemeleri diske
+        her çağrıda değil, blok bitince bir kez yazılır. Değişiklikler
+        bellekte hemen aranabilir olur.
+        """
+        with self._lock:
+            self._bulk_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._bulk_depth -= 1
+                if self._bulk_depth == 0 and self._pending_write is not None:
+                    matrix, self._pending_write = self._pending_write, None
+                    self._persist(matrix)
+
+    def _persist(self, matrix: bool = True):
+        """
+        Kayıtları (ve değiştiyse matrisi) diske yazar; `bulk_update` içindeyse
+        blok sonuna erteler. Satırlar değiştiyse önce metin deposu gerekirse
+        sıkıştırılır.
+        """
+        if self._bulk_depth:
+            self._pending_write = bool(self._pending_write) or matrix
+            return
+        if matrix and self._documents.compact(COMPACT_DEAD_RATIO):
+            logger.info(f"🗜️ Chunk metinleri sıkıştırıldı: {self.collection_name} "
+                        f"({len(self._documents.buffer)} bayt)")
+        if self.persist_directory:
+            self._write(matrix)
+
+    def _write(self, matrix: bool):
+        """Kayıtları (ve `matrix` ise matrisi ve chunk konumlarını) atomik olarak diske yazar"""
+        os.makedirs(self.persist_directory, exist_ok=True)
+
+        if matrix:
+            if self.quantization == "int8":
+                scales_tmp = self._scales_path + ".tmp.npy"
+                np.save(scales_tmp, np.ascontiguousarray(self._scales))
+                os.replace(scales_tmp, self._scales_path)
+            matrix_tmp = self._matrix_path + ".tmp.npy"
+            np.save(matrix_tmp, np.ascontiguousarray(self._embeddings))
+            os.replace(matrix_tmp, self._matrix_path)
+            self._documents.flush()
+
+        records_tmp = self._records_path + ".tmp"
+        with open(records_tmp, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "metadatas": self._metadata}, f, ensure_ascii=False)
+        os.replace(records_tmp, self._records_path)
+
+    def reset(self):
+        """Koleksiyonu boşaltır"""
+        with self._lock:
+            self._pending_write = None
+            self._set_records(self._empty_matrix(0), [], ChunkStore(path=self._chunks_path), [])
+            if self.persist_directory:
+                for path in (self._matrix_path, self._records_path, self._scales_path,
+                             self._chunks_path + ".utf8", self._chunks_path + ".offsets.npy"):
+                    if os.path.exists(path):
+                        os.remove(path)
+        logger.info(f"🗑️ Koleksiyon sıfırlandı: {self.collection_name}")
+
+    def add_documents(self, documents: List[str], embeddings: List[List[float]],
+                      batch_size: int = 10, metadata: List[Dict] = None,
+                      ids: List[str] = None):
+        """
+        Belgeleri matrise ekler.
+
+        ID verilmezse chunk metninin hash'inden üretilir; aynı ID'ye sahip
+        kayıtlar üzerine yazılır (upsert). `batch_size` ChromaDB arayüzüyle
+        uyum için vardır, tüm belgeler tek seferde eklenir.
+        """
+        if metadata is None:
+            metadata = [{"source": f"chunk_{i}", "chunk_index": i} for i in range(len(documents))]
+        if ids is None:
+            ids = content_chunk_ids(documents)
+        codes, code_scales = quantize(embeddings, self.quantization)
+
+        with self._lock:
+            if self._count == 0:
+                self._matrix = self._empty_matrix(codes.shape[1])
+            inserts, updates, rows = [], [], []
+            for i, chunk_id in enumerate(ids):
+                row = self._positions.get(chunk_id)
+                if row is None:
+                    inserts.append(i)
+                else:
+                    updates.append(i)
+                    rows.append(row)
+
+            start, end = self._count, self._count + len(inserts)
+            self._reserve(end)
+            if updates:
+                rows = np.asarray(rows)
+                self._matrix[rows], self._scale_rows[rows] = codes[updates], code_scales[updates]
+                self._norm_rows[rows] = squared_norms(codes[updates], code_scales[updates])
+                for i, row in zip(updates, rows.tolist()):
+                    self._metadata[row] = metadata[i]
+                self._generation += 1
+            if inserts:
+                self._matrix[start:end], self._scale_rows[start:end] = codes[inserts], code_scales[inserts]
+                self._norm_rows[start:end] = squared_norms(codes[inserts], code_scales[inserts])
+                self._ids.extend(ids[i] for i in inserts)
+                self._metadata.extend(metadata[i] for i in inserts)
+                self._positions.update((ids[i], start + n) for n, i in enumerate(inserts))
+
+            # Yeni metinler tamponun sonuna eklenir; ardışık chunk'ların örtüşmesi bir kez yazılır
+            self._documents.extend(
+                [documents[i] for i in inserts], [metadata[i].get("char_start") for i in inserts],
+                replace={row: documents[i] for i, row in zip(updates, list(rows))}
+            )
+            self._count = end
+            self._column_cache = None
+            if updates:
+                self._rows_changed(rows)
+            if inserts:
+                self._rows_added(np.arange(start, end))
+            self._persist()
+
+        logger.info(f"⬆️ {len(documents)} belge eklendi")
+
+    def update_metadata(self, ids: List[str], metadata: List[Dict], batch_size: int = 500):
+        """Embedding'e dokunmadan kayıtların metadata'sını günceller"""
+        with self._lock:
+            for chunk_id, item in zip(ids, metadata):
+                row = self._positions.get(chunk_id)
+                if row is not None:
+                    self._metadata[row] = item
+            self._column_cache = None
+            # Matris değişmedi; memory-map edilmiş dosyanın üzerine yazılmaz
+            self._persist(matrix=False)
+
+    def delete(self, ids: List[str], batch_size: int = 500):
+        """
+        Verilen ID'lere sahip kayıtları siler. Silinen satırların yerine
+        sondaki satırlar taşınır; matrisin geri kalanı kopyalanmaz.
+        """
+        if not ids:
+            return
+
+        with self._lock:
+            removed = sorted({self._positions[chunk_id] for chunk_id in ids if chunk_id in self._positions})
+            length = self._count - len(removed)
+            removed_set = set(removed)
+            targets = [row for row in removed if row < length]
+            sources = [row for row in range(length, self._count) if row not in removed_set]
+
+            self._rows_removed(removed, sources, targets)
+            for row in removed:
+                del self._positions[self._ids[row]]
+            self._reserve(self._count)
+            if targets:
+                self._matrix[targets] = self._matrix[sources]
+                self._scale_rows[targets] = self._scale_rows[sources]
+                self._norm_rows[targets] = self._norm_rows[sources]
+                for source, target in zip(sources, targets):
+                    self._ids[target], self._metadata[target] = self._ids[source], self._metadata[source]
+                    self._positions[self._ids[target]] = target
+            self._documents.move_rows(sources, targets, length)
+            del self._ids[length:]
+            del self._metadata[length:]
+            self._count = length
+            self._column_cache = None
+            self._generation += 1
+            self._persist()
+
+        logger.info(f"🗑️ {len(removed)} belge silindi")
+
+    def get_ids(self) -> List[str]:
+        """Koleksiyondaki tüm kayıtların ID'leri"""
+        return list(self._ids)
+
+    def query(self, query_embedding: List[float], n_results: int = 5,
+              filters: Optional[Dict] = None) -> Tuple[List[str], List[str], List[float]]:
+        """Query embedding'e en yakın belgeleri getirir"""
+        return self.query_batch([query_embedding], n_results, filters)[0]
+
+    def query_batch(self, query_embeddings: List[List[float]], n_results: int = 5,
+                    filters: Optional[Dict] = None) -> List[Tuple[List[str], List[str], List[float]]]:
+        """
+        Birden fazla query embedding'i için tek matris çarpımıyla en yakın belgeleri getirir.
+
+        Skorlar kilit dışında, o anki satırların görüntüsü üzerinde hesaplanır;
+        sona eklenen satırlar bu görüntüyü bozmaz. Arada satırlar silindiyse
+        veya yerinde değiştiyse sorgu yeniden hesaplanır.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        while True:
+            with self._lock:
+                generation = self._generation
+                embeddings, scales, norms = self._embeddings, self._scales, self._squared_norms
+                mask = self._columns.mask(filters) if filters else None
+
+            rows = np.flatnonzero(mask) if mask is not None else None
+            if rows is not None:
+                embeddings, scales, norms = embeddings[rows], scales[rows], norms[rows]
+
+            k = min(n_results, len(embeddings))
+            if k == 0:
+                return [([], [], []) for _ in query_embeddings]
+
+            # ||e - q||² = ||e||² - 2 e·q + ||q||²; sıralama için ilk iki terim yeterli
+            scores = 2.0 * dot_scores(embeddings, scales, queries) - norms
+            top, top_scores = rank_rows(scores, k)
+            distances = np.einsum("ij,ij->i", queries, queries)[:, None] - top_scores
+            if rows is not None:
+                top = rows[top]
+
+            with self._lock:
+                if self._generation == generation:
+                    return [self._rows_result(top_rows, row_distances)
+                            for top_rows, row_distances in zip(top, distances)]
+
+    def _rows_result(self, rows: Sequence[int], distances) -> Tuple[List[str], List[str], List[float]]:
+        # Metin yalnızca döndürülen satırlar için çözülür
+        return ([self._documents[i] for i in rows], [self._ids[i] for i in rows],
+                [max(float(d), 0.0) for d in distances])
+
+    def count(self) -> int:
+        """Koleksiyondaki belge sayısı"""
+        return len(self._ids)
+
+    def get_records(self) -> Tuple[List[str], List[Dict]]:
+        """Koleksiyondaki tüm kayıtların ID'leri ve metadata'ları, chunk sırasına göre (metin çözülmez)"""
+        with self._lock:
+            order = sorted(range(len(self._ids)),
+                           key=lambda row: self._metadata[row].get("chunk_index", 0))
+            return [self._ids[row] for row in order], [self._metadata[row] for row in order]
+
+    def get_items(self) -> Tuple[List[str], List[str], List[Dict]]:
+        """Koleksiyondaki tüm kayıtların ID'leri, belgeleri ve metadata'ları, chunk sırasına göre"""
+        with self._lock:
+            ids, metadatas = self.get_records()
+            return ids, self.get_by_ids(ids), metadatas
+
+    def iter_documents(self, ids: Sequence[str]) -> Iterator[str]:
+        """Verilen ID'lerin belgelerini aynı sırayla, birer birer çözerek üretir"""
+        for chunk_id in ids:
+            with self._lock:
+                text = self._documents[self._positions[chunk_id]]
+            yield text
+
+    def get_documents(self) -> List[str]:
+        """Koleksiyondaki tüm belgeleri chunk sırasına göre döndürür"""
+        return self.get_items()[1]
+
+    def get_embeddings(self, ids: List[str]) -> np.ndarray:
+        """Verilen ID'lerin embedding'leri, aynı sırayla float32 matris olarak"""
+        with self._lock:
+            rows = [self._positions[chunk_id] for chunk_id in ids]
+            return dequantize(self._embeddings[rows], self._scales[rows])
+
+    def attach(self, embeddings: np.ndarray, ids: List[str], documents: ChunkStore,
+               metadata: List[Dict], scales: Optional[np.ndarray] = None):
+        """
+        Dışarıda tutulan (örn. snapshot'tan memory-map edilmiş) kayıtları
+        kopyalamadan koleksiyon olarak kullanır. Yalnızca kalıcı olmayan
+        store'larda kullanılabilir; sonraki eklemeler bellekteki kopyaya yapılır.
+        """
+        if self.persist_directory:
+            raise ValueError("❌ attach yalnızca persist_directory olmayan store'larda kullanılabilir")
+        if mode_of(embeddings) != self.quantization:
+            raise ValueError(f"❌ Matris {mode_of(embeddings)}, store {self.quantization} biçiminde")
+        with self._lock:
+            self._set_records(embeddings, list(ids), documents, list(metadata), scales)
+        logger.info(f"✅ Koleksiyon bağlandı: {self.collection_name} ({self.count()} belge)")
+
+    def get_by_ids(self, ids: List[str]) -> List[Optional[str]]:
+        """Verilen ID'lerin belgelerini aynı sırayla döndürür (bulunamayanlar None)"""
+        with self._lock:
+            rows = [self._positions.get(chunk_id) for chunk_id in ids]
+            return [self._documents[row] if row is not None else None for row in rows]
+
+    def get_stats(self) -> Dict:
+        """Veritabanı istatistiklerini döndürür"""
+        return {
+            "collection_name": self.collection_name,
+            "total_documents": self.count(),
+            "persist_directory": self.persist_directory,
+            "quantization": self.quantization,
+            "matrix_bytes": int(self._embeddings.nbytes
+                                + (self._scales.nbytes if self.quantization == "int8" else 0)),
+            "chunk_store": self._documents.get_stats()
+        }
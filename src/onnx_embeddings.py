@@ -0,0 +1,281 @@
+"""
+onnx_embeddings.py
+sentence-transformers modellerinin ONNX Runtime ile (isteğe bağlı dinamik int8
+quantization'la) CPU üzerinde çalıştırılması
+
+Kullanım:
+    python -m src.onnx_embeddings export sentence-transformers/all-MiniLM-L6-v2 models/minilm-onnx --int8
+    python -m src.onnx_embeddings parity sentence-transformers/all-MiniLM-L6-v2 --model-dir models/minilm-onnx --int8
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.embeddings import _model_directories, _read_json
+
+
+logger = logging.getLogger(__name__)
+
+
+ONNX_FILENAME = "model.onnx"
+INT8_FILENAME = "model_int8.onnx"
+
+# Parity kontrolünde kullanılan varsayılan metinler
+PARITY_SAMPLES = (
+    "İstanbul'un 2024-2028 dönemi ulaşım hedefleri nelerdir?",
+    "Raylı sistem ağının genişletilmesi ve deniz ulaşımının güçlendirilmesi planlanmaktadır.",
+    "Kentsel dönüşüm projelerinde afet riski yüksek alanlara öncelik verilecektir.",
+    "Yeşil alan miktarının kişi başına artırılması sürdürülebilirlik hedefleri arasındadır.",
+    "Bölge planı ekonomik kalkınma, sosyal içerme ve çevre politikalarını kapsar.",
+    "metro",
+)
+
+
+def _onnx_path(model_dir: str, filename: str) -> Optional[str]:
+    """Model klasöründe (veya HuggingFace düzenindeki `onnx/` alt klasöründe) dosyayı arar"""
+    for path in (os.path.join(model_dir, filename), os.path.join(model_dir, "onnx", filename)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def find_onnx_model_dir(model_name: str) -> Optional[str]:
+    """`model.onnx` ve `tokenizer.json` içeren ilk yerel klasör (yoksa None)"""
+    for directory in _model_directories(model_name):
+        if _onnx_path(directory, ONNX_FILENAME) and os.path.exists(os.path.join(directory, "tokenizer.json")):
+            return directory
+    return None
+
+
+def quantize_onnx(model_path: str, output_path: str) -> str:
+    """
+    Ağırlıkları dinamik int8 quantization ile sıkıştırır: MatMul/Gemm
+    ağırlıkları int8 saklanır, aktivasyonlar çalışma anında ölçeklenir.
+    Kalibrasyon verisi gerekmez.
+    """
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as error:
+        raise RuntimeError("❌ int8 quantization için `onnx` paketi gerekli (pip install onnx)") from error
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    logger.info(f"🗜️ int8 ONNX modeli yazıldı: {output_path} "
+                f"({os.path.getsize(model_path) / 1e6:.1f} MB -> {os.path.getsize(output_path) / 1e6:.1f} MB)")
+    return output_path
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = False, opset: int = 14) -> str:
+    """
+    sentence-transformers modelinin transformer katmanını ONNX'e aktarır.
+
+    Klasöre `model.onnx`, tokenizer dosyaları ve pooling ayarları yazılır;
+    `quantize` ise yanına `model_int8.onnx` eklenir. Yalnızca dışa aktarım
+    torch ve transformers gerektirir, çalıştırma gerektirmez.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["örnek cümle"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_FILENAME)
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in input_names), model_path,
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=opset)
+    tokenizer.save_pretrained(output_dir)
+
+    # Pooling ve dizi uzunluğu ayarları indirilmiş sentence-transformers klasöründen kopyalanır
+    for directory in _model_directories(model_name):
+        for filename in ("1_Pooling/config.json", "sentence_bert_config.json"):
+            source = os.path.join(directory, filename)
+            if os.path.exists(source):
+                os.makedirs(os.path.dirname(os.path.join(output_dir, filename)), exist_ok=True)
+                shutil.copyfile(source, os.path.join(output_dir, filename))
+
+    logger.info(f"📤 ONNX modeli yazıldı: {model_path}")
+    if quantize:
+        quantize_onnx(model_path, os.path.join(output_dir, INT8_FILENAME))
+    return output_dir
+
+
+def cosine_agreement(candidate: Sequence[Sequence[float]], reference: Sequence[Sequence[float]],
+                     min_cosine: float = 0.99) -> Dict:
+    """İki backend'in aynı metinler için ürettiği embedding'lerin satır bazında cosine benzerliği"""
+    a = np.asarray(candidate, dtype=np.float32)
+    b = np.asarray(reference, dtype=np.float32)
+    if a.shape != b.shape:
+        raise ValueError(f"❌ Embedding boyutları farklı: {a.shape} / {b.shape}")
+    cosines = np.einsum("ij,ij->i", a, b) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+    return {
+        "texts": len(cosines),
+        "min_cosine": round(float(cosines.min()), 6) if len(cosines) else None,
+        "mean_cosine": round(float(cosines.mean()), 6) if len(cosines) else None,
+        "threshold": min_cosine,
+        "passed": bool(len(cosines) and cosines.min() >= min_cosine)
+    }
+
+
+class OnnxEmbeddings:
+    """
+    LangChain HuggingFaceEmbeddings ile aynı arayüzlü (`embed_documents`,
+    `embed_query`) ONNX Runtime embedding modeli.
+
+    Tokenizer Rust `tokenizers` ile, transformer ONNX Runtime ile çalışır;
+    torch yüklenmez. Metinler token uzunluğuna göre sıralanıp batch'lere
+    ayrılır, böylece padding en aza iner. Çıkış sentence-transformers gibi
+    attention mask'e göre ortalanır (veya CLS) ve L2 normalize edilir.
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = False, batch_size: int = 32,
+                 max_length: Optional[int] = None, num_threads: Optional[int] = None):
+        """
+        Args:
+            model_dir: `model.onnx` ve `tokenizer.json` içeren klasör
+            quantize: True ise `model_int8.onnx` kullanılır; yoksa oluşturulur
+            batch_size: Tek ONNX çağrısındaki en fazla metin
+            max_length: Token sınırı (None: `sentence_bert_config.json` veya 256)
+            num_threads: ONNX Runtime intra-op thread sayısı (None: CPU sayısı)
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = _onnx_path(model_dir, INT8_FILENAME if quantize else ONNX_FILENAME)
+        if model_path is None and quantize:
+            source = _onnx_path(model_dir, ONNX_FILENAME)
+            if source is None:
+                raise RuntimeError(f"❌ ONNX modeli bulunamadı: {model_dir}")
+            model_path = quantize_onnx(source, os.path.join(os.path.dirname(source), INT8_FILENAME))
+        if model_path is None:
+            raise RuntimeError(f"❌ ONNX modeli bulunamadı: {model_dir}")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {item.name for item in self.session.get_inputs()}
+
+        config = _read_json(os.path.join(model_dir, "sentence_bert_config.json")) or {}
+        pooling = _read_json(os.path.join(model_dir, "1_Pooling", "config.json")) or {}
+        self.max_length = max_length or config.get("max_seq_length") or 256
+        self.pooling = "cls" if pooling.get("pooling_mode_cls_token") else "mean"
+        self.batch_size = batch_size
+        self.model_path = model_path
+        self.quantized = quantize
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.max_length)
+        self.tokenizer.no_padding()
+
+    def _run(self, encodings: List) -> np.ndarray:
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = encoding.attention_mask
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        output = self.session.run(None, {name: feeds[name] for name in self._input_names})[0]
+
+        if output.ndim == 2:
+            # Model pooling'i kendisi yapıyor (sentence_embedding çıkışı)
+            pooled = output
+        elif self.pooling == "cls":
+            pooled = output[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        encodings = self.tokenizer.encode_batch(list(texts))
+        # Benzer uzunluktaki metinler aynı batch'e düşer, padding azalır
+        order = np.argsort([len(encoding.ids) for encoding in encodings], kind="stable")
+
+        embeddings = None
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            pooled = self._run([encodings[row] for row in rows])
+            if embeddings is None:
+                embeddings = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            embeddings[rows] = pooled
+        return embeddings.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    @classmethod
+    def from_pretrained(cls, model_name: str, model_dir: Optional[str] = None, **kwargs) -> "OnnxEmbeddings":
+        """`model_dir` verilmezse modelin yerel önbellek klasörlerinde ONNX dosyası aranır"""
+        model_dir = model_dir or find_onnx_model_dir(model_name)
+        if model_dir is None:
+            raise RuntimeError(
+                f"❌ {model_name} için ONNX modeli bulunamadı; "
+                f"`python -m src.onnx_embeddings export {model_name} <klasör>` ile oluşturup "
+                f"onnx_options={{'model_dir': '<klasör>'}} verin"
+            )
+        return cls(model_dir, **kwargs)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Embedding modelinin ONNX sürümü: dışa aktarım ve parity kontrolü")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Modeli ONNX'e aktarır (torch ve transformers gerekir)")
+    export.add_argument("model_name")
+    export.add_argument("output_dir")
+    export.add_argument("--int8", action="store_true", help="Dinamik int8 sürümünü de yaz")
+    export.add_argument("--opset", type=int, default=14)
+
+    parity = commands.add_parser("parity", help="ONNX çıktısını PyTorch çıktısıyla karşılaştırır")
+    parity.add_argument("model_name")
+    parity.add_argument("--model-dir", help="ONNX model klasörü (varsayılan: yerel önbellek)")
+    parity.add_argument("--int8", action="store_true")
+    parity.add_argument("--min-cosine", type=float, default=0.99)
+    parity.add_argument("--texts", help="Her satırı bir metin olan dosya (varsayılan: örnek cümleler)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    from src.embeddings import EmbeddingManager
+    from src.logging_config import configure_logging
+
+    args = parse_args(argv)
+    configure_logging()
+
+    if args.command == "export":
+        print(export_onnx(args.model_name, args.output_dir, quantize=args.int8, opset=args.opset))
+        return
+
+    texts = None
+    if args.texts:
+        with open(args.texts, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    embedder = EmbeddingManager(args.model_name, backend="onnx",
+                                onnx_options={"model_dir": args.model_dir, "quantize": args.int8})
+    report = embedder.check_parity(texts, min_cosine=args.min_cosine)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not report["passed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
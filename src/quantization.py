@@ -0,0 +1,135 @@
+"""
+quantization.py
+Embedding matrisinin float16 veya int8 (satır başına ölçekli) olarak sıkıştırılması
+ve sıkıştırılmış matris üzerinde skor hesabı
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+QUANTIZATION_MODES = ("float32", "float16", "int8")
+
+_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Skorlama sırasında float32'ye açılan satır bloğu; geçici bellek blok boyutuyla sınırlı kalır
+SCORE_BLOCK_ROWS = 8192
+
+
+def check_mode(mode: str) -> str:
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"❌ Bilinmeyen quantization: {mode} (seçenekler: {', '.join(QUANTIZATION_MODES)})")
+    return mode
+
+
+def mode_of(codes: np.ndarray) -> str:
+    """Saklanan matrisin dtype'ından quantization modu"""
+    for mode, dtype in _DTYPES.items():
+        if codes.dtype == dtype:
+            return mode
+    raise ValueError(f"❌ Desteklenmeyen embedding dtype: {codes.dtype}")
+
+
+def quantize(vectors: np.ndarray, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vektörleri verilen modda kodlar.
+
+    int8 modunda her satır kendi en büyük mutlak değeriyle [-127, 127]
+    aralığına ölçeklenir (simetrik skaler quantization). Diğer modlarda
+    ölçekler 1'dir.
+
+    Returns:
+        (kodlar, satır başına float32 ölçekler)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    ones = np.ones(len(vectors), dtype=np.float32)
+
+    check_mode(mode)
+    if mode != "int8":
+        return vectors.astype(_DTYPES[mode]), ones
+
+    peaks = np.abs(vectors).max(axis=1) if vectors.shape[1] else np.zeros(len(vectors), dtype=np.float32)
+    scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Kodları yaklaşık float32 vektörlere geri çevirir"""
+    vectors = np.asarray(codes, dtype=np.float32)
+    if codes.dtype == np.int8:
+        vectors = vectors * scales[:, None]
+    return vectors
+
+
+def dot_scores(codes: np.ndarray, scales: np.ndarray, queries: np.ndarray,
+               block_rows: int = SCORE_BLOCK_ROWS) -> np.ndarray:
+    """
+    Sorgular ile saklanan vektörlerin iç çarpımları, (sorgu, satır) matrisi.
+
+    float32 matris doğrudan BLAS ile çarpılır. float16/int8 matris bloklar
+    halinde float32'ye açılıp çarpılır ve int8 için satır ölçeğiyle
+    çarpılır; böylece tam matrisin float32 kopyası hiç oluşmaz.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    if codes.dtype == np.float32:
+        return queries @ codes.T
+
+    scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+    for start in range(0, len(codes), block_rows):
+        block = np.asarray(codes[start:start + block_rows], dtype=np.float32)
+        scores[:, start:start + len(block)] = queries @ block.T
+    if codes.dtype == np.int8:
+        scores *= scales
+    return scores
+
+
+def squared_norms(codes: np.ndarray, scales: np.ndarray,
+                  block_rows: int = SCORE_BLOCK_ROWS) -> np.ndarray:
+    """Saklanan (kodlanmış) vektörlerin kare normları"""
+    norms = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), block_rows):
+        block = dequantize(codes[start:start + block_rows], scales[start:start + block_rows])
+        norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+    return norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else \
+        np.tile(np.arange(scores.shape[1]), (len(scores), 1))
+    return top
+
+
+def recall_at_k(vectors: np.ndarray, queries: np.ndarray, mode: str, k: int = 10) -> Dict:
+    """
+    Quantization'ın arama kalitesine etkisini ölçer.
+
+    Aynı sorgular tam hassasiyetli (float32) ve `mode` ile kodlanmış
+    matriste kare L2 mesafesiyle aranır; tam aramanın ilk `k` sonucundan
+    kaçının quantize edilmiş aramada da ilk `k` içinde olduğu ortalanır.
+
+    Returns:
+        recall@k, k ve iki matrisin bayt cinsinden boyutları
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+    if k == 0 or len(queries) == 0:
+        return {"mode": mode, "k": k, "recall": None}
+
+    codes, scales = quantize(vectors, mode)
+    exact = 2.0 * (queries @ vectors.T) - np.einsum("ij,ij->i", vectors, vectors)
+    approx = 2.0 * dot_scores(codes, scales, queries) - squared_norms(codes, scales)
+
+    hits = [len(set(expected) & set(found))
+            for expected, found in zip(_top_k(exact, k), _top_k(approx, k))]
+    return {
+        "mode": mode,
+        "k": k,
+        "recall": float(np.mean(hits)) / k,
+        "float32_bytes": int(vectors.nbytes),
+        "bytes": int(codes.nbytes + (scales.nbytes if mode == "int8" else 0))
+    }
@@ -0,0 +1,428 @@
+"""
+query_server.py
+Eşzamanlı soruları kısa bir zaman penceresinde toplayıp birlikte işleyen
+(micro-batching) yerel HTTP/JSON soru-cevap servisi
+
+Kullanım:
+    python -m src.query_server Data/2024-2028-İstanbul-bölge-planı-taslak.pdf --port 8000
+    curl -X POST localhost:8000/query -d '{"question": "Ulaşım hedefleri nelerdir?"}'
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from src.llm_client import DEFAULT_REQUESTS_PER_SECOND, LLMError, LLMTimeoutError
+from src.metadata_filter import filter_key, normalize_filters
+from src.metrics import CONTENT_TYPE
+from src.rag_pipeline import RAGPipeline
+
+
+logger = logging.getLogger(__name__)
+
+# Tek istek gövdesinin en fazla boyutu (bayt)
+MAX_BODY_BYTES = 64 * 1024
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class ServerOverloadedError(RuntimeError):
+    """Bekleyen istek sınırı dolu; istemci daha sonra tekrar denemeli"""
+
+
+class _QueryHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Eşzamanlı bağlantı patlamalarında bağlantılar kabul kuyruğunda beklesin, reddedilmesin
+    request_queue_size = 256
+
+
+class _Request:
+    __slots__ = ("question", "n_results", "filters", "use_gemini", "enqueued_at", "deadline", "future")
+
+    def __init__(self, question: str, n_results: int, filters: Optional[Dict],
+                 use_gemini: Optional[bool], deadline: float):
+        self.question = question
+        self.n_results = n_results
+        self.filters = filters
+        self.use_gemini = use_gemini
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+        self.future: Future = Future()
+
+
+def _resolve(future: Future, result=None, error: Optional[BaseException] = None):
+    """Future'ı sonuçlandırır; süre aşımıyla zaten sonlanmışsa sessizce geçer"""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class MicroBatcher:
+    """
+    Soruları toplayıp RAGPipeline'a toplu halde veren zamanlayıcı.
+
+    İlk soru geldikten sonra `max_wait` saniye boyunca (ya da
+    `max_batch_size` soruya ulaşana kadar) gelen sorular tek bir gruba
+    alınır. Grup tek model çağrısında embed edilir ve tek toplu aramayla
+    getirilir (`prepare_batch`); cevaplar ayrı bir thread havuzunda
+    üretildiğinden sonraki grup LLM cevaplarını beklemez.
+
+    Aynı anda işlenen istek sayısı `max_pending` ile sınırlıdır; sınır
+    doluyken gelen istekler `ServerOverloadedError` ile reddedilir. Süresi
+    dolan istekler işlenmeden `TimeoutError` ile sonlandırılır.
+    """
+
+    def __init__(self, pipeline: RAGPipeline, max_batch_size: int = 32,
+                 max_wait: float = 0.01, max_pending: int = 256,
+                 generation_workers: int = 8, default_timeout: float = 30.0):
+        """
+        Args:
+            pipeline: İndekslenmiş pipeline (RAGPipeline veya CorpusPipeline)
+            max_batch_size: Bir grupta en fazla soru
+            max_wait: İlk sorudan sonra diğer soruların beklendiği süre (saniye)
+            max_pending: Kuyrukta ve cevap üretiminde olabilecek en fazla istek
+            generation_workers: Eşzamanlı cevap üretimi (LLM çağrısı) sayısı
+            default_timeout: İstek başına varsayılan süre sınırı (saniye)
+        """
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, generation_workers),
+                                            thread_name_prefix="rag-generate")
+
+        metrics = pipeline.metrics
+        self._batch_sizes = metrics.histogram("rag_server_batch_size", "Bir grupta işlenen soru sayısı",
+                                              buckets=BATCH_SIZE_BUCKETS)
+        self._requests_total = metrics.counter("rag_server_requests_total", "Sunucu istekleri",
+                                               labels=("status",))
+        self._queue_wait = metrics.histogram("rag_server_queue_wait_seconds",
+                                             "İsteğin gruba alınana kadar beklediği süre")
+        self._pending_gauge = metrics.gauge("rag_server_pending_requests", "İşlenmekte olan istekler")
+
+        self._thread = threading.Thread(target=self._run, name="rag-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, question: str, n_results: int = 5, filters: Optional[Dict] = None,
+               use_gemini: Optional[bool] = None, timeout: Optional[float] = None) -> Future:
+        """
+        Soruyu kuyruğa ekler; sonucu `query` ile aynı sözlük olan bir Future döndürür.
+
+        Raises:
+            ServerOverloadedError: Bekleyen istek sınırı doluysa
+            ValueError: Filtreler geçersizse
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("❌ MicroBatcher kapatıldı")
+        filters = normalize_filters(filters)
+
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                self._requests_total.inc(status="rejected")
+                raise ServerOverloadedError(f"❌ Bekleyen istek sınırı dolu ({self.max_pending})")
+            self._pending += 1
+            self._pending_gauge.set(self._pending)
+
+        request = _Request(question, n_results, filters, use_gemini,
+                           time.monotonic() + (timeout or self.default_timeout))
+        request.future.add_done_callback(self._on_done)
+        self._queue.put(request)
+        return request.future
+
+    def query(self, question: str, n_results: int = 5, filters: Optional[Dict] = None,
+              use_gemini: Optional[bool] = None, timeout: Optional[float] = None) -> Dict:
+        """Soruyu gruba ekler ve cevabı bekler (süre dolarsa TimeoutError)"""
+        timeout = timeout or self.default_timeout
+        future = self.submit(question, n_results, filters, use_gemini, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            error = TimeoutError(f"❌ Soru {timeout:.1f} sn içinde cevaplanamadı")
+            # İşlenmeye başlamış istekler iptal edilemez; sonuçlandırılarak cevap üretimi atlanır
+            if not future.cancel():
+                _resolve(future, error=error)
+            raise error
+
+    def _on_done(self, future: Future):
+        with self._pending_lock:
+            self._pending -= 1
+            self._pending_gauge.set(self._pending)
+        if future.cancelled():
+            self._requests_total.inc(status="cancelled")
+        elif isinstance(future.exception(), TimeoutError):
+            self._requests_total.inc(status="timeout")
+        elif future.exception() is not None:
+            self._requests_total.inc(status="error")
+        else:
+            self._requests_total.inc(status="ok")
+
+    def _collect(self) -> List[_Request]:
+        """İlk isteği bekler, ardından pencere dolana kadar gelenleri ekler"""
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        else:
+            return []
+
+        batch = [first]
+        window_end = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = window_end - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if batch:
+                try:
+                    self._process(batch)
+                except Exception as e:
+                    logger.exception(f"❌ Grup işlenemedi: {e}")
+                    for request in batch:
+                        _resolve(request.future, error=e)
+
+    def _process(self, batch: List[_Request]):
+        now = time.monotonic()
+        groups: Dict[tuple, List[_Request]] = {}
+        for request in batch:
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            if now > request.deadline:
+                _resolve(request.future, error=TimeoutError("❌ İstek kuyrukta beklerken süresi doldu"))
+                continue
+            self._queue_wait.observe(now - request.enqueued_at)
+            key = (request.n_results, filter_key(request.filters), request.use_gemini)
+            groups.setdefault(key, []).append(request)
+
+        # Aynı arama parametrelerine sahip sorular tek embedding + tek arama çağrısında işlenir
+        for requests in groups.values():
+            self._batch_sizes.observe(len(requests))
+            first = requests[0]
+            try:
+                prepared = self.pipeline.prepare_batch(
+                    [request.question for request in requests], first.n_results,
+                    first.use_gemini, first.filters
+                )
+            except Exception as e:
+                for request in requests:
+                    _resolve(request.future, error=e)
+                continue
+
+            for request, item in zip(requests, prepared):
+                if "result" in item:
+                    _resolve(request.future, item["result"])
+                else:
+                    self._executor.submit(self._answer, request, item)
+
+    def _answer(self, request: _Request, item: Dict):
+        if request.future.done():
+            return
+        if time.monotonic() > request.deadline:
+            _resolve(request.future, error=TimeoutError("❌ Cevap üretimi başlamadan süre doldu"))
+            return
+        try:
+            _resolve(request.future, self.pipeline.answer_prepared(item))
+        except Exception as e:
+            _resolve(request.future, error=e)
+
+    def get_stats(self) -> Dict:
+        return {
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+            "batches": self._batch_sizes.count(),
+            "batch_size_p50": self._batch_sizes.quantile(0.5)
+        }
+
+    def close(self):
+        """Yeni istekleri durdurur; kuyruktaki istekler iptal edilir"""
+        self._stopped.set()
+        self._thread.join()
+        while True:
+            try:
+                self._queue.get_nowait().future.cancel()
+            except queue.Empty:
+                break
+        self._executor.shutdown(wait=True)
+
+
+def create_server(batcher: MicroBatcher, host: str = "127.0.0.1",
+                  port: int = 8000) -> ThreadingHTTPServer:
+    """
+    MicroBatcher'ı HTTP üzerinden sunan sunucuyu oluşturur (`serve_forever` ile çalıştırılır).
+
+    Uç noktalar:
+        POST /query   {"question", "n_results", "filters", "use_gemini", "timeout"}
+        GET  /health  Sunucu ayakta mı, bekleyen istek sayısı
+        GET  /stats   Pipeline ve gruplama istatistikleri
+        GET  /metrics Prometheus metin formatında metrikler
+    """
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self._send(status, body, "application/json; charset=utf-8", headers)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/health":
+                self._send_json(200, {"status": "ok", "pending": batcher.pending})
+            elif path == "/stats":
+                self._send_json(200, {"server": batcher.get_stats(), "pipeline": batcher.pipeline.get_stats()})
+            elif path == "/metrics":
+                self._send(200, batcher.pipeline.export_metrics().encode("utf-8"), CONTENT_TYPE)
+            else:
+                self._send_json(404, {"error": "Bulunamadı"})
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/query":
+                self._send_json(404, {"error": "Bulunamadı"})
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                self._send_json(413, {"error": f"İstek gövdesi en fazla {MAX_BODY_BYTES} bayt olabilir"},
+                                {"Connection": "close"})
+                self.close_connection = True
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                question = payload.get("question")
+                if not isinstance(question, str) or not question.strip():
+                    raise ValueError("❌ 'question' alanı boş olmayan bir metin olmalı")
+                result = batcher.query(
+                    question.strip(),
+                    n_results=int(payload.get("n_results", 5)),
+                    filters=payload.get("filters"),
+                    use_gemini=payload.get("use_gemini"),
+                    timeout=float(payload["timeout"]) if payload.get("timeout") else None
+                )
+            except ServerOverloadedError as e:
+                self._send_json(429, {"error": str(e)}, {"Retry-After": "1"})
+            except (TimeoutError, FutureTimeoutError, LLMTimeoutError) as e:
+                self._send_json(504, {"error": str(e)})
+            except LLMError as e:
+                # Yalnızca llm_fallback=False iken yükselir
+                self._send_json(503, {"error": str(e)}, {"Retry-After": "1"})
+            except (ValueError, TypeError, AttributeError) as e:
+                self._send_json(400, {"error": str(e)})
+            except Exception as e:
+                logger.exception(f"❌ Soru cevaplanamadı: {e}")
+                self._send_json(500, {"error": str(e)})
+            else:
+                self._send_json(200, result)
+
+        def log_message(self, format, *args):
+            logger.debug(f"🌐 {self.address_string()} {format % args}")
+
+    return _QueryHTTPServer((host, port), QueryHandler)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="RAG soru-cevap HTTP servisi (micro-batching)")
+    parser.add_argument("pdf_path", nargs="?",
+                        help="PDF dosyası veya PDF'lerin bulunduğu klasör (corpus modu)")
+    parser.add_argument("--snapshot", help="İndeksi PDF yerine bu snapshot dosyasından aç "
+                                           "(bkz. python -m src.index_snapshot build)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--index-dir", default="index_store")
+    parser.add_argument("--backend", default="chroma", choices=["chroma", "numpy", "ivf"])
+    parser.add_argument("--gemini", action="store_true", help="Cevapları Gemini API ile üret")
+    parser.add_argument("--embedding-backend", default="torch", choices=["torch", "onnx"],
+                        help="Soru embedding'lerinin çalıştırılacağı backend")
+    parser.add_argument("--onnx-model-dir", help="ONNX model klasörü (bkz. python -m src.onnx_embeddings export)")
+    parser.add_argument("--onnx-int8", action="store_true", help="Dinamik int8 quantize edilmiş ONNX modeli")
+    parser.add_argument("--llm-rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help="Saniyedeki en fazla LLM çağrısı (0: sınırsız)")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="Grup penceresi: ilk sorudan sonra diğerlerinin beklendiği süre")
+    parser.add_argument("--max-pending", type=int, default=256,
+                        help="Bu sayıda istek işlenirken yenileri 429 ile reddedilir")
+    parser.add_argument("--workers", type=int, default=8, help="Eşzamanlı cevap üretimi")
+    parser.add_argument("--timeout", type=float, default=30.0, help="İstek başına süre sınırı (sn)")
+    args = parser.parse_args(argv)
+    if not args.pdf_path and not args.snapshot:
+        parser.error("pdf_path veya --snapshot verilmeli")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    from src.corpus_pipeline import CorpusPipeline
+    from src.logging_config import configure_logging
+
+    args = parse_args(argv)
+    configure_logging()
+
+    options = dict(llm_options={"requests_per_second": args.llm_rps},
+                   embedding_backend=args.embedding_backend,
+                   embedding_options={"model_dir": args.onnx_model_dir, "quantize": args.onnx_int8})
+    if args.snapshot:
+        pipeline = RAGPipeline.from_snapshot(args.snapshot, use_gemini=args.gemini,
+                                             vector_backend="ivf" if args.backend == "ivf" else "numpy",
+                                             **options)
+    else:
+        pipeline_class = CorpusPipeline if os.path.isdir(args.pdf_path) else RAGPipeline
+        pipeline = pipeline_class(args.pdf_path, use_gemini=args.gemini, index_dir=args.index_dir,
+                                  vector_backend=args.backend, **options)
+        pipeline.index_document()
+    pipeline.embedder.warm_up(background=False)
+
+    batcher = MicroBatcher(pipeline, max_batch_size=args.max_batch_size,
+                           max_wait=args.max_wait_ms / 1000, max_pending=args.max_pending,
+                           generation_workers=args.workers, default_timeout=args.timeout)
+    server = create_server(batcher, args.host, args.port)
+    logger.info(f"🌐 Soru-cevap servisi: http://{args.host}:{args.port}/query")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,80 +3,682 @@ rag_pipeline.py
 Ana RAG (Retrieval Augmented Generation) pipeline
 """
 
+import logging
 import os
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import google.generativeai as genai
-from typing import List, Dict
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
-from src.data_processor import PDFProcessor
+from src.chunk_store import ChunkStore
+from src.data_processor import PDFProcessor, document_id_for
 from src.embeddings import EmbeddingManager
-from src.vector_store import VectorStore
+from src.vector_store import VectorStore, content_chunk_ids
+from src.numpy_vector_store import NumpyVectorStore
+from src.ivf_vector_store import IVFVectorStore
+from src.index_manifest import IndexManifest, MANIFEST_VERSION
+from src.index_snapshot import IndexSnapshot, write_snapshot
+from src.quantization import quantize
+from src.answer_cache import SemanticAnswerCache
+from src.answer_stream import AnswerStream
+from src.lexical_index import BM25Index, reciprocal_rank_fusion
+from src.context_builder import ContextBuilder
+from src.metadata_filter import MetadataColumns, filter_key
+from src.metrics import MetricsRegistry
+from src.llm_client import GeminiBackend, HTTPBackend, LLMBackend, LLMClient, LLMError
+
+
+logger = logging.getLogger(__name__)
 
 
 class RAGPipeline:
     """RAG sisteminin ana sınıfı"""
     
-    def __init__(self, pdf_path: str, use_gemini: bool = False):
+    def __init__(self, pdf_path: str, use_gemini: bool = False,
+                 index_dir: Optional[str] = "index_store",
+                 extract_workers: Optional[int] = None,
+                 answer_cache_threshold: Optional[float] = 0.95,
+                 vector_backend: str = "chroma", hybrid_search: bool = True,
+                 context_token_budget: Optional[int] = 1500,
+                 embedder: Optional[EmbeddingManager] = None, region: str = "",
+                 metrics: Optional[MetricsRegistry] = None,
+                 vector_quantization: str = "float32",
+                 vector_store_options: Optional[Dict] = None,
+                 llm_backend: Optional[LLMBackend] = None,
+                 llm_options: Optional[Dict] = None, llm_fallback: bool = True,
+                 embedding_backend: str = "torch", embedding_options: Optional[Dict] = None):
+        """
+        Args:
+            pdf_path: İndekslenecek PDF dosyası
+            use_gemini: Cevap üretiminde Gemini API kullanılsın mı
+            index_dir: Kalıcı indeks klasörü. None verilirse indeks bellekte tutulur
+                ve her çalıştırmada yeniden oluşturulur
+            extract_workers: PDF sayfalarını paralel okuyacak süreç sayısı
+                (None: CPU sayısı, 1: seri okuma)
+            answer_cache_threshold: Önceki bir soruya bu cosine benzerliğinin
+                üzerinde benzeyen sorulara kayıtlı cevap döndürülür (None: kapalı)
+            vector_backend: "chroma" (ChromaDB), "numpy" (süreç içi,
+                memory-map edilen matris) veya "ivf" (numpy + yaklaşık en yakın
+                komşu indeksi, büyük koleksiyonlar için)
+            hybrid_search: True ise vektör araması BM25 anahtar kelime aramasıyla
+                reciprocal rank fusion kullanılarak birleştirilir
+            context_token_budget: Cevap üretimine verilen bağlamın en fazla
+                token sayısı (None: sınırsız)
+            embedder: Paylaşılan embedding yöneticisi (verilmezse yenisi oluşturulur;
+                corpus modunda tüm shard'lar aynı modeli kullanır)
+            region: Chunk metadata'sına yazılan bölge adı (corpus modunda shard grubu)
+            metrics: Aşama süreleri, sayaçlar ve indeks boyutlarının yazılacağı
+                kayıt (verilmezse pipeline'a özel yenisi oluşturulur)
+            vector_quantization: numpy backend'inde embedding'lerin saklanma
+                biçimi: "float32", "float16" veya "int8" (satır başına ölçekli)
+            vector_store_options: Vector store'a iletilen ek ayarlar, örn. ivf
+                için `{"n_lists": 1024, "nprobe": 16}`
+            llm_backend: Cevap üretiminde kullanılacak backend (verilmezse
+                `RAG_LLM_URL` ortam değişkeni varsa HTTPBackend, yoksa
+                `GEMINI_API_KEY` ile Gemini)
+            llm_options: LLMClient ayarları, örn. `{"requests_per_second": 5,
+                "max_retries": 3, "timeout": 30}`
+            llm_fallback: LLM çağrısı başarısız olursa local cevaba geçilsin mi;
+                False ise `LLMError` çağırana yükseltilir
+            embedding_backend: `embedder` verilmezse embedding modelinin
+                çalıştırılacağı backend: "torch" veya "onnx" (ONNX Runtime)
+            embedding_options: ONNX backend ayarları, örn. `{"model_dir":
+                "models/minilm-onnx", "quantize": True}`
+        """
         self.pdf_path = pdf_path
+        self.index_dir = index_dir
+        self.region = region
+        
+        logger.info(f"🚀 RAG Pipeline başlatılıyor: {pdf_path}")
+        self._init_shared_state(use_gemini, metrics, answer_cache_threshold,
+                                llm_backend, llm_options, llm_fallback)
+        
+        self.pdf_processor = PDFProcessor(chunk_size=1000, chunk_overlap=200,
+                                          num_workers=extract_workers)
+        self.context_builder = ContextBuilder(max_tokens=context_token_budget,
+                                              max_overlap=self.pdf_processor.chunk_overlap)
+        self.embedder = embedder or EmbeddingManager(
+            cache_path=os.path.join(index_dir, "embedding_cache.sqlite") if index_dir else None,
+            backend=embedding_backend, onnx_options=embedding_options
+        )
+        self.vector_backend = vector_backend
+        self.vector_store = self._create_vector_store(vector_backend, index_dir, vector_quantization,
+                                                      vector_store_options)
+        self.manifest = IndexManifest(index_dir) if index_dir else None
+        self.hybrid_search = hybrid_search
+        self.lexical_index = BM25Index()
+        # Chunk ID -> belgedeki sıra (bağlam oluştururken komşu chunk'ları bulmak için)
+        self._chunk_positions = {}
+        # Chunk ID -> metadata (sayfa aralığı, bölüm, belge) ve BM25 sırasıyla filtre sütunları
+        self._chunk_metadata = {}
+        self._chunk_columns = MetadataColumns([])
+        logger.info("✅ RAG Pipeline hazır")
+    
+    def _init_shared_state(self, use_gemini: bool, metrics: Optional[MetricsRegistry],
+                           answer_cache_threshold: Optional[float],
+                           llm_backend: Optional[LLMBackend], llm_options: Optional[Dict],
+                           llm_fallback: bool):
+        """
+        Sorgu, akış ve istatistik metotlarının kullandığı, indeksin nasıl
+        tutulduğundan bağımsız durum (CorpusPipeline da bunu kullanır)
+        """
         self.use_gemini = use_gemini
+        self._init_metrics(metrics)
+        self.answer_cache = (SemanticAnswerCache(similarity_threshold=answer_cache_threshold)
+                             if answer_cache_threshold is not None else None)
         
-        print("🚀 RAG Pipeline başlatılıyor...\n")
+        self.llm_fallback = llm_fallback
+        self._configure_llm(use_gemini, llm_backend, llm_options)
         
-        self.pdf_processor = PDFProcessor(chunk_size=1000, chunk_overlap=200)
-        self.embedder = EmbeddingManager()
-        self.vector_store = VectorStore(collection_name="istanbul_bolge_plani")
+        self.chunk_count = 0
+        # Pipeline bir snapshot'tan açıldıysa indeksin kaynağı (bkz. `from_snapshot`)
+        self.snapshot: Optional[IndexSnapshot] = None
+        # Son akışların ilk token süreleri (saniye)
+        self._ttft_samples = deque(maxlen=256)
+        # İndeksleme tek seferde tek thread'den yapılır; sorgular paralel çalışabilir
+        self._index_lock = threading.RLock()
+    
+    @property
+    def chunks(self) -> Optional[ChunkStore]:
+        """
+        Chunk metinlerinin tek kopyası: numpy/ivf backend'lerinde vector
+        store'un (memory-map edilen) deposu. ChromaDB metni kendisi sakladığı
+        için None döner.
+        """
+        return getattr(self.vector_store, "chunks", None)
+    
+    @classmethod
+    def from_snapshot(cls, snapshot_path: str, use_gemini: bool = False,
+                      vector_backend: str = "numpy", embedder: Optional[EmbeddingManager] = None,
+                      verify: bool = False, **kwargs) -> "RAGPipeline":
+        """
+        Pipeline'ı `save_snapshot` (veya `python -m src.index_snapshot build`)
+        ile yazılmış snapshot dosyasından açar.
         
-        if use_gemini:
+        PDF okunmaz, chunk'lar yeniden embed edilmez: embedding matrisi ve
+        chunk metinleri dosyadan memory-map edilir, yalnızca metadata
+        tabloları ve BM25 indeksi bellekte kurulur. Embedding modeli yalnızca
+        soruları embed etmek için, ilk sorguda yüklenir.
+        
+        Args:
+            snapshot_path: Snapshot dosyası
+            vector_backend: "numpy" veya "ivf" (IVF merkezleri açılışta eğitilir)
+            embedder: Paylaşılan embedding yöneticisi (verilmezse snapshot'taki
+                model adı ve boyutuyla oluşturulur)
+            verify: True ise dosyanın SHA-256 özeti doğrulanır
+            Diğerleri: RAGPipeline ile aynı (`index_dir` ve `vector_quantization` hariç)
+        """
+        if vector_backend not in ("numpy", "ivf"):
+            raise ValueError(f"❌ Snapshot yalnızca numpy ve ivf backend'leriyle açılabilir: {vector_backend}")
+        
+        snapshot = IndexSnapshot.open(snapshot_path, verify=verify)
+        manifest = snapshot.manifest
+        embedder = embedder or EmbeddingManager(model_name=manifest["embedding_model"],
+                                                dimension=manifest.get("embedding_dimension"),
+                                                backend=kwargs.pop("embedding_backend", "torch"),
+                                                onnx_options=kwargs.pop("embedding_options", None))
+        if embedder.model_name != manifest["embedding_model"]:
+            raise ValueError(f"❌ Snapshot {manifest['embedding_model']} ile oluşturulmuş, "
+                             f"embedder {embedder.model_name}")
+        if manifest.get("embedding_backend", embedder.backend_label) != embedder.backend_label:
+            logger.warning(f"⚠️ Snapshot embedding'leri {manifest['embedding_backend']} ile üretilmiş, "
+                           f"sorgular {embedder.backend_label} ile embed edilecek")
+        
+        pipeline = cls(manifest.get("pdf_path", snapshot_path), use_gemini=use_gemini, index_dir=None,
+                       vector_backend=vector_backend, vector_quantization=snapshot.quantization,
+                       embedder=embedder, **kwargs)
+        pipeline._attach_snapshot(snapshot)
+        return pipeline
+    
+    def _attach_snapshot(self, snapshot: IndexSnapshot):
+        with self._index_lock:
+            self.snapshot = snapshot
+            self.embedder.set_dimension(snapshot.manifest.get("embedding_dimension"))
+            # Chunk metinleri snapshot'taki tampondan, vector store üzerinden okunur
+            self.vector_store.attach(snapshot.embeddings, snapshot.ids, snapshot.chunks,
+                                     snapshot.metadatas, snapshot.scales)
+            self.chunk_count = len(snapshot.ids)
+            self._build_chunk_lookups(snapshot.lexical_index)
+            self._update_index_gauges()
+        logger.info(f"📦 İndeks snapshot'tan açıldı: {snapshot.path} ({self.chunk_count} chunk)")
+    
+    def save_snapshot(self, path: str, quantization: Optional[str] = None) -> Dict:
+        """
+        İndeksi tek dosyalık, memory-map edilebilir snapshot olarak yazar.
+        
+        Args:
+            path: Snapshot dosyası (geleneksel uzantı `.ragsnap`)
+            quantization: Embedding matrisinin saklanma biçimi (None: vector
+                store'unki, ChromaDB için float32)
+        
+        Returns:
+            Snapshot başlığı
+        """
+        with self._index_lock:
+            if self.chunk_count == 0:
+                raise ValueError("❌ Snapshot için önce index_document çağrılmalı")
+            
+            ids, metadatas = self.vector_store.get_records()
+            mode = quantization or getattr(self.vector_store, "quantization", "float32")
+            codes, scales = quantize(self.vector_store.get_embeddings(ids), mode)
+            
+            saved = self.manifest.load() if self.manifest else None
+            manifest = dict(saved or self._expected_manifest(),
+                            chunk_count=len(ids),
+                            embedding_dimension=self.embedder.embedding_dimension)
+            lexical_index = self.lexical_index if self.hybrid_search and self.lexical_index.ids == ids else None
+            chunks = self.chunks
+            if chunks is None or self.vector_store.get_ids() != ids:
+                # Snapshot satırları chunk sırasında olmalı; metinler bu sırayla yeniden yazılır
+                chunks = ChunkStore.from_texts(self.vector_store.iter_documents(ids),
+                                               [item.get("char_start") for item in metadatas])
+            return write_snapshot(path, manifest, ids, metadatas, codes, chunks, scales, lexical_index)
+    
+    def _init_metrics(self, metrics: Optional[MetricsRegistry]):
+        self.metrics = metrics or MetricsRegistry()
+        self._stage_seconds = self.metrics.histogram(
+            "rag_stage_seconds", "Sorgu aşamalarının süresi (saniye)", labels=("stage",))
+        self._ttft_seconds = self.metrics.histogram(
+            "rag_time_to_first_token_seconds", "Akışlarda ilk cevap parçasına kadar geçen süre")
+        self._queries_total = self.metrics.counter(
+            "rag_queries_total", "Cevaplanan soru sayısı", labels=("mode",))
+        self._cache_hits_total = self.metrics.counter(
+            "rag_answer_cache_hits_total", "Önbellekten cevaplanan soru sayısı")
+        self._local_fallbacks_total = self.metrics.counter(
+            "rag_local_fallbacks_total", "Gemini hatası nedeniyle generate_local ile üretilen cevaplar")
+        self._index_chunks = self.metrics.gauge(
+            "rag_index_chunks", "İndeksteki chunk sayısı")
+        self._index_duration = self.metrics.gauge(
+            "rag_index_duration_seconds", "Son (yeniden) indekslemenin süresi")
+        self._lexical_postings = self.metrics.gauge(
+            "rag_lexical_index_postings", "BM25 indeksindeki posting sayısı")
+    
+    def _stage(self, name: str):
+        """Bloğun süresini `rag_stage_seconds{stage=name}` histogramına yazar"""
+        return self._stage_seconds.time(stage=name)
+    
+    def _update_index_gauges(self):
+        self._index_chunks.set(self.chunk_count)
+        self._lexical_postings.set(self.lexical_index.get_stats()["postings"])
+    
+    def export_metrics(self) -> str:
+        """Metrikler, Prometheus metin formatında"""
+        self._update_index_gauges()
+        return self.metrics.render()
+    
+    def _configure_llm(self, use_gemini: bool, backend: Optional[LLMBackend] = None,
+                       options: Optional[Dict] = None):
+        self.llm_client = None
+        if backend is None:
+            if not use_gemini:
+                return
             load_dotenv()
+            llm_url = os.getenv("RAG_LLM_URL")
             api_key = os.getenv("GEMINI_API_KEY")
-            if api_key:
-                genai.configure(api_key=api_key)
-                self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-                print("✅ Gemini API hazır!")
+            if llm_url:
+                backend = HTTPBackend(llm_url)
+            elif api_key:
+                # google.generativeai yalnızca Gemini kullanılacaksa import edilir
+                backend = GeminiBackend(api_key)
             else:
-                print("⚠️ GEMINI_API_KEY bulunamadı")
+                logger.warning("⚠️ GEMINI_API_KEY bulunamadı, cevaplar Local Mode ile üretilecek")
                 self.use_gemini = False
-        
-        self.chunks = []
-        print("\n✅ RAG Pipeline hazır!\n")
+                return
+        self.set_llm_backend(backend, **(options or {}))
     
-    def index_document(self):
-        """PDF'i işler ve vector database'e ekler"""
-        print("="*80)
-        print("📚 BELGE İNDEKSLEME BAŞLIYOR")
-        print("="*80 + "\n")
+    def set_llm_backend(self, backend: LLMBackend, **options) -> LLMClient:
+        """
+        Cevap üretimini verilen backend'e bağlar (örn. testlerde ve yük
+        testlerinde sahte LLM sunucusu). `options` LLMClient'a iletilir.
+        """
+        self.llm_client = LLMClient(backend, metrics=self.metrics, **options)
+        logger.info(f"✅ LLM hazır ({backend.name})")
+        return self.llm_client
+    
+    @staticmethod
+    def _create_vector_store(backend: str, index_dir: Optional[str], quantization: str = "float32",
+                             options: Optional[Dict] = None):
+        stores = {"chroma": VectorStore, "numpy": NumpyVectorStore, "ivf": IVFVectorStore}
+        if backend not in stores:
+            raise ValueError(f"❌ Bilinmeyen vector backend: {backend} (seçenekler: {', '.join(stores)})")
         
-        self.chunks = self.pdf_processor.process_pdf(self.pdf_path)
+        kwargs = dict(options or {})
+        if quantization != "float32":
+            if backend == "chroma":
+                raise ValueError(f"❌ {quantization} quantization yalnızca numpy ve ivf backend'lerinde destekleniyor")
+            kwargs["quantization"] = quantization
         
-        if not self.chunks:
-            raise ValueError("❌ PDF işlenemedi!")
+        return stores[backend](
+            collection_name="istanbul_bolge_plani",
+            persist_directory=os.path.join(index_dir, backend) if index_dir else None,
+            **kwargs
+        )
+    
+    def _expected_manifest(self) -> Dict:
+        return IndexManifest.build(
+            pdf_path=self.pdf_path,
+            chunk_size=self.pdf_processor.chunk_size,
+            chunk_overlap=self.pdf_processor.chunk_overlap,
+            embedding_model=self.embedder.model_name,
+            collection_name=self.vector_store.collection_name,
+            vector_backend=self.vector_backend,
+            separators=self.pdf_processor.separators,
+            embedding_backend=self.embedder.backend_label
+        )
+    
+    def is_index_current(self, expected: Optional[Dict] = None) -> bool:
+        """Diskteki indeks mevcut PDF, chunking ayarları ve modelle uyumlu mu?"""
+        if self.manifest is None:
+            return False
+        
+        expected = expected or self._expected_manifest()
+        if not self.manifest.matches(expected):
+            return False
         
-        print("\n🧠 Embedding'ler oluşturuluyor...")
-        embeddings = self.embedder.embed_documents(self.chunks)
+        # Manifest yazıldıktan sonra koleksiyon elle silinmiş olabilir
+        saved = self.manifest.load()
+        return self.vector_store.count() == saved.get("chunk_count")
+    
+    def _can_update_incrementally(self) -> bool:
+        """Mevcut koleksiyondaki embedding'ler yeniden kullanılabilir mi?"""
+        if self.vector_store.count() == 0:
+            return False
+        if self.manifest is None:
+            # Bellek içi indeks aynı embedder ile oluşturulmuştur
+            return True
         
-        print("\n💾 Vector database'e ekleniyor...")
-        self.vector_store.add_documents(
-            documents=self.chunks,
-            embeddings=embeddings,
-            batch_size=10
+        saved = self.manifest.load()
+        return saved is not None and all(
+            saved.get(key) == value for key, value in (
+                ("version", MANIFEST_VERSION),
+                ("embedding_model", self.embedder.model_name),
+                ("embedding_backend", self.embedder.backend_label),
+                ("collection_name", self.vector_store.collection_name)
+            )
         )
+    
+    def index_document(self, force: bool = False, streaming: bool = False,
+                       window_size: int = 64, queue_depth: int = 4) -> bool:
+        """
+        PDF'i işler ve vector database'e ekler.
+        
+        Kalıcı indeks mevcut PDF, chunking ayarları ve embedding modeliyle
+        oluşturulmuşsa yeniden indeksleme yapılmaz, mevcut indeks açılır.
+        PDF değiştiyse chunk'lar içerik hash'leri üzerinden karşılaştırılır;
+        yalnızca yeni chunk'lar embed edilir, kaybolanlar silinir.
+        
+        Args:
+            force: True ise manifest uyuşsa bile indeks sıfırdan oluşturulur
+            streaming: True ise sayfalar okunurken chunk'lar `window_size`'lık
+                pencereler halinde embed edilip yazılır; bellek kullanımı belge
+                boyutundan bağımsız kalır ve chunk'lar yazıldıkça aranabilir olur
+            window_size: Streaming modunda tek seferde embed edilen chunk sayısı
+            queue_depth: Streaming modunda okuma ile embedding arasında
+                bekleyebilecek en fazla pencere sayısı
+        
+        Returns:
+            İndeks güncellendiyse True, mevcut indeks kullanıldıysa False
+        """
+        with self._index_lock:
+            return self._index_document(force, streaming, window_size, queue_depth)
+    
+    def _index_document(self, force: bool, streaming: bool, window_size: int,
+                        queue_depth: int) -> bool:
+        if self.snapshot is not None:
+            # Kaynak PDF bu makinede olmayabilir; indeks snapshot'la birlikte gelir
+            logger.info(f"📦 İndeks snapshot'tan açıldı, indeksleme atlandı ({self.chunk_count} chunk)")
+            return False
+        
+        expected = self._expected_manifest() if self.manifest else None
+        
+        if not force and self.is_index_current(expected):
+            if self.manifest:
+                # Boyut manifest'ten alınır; model ilk sorguya kadar yüklenmez
+                self.embedder.set_dimension(self.manifest.load().get("embedding_dimension"))
+            self.chunk_count = self.vector_store.count()
+            self._build_chunk_lookups()
+            self._update_index_gauges()
+            logger.info(f"♻️ Mevcut indeks güncel, yeniden indeksleme atlandı ({self.chunk_count} chunk)")
+            return False
+        
+        logger.info(f"📚 Belge indeksleme başlıyor: {self.pdf_path}")
+        started_at = time.perf_counter()
+        
+        if streaming:
+            windows = self._prefetch(self._iter_chunk_windows(window_size), queue_depth)
+        else:
+            chunks, chunk_metadata = self.pdf_processor.process_pdf_with_metadata(
+                self.pdf_path, document_id_for(self.pdf_path)
+            )
+            if not chunks:
+                raise ValueError("❌ PDF işlenemedi!")
+            windows = iter([(chunks, chunk_metadata)])
+        
+        incremental = not force and self._can_update_incrementally()
+        
+        if self.manifest:
+            # Yarıda kalan bir indeksleme eski manifest ile eşleşmesin
+            self.manifest.clear()
+        if not incremental and self.vector_store.count() > 0:
+            self.vector_store.reset()
+        
+        existing_ids = set(self.vector_store.get_ids()) if incremental else set()
+        seen_ids = set()
+        occurrences = {}
+        added = 0
+        
+        # Store diske pencere başına değil, indeksleme sonunda bir kez yazılır
+        with self.vector_store.bulk_update():
+            for window, window_metadata in windows:
+                ids = content_chunk_ids(window, occurrences)
+                offset = len(seen_ids)
+                metadata = [dict(item, region=self.region, source=f"chunk_{offset + i}",
+                                 chunk_index=offset + i)
+                            for i, item in enumerate(window_metadata)]
+                seen_ids.update(ids)
+                added += self._sync_window(window, ids, metadata, existing_ids)
+            
+            if not seen_ids:
+                raise ValueError("❌ PDF işlenemedi!")
+            
+            stale_ids = list(existing_ids.difference(seen_ids))
+            self.vector_store.delete(stale_ids)
+        self.chunk_count = len(seen_ids)
         
-        print("\n✅ İNDEKSLEME TAMAMLANDI!\n")
+        if incremental:
+            logger.info(f"🔁 Artımlı güncelleme: {added} yeni, {len(stale_ids)} silinen, "
+                        f"{self.chunk_count - added} değişmeyen chunk")
+        
+        if self.manifest:
+            self.manifest.save(dict(
+                expected,
+                chunk_count=self.vector_store.count(),
+                embedding_dimension=self.embedder.embedding_dimension
+            ))
+        
+        self._build_chunk_lookups()
+        
+        if self.answer_cache:
+            # Kayıtlı cevaplar eski indeksteki belgelere dayanıyor
+            self.answer_cache.clear()
+        
+        elapsed = time.perf_counter() - started_at
+        self._index_duration.set(elapsed)
+        self._update_index_gauges()
+        logger.info(f"✅ İndeksleme tamamlandı: {self.chunk_count} chunk, {elapsed:.1f} sn")
+        return True
+    
+    def _build_chunk_lookups(self, lexical_index: Optional[BM25Index] = None):
+        """
+        Chunk sırası ve metadata tablolarını, BM25 indeksini vector store'un
+        kayıtlarından yeniden oluşturur. Metinler bellekte listelenmez: BM25
+        kurulurken store'dan birer birer okunur. Hazır bir `lexical_index`
+        (snapshot'tan) verilirse BM25 yeniden kurulmaz ve metin hiç okunmaz.
+        """
+        ids, metadatas = self.vector_store.get_records()
+        self._chunk_positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        self._chunk_metadata = dict(zip(ids, metadatas))
+        self._chunk_columns = MetadataColumns(metadatas)
+        if self.hybrid_search:
+            if lexical_index is not None and lexical_index.ids == ids:
+                self.lexical_index = lexical_index
+            else:
+                self.lexical_index = BM25Index().build(ids, self.vector_store.iter_documents(ids))
+    
+    def build_context(self, retrieval: Dict) -> str:
+        """Getirilen belgelerden, komşu chunk'ları birleştirip bütçeye sığan bağlamı oluşturur"""
+        positions = [self._chunk_positions.get(chunk_id) for chunk_id in retrieval["ids"]]
+        return self.context_builder.build(retrieval["documents"], positions)
     
-    def retrieve(self, query: str, n_results: int = 5) -> Dict:
-        """Sorguya en uygun belgeleri getirir"""
-        query_embedding = self.embedder.embed_query(query)
-        documents, ids, distances = self.vector_store.query(query_embedding, n_results)
+    def _sync_window(self, chunks: List[str], ids: List[str], metadata: List[Dict],
+                     existing_ids: set) -> int:
+        """Bir chunk penceresini indekse yazar, yeni eklenen chunk sayısını döndürür"""
+        new_positions = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_ids]
+        kept_positions = [i for i, chunk_id in enumerate(ids) if chunk_id in existing_ids]
         
+        if kept_positions:
+            # Değişmeyen chunk'ların sıra bilgisi kaymış olabilir
+            self.vector_store.update_metadata(
+                ids=[ids[i] for i in kept_positions],
+                metadata=[metadata[i] for i in kept_positions]
+            )
+        
+        if new_positions:
+            new_chunks = [chunks[i] for i in new_positions]
+            embeddings = self.embedder.embed_documents(new_chunks)
+            self.vector_store.add_documents(
+                documents=new_chunks,
+                embeddings=embeddings,
+                batch_size=10,
+                metadata=[metadata[i] for i in new_positions],
+                ids=[ids[i] for i in new_positions]
+            )
+        
+        return len(new_positions)
+    
+    def _iter_chunk_windows(self, window_size: int) -> Iterator[Tuple[List[str], List[Dict]]]:
+        """PDF'i sayfa sayfa okuyup `window_size`'lık (chunk'lar, metadata'lar) pencereleri üretir"""
+        pages = self.pdf_processor.iter_pages(self.pdf_path)
+        window, window_metadata = [], []
+        for chunk, metadata in self.pdf_processor.iter_chunks(pages, document_id=document_id_for(self.pdf_path)):
+            window.append(chunk)
+            window_metadata.append(metadata)
+            if len(window) == window_size:
+                yield window, window_metadata
+                window, window_metadata = [], []
+        if window:
+            yield window, window_metadata
+    
+    @staticmethod
+    def _prefetch(iterator: Iterator, queue_depth: int) -> Iterator:
+        """
+        Iterator'ı arka plan thread'inde çalıştırır, en fazla `queue_depth`
+        elemanı önceden hazırlar. PDF okuma ve chunking, embedding ile
+        eşzamanlı ilerler; kuyruk dolunca okuma bekler.
+        """
+        items = queue.Queue(maxsize=queue_depth)
+        stop = threading.Event()
+        done = object()
+        
+        def produce():
+            try:
+                for item in iterator:
+                    while not stop.is_set():
+                        try:
+                            items.put((item, None), timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+                items.put((done, None))
+            except Exception as e:
+                items.put((done, e))
+        
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item, error = items.get()
+                if item is done:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stop.set()
+    
+    def retrieve(self, query: str, n_results: int = 5,
+                 query_embedding: Optional[List[float]] = None,
+                 filters: Optional[Dict] = None, nprobe: Optional[int] = None) -> Dict:
+        """
+        Sorguya en uygun belgeleri getirir.
+        
+        `filters` ile arama benzerlik skorlamasından önce belirli chunk'larla
+        sınırlanır, örn. `{"page_range": (40, 60), "section": "2.1 Ulaşım",
+        "document_id": "istanbul_bolge_plani"}`. Sonuçtaki `metadatas`
+        her belgenin sayfa aralığını ve bölümünü içerir.
+        
+        `nprobe` ivf backend'inde sorgu başına taranan küme sayısıdır; büyük
+        değerler recall'u artırır, gecikmeyi uzatır (None: store varsayılanı).
+        """
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_query(query)
+        return self.retrieve_batch([query], n_results, [query_embedding], filters, nprobe)[0]
+    
+    def retrieve_batch(self, queries: List[str], n_results: int = 5,
+                       query_embeddings: Optional[List[List[float]]] = None,
+                       filters: Optional[Dict] = None,
+                       nprobe: Optional[int] = None) -> List[Dict]:
+        """Birden fazla sorgu için belgeleri tek embedding ve tek arama çağrısıyla getirir"""
+        if not queries:
+            return []
+        if query_embeddings is None:
+            query_embeddings = self.embedder.embed_queries(queries)
+        
+        if not self.hybrid_search or len(self.lexical_index) == 0:
+            return [
+                self._retrieval_result(documents, ids, distances)
+                for documents, ids, distances in self.vector_store.query_batch(
+                    query_embeddings, n_results, filters, **self._search_options(nprobe))
+            ]
+        
+        return [
+            self._fuse(dense, lexical, n_results)
+            for dense, lexical in self.retrieve_candidates(queries, n_results, query_embeddings,
+                                                           filters, nprobe)
+        ]
+    
+    def _search_options(self, nprobe: Optional[int]) -> Dict:
+        if nprobe is None:
+            return {}
+        if not isinstance(self.vector_store, IVFVectorStore):
+            raise ValueError("❌ nprobe yalnızca ivf backend'inde kullanılabilir")
+        return {"nprobe": nprobe}
+    
+    def retrieve_candidates(self, queries: List[str], n_results: int,
+                            query_embeddings: List[List[float]], filters: Optional[Dict] = None,
+                            nprobe: Optional[int] = None
+                            ) -> List[Tuple[Tuple[List[str], List[str], List[float]],
+                                            Tuple[List[str], List[float]]]]:
+        """
+        Füzyondan önceki aday listeleri: her sorgu için vektör aramasının
+        (belgeler, ID'ler, mesafeler) ve BM25 aramasının (ID'ler, skorlar)
+        sonucu. Hibrit arama kapalıysa veya BM25 indeksi boşsa BM25 listesi boştur.
+        """
+        # Füzyonun iki listeden de seçebilmesi için her aramadan daha fazla aday alınır
+        n_candidates = max(n_results * 4, 20)
+        dense_results = self.vector_store.query_batch(query_embeddings, n_candidates, filters,
+                                                      **self._search_options(nprobe))
+        if not self.hybrid_search or len(self.lexical_index) == 0:
+            return [(dense, ([], [])) for dense in dense_results]
+        
+        candidate_mask = self._chunk_columns.mask(filters)
+        return [
+            (dense, self.lexical_index.search(query, max(len(dense[1]), n_results),
+                                              candidate_mask))
+            for query, dense in zip(queries, dense_results)
+        ]
+    
+    def _retrieval_result(self, documents: List[str], ids: List[str], distances: List) -> Dict:
         return {
             "documents": documents,
             "ids": ids,
-            "distances": distances
+            "distances": distances,
+            "metadatas": [self._chunk_metadata.get(chunk_id, {}) for chunk_id in ids]
         }
     
+    def _fuse(self, dense: Tuple[List[str], List[str], List[float]],
+              lexical: Tuple[List[str], List[float]], n_results: int) -> Dict:
+        """Vektör ve BM25 sonuçlarını reciprocal rank fusion ile birleştirir"""
+        dense_documents, dense_ids, dense_distances = dense
+        lexical_ids, _ = lexical
+        
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids])[:n_results]
+        ids = [chunk_id for chunk_id, _ in fused]
+        
+        texts = dict(zip(dense_ids, dense_documents))
+        missing = [chunk_id for chunk_id in ids if chunk_id not in texts]
+        # Yalnızca BM25 ile bulunanların metni vector store'dan okunur
+        texts.update(zip(missing, self.vector_store.get_by_ids(missing)))
+        distances = dict(zip(dense_ids, dense_distances))
+        
+        # Yalnızca BM25 ile bulunan belgelerin vektör mesafesi bilinmiyor
+        result = self._retrieval_result([texts[chunk_id] for chunk_id in ids], ids,
+                                        [distances.get(chunk_id) for chunk_id in ids])
+        result["scores"] = [score for _, score in fused]
+        return result
+    
     def generate_with_gemini(self, query: str, context: str) -> str:
         """Gemini API ile cevap üretir"""
-        prompt = f"""Sen İstanbul Bölge Planı uzmanı bir asistansın. 
+        return self._generate_with_gemini(query, context)[0]
+    
+    def _build_prompt(self, query: str, context: str) -> str:
+        return f"""Sen İstanbul Bölge Planı uzmanı bir asistansın. 
 Aşağıdaki belgeden alınan bilgilere dayanarak soruyu cevapla.
 
 BELGE İÇERİĞİ:
@@ -85,13 +687,22 @@ BELGE İÇERİĞİ:
 SORU: {query}
 
 CEVAP:"""
+    
+    def _generate_with_gemini(self, query: str, context: str) -> Tuple[str, bool]:
+        """
+        Cevabı ve LLM hatası yüzünden local cevaba düşülüp düşülmediğini döndürür.
         
+        Aynı anda sorulan aynı soru (aynı prompt) tek çağrıyla cevaplanır;
+        geçici hatalar LLMClient içinde yeniden denenir.
+        """
         try:
-            response = self.gemini_model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"⚠️ Gemini API hatası: {e}")
-            return self.generate_local(query, context)
+            return self.llm_client.generate(self._build_prompt(query, context)), False
+        except LLMError as e:
+            if not self.llm_fallback:
+                raise
+            logger.error(f"❌ LLM cevap üretemedi, local cevaba geçiliyor: {e}")
+            self._local_fallbacks_total.inc()
+            return self.generate_local(query, context), True
     
     def generate_local(self, query: str, context: str) -> str:
         """Local cevap üretir"""
@@ -101,42 +712,280 @@ CEVAP:"""
 
 📌 Not: Bu cevap belge içeriğinden otomatik olarak çıkarılmıştır."""
     
-    def query(self, question: str, n_results: int = 5) -> Dict:
-        """Tam RAG pipeline"""
-        print(f"\n❓ SORU: {question}\n")
-        print("🔍 İlgili belgeler aranıyor...")
+    def _resolve_use_gemini(self, use_gemini: Optional[bool]) -> bool:
+        """Çağrı bazında mod seçimi; None ise pipeline varsayılanı kullanılır"""
+        if use_gemini is None:
+            use_gemini = self.use_gemini
+        return bool(use_gemini) and self.llm_client is not None
+    
+    def _generate_answer(self, question: str, context: str,
+                         use_gemini: bool) -> Tuple[str, bool]:
+        """Seçili moda göre cevap üretir; (cevap, local'e düşüldü mü) döndürür"""
+        if use_gemini:
+            return self._generate_with_gemini(question, context)
+        return self.generate_local(question, context), False
+    
+    def query(self, question: str, n_results: int = 5,
+              use_gemini: Optional[bool] = None, filters: Optional[Dict] = None) -> Dict:
+        """
+        Tam RAG pipeline.
         
-        retrieval_results = self.retrieve(question, n_results)
-        documents = retrieval_results["documents"]
-        ids = retrieval_results["ids"]
+        `use_gemini` verilirse yalnızca bu çağrı için üretim modunu belirler;
+        böylece paylaşılan bir pipeline farklı modlardaki oturumlara aynı anda
+        hizmet verebilir. `filters` aramayı belirli sayfa, bölüm veya
+        belgelerle sınırlar (bkz. `retrieve`).
+        """
+        started_at = time.perf_counter()
+        logger.debug(f"❓ Soru: {question}")
+        self._queries_total.inc(mode="query")
         
-        print(f"✅ {len(documents)} ilgili belge bulundu\n")
+        use_gemini = self._resolve_use_gemini(use_gemini)
+        with self._stage("embed_query"):
+            query_embedding = self.embedder.embed_query(question)
+        cache_namespace = (use_gemini, n_results, filter_key(filters))
         
-        context = "\n\n".join(documents)
+        if self.answer_cache:
+            cached = self.answer_cache.lookup(query_embedding, cache_namespace)
+            if cached is not None:
+                self._cache_hits_total.inc()
+                self._stage_seconds.observe(time.perf_counter() - started_at, stage="total")
+                logger.info(f"⚡ Önbellekten cevaplandı (benzerlik: {cached['similarity']:.3f})")
+                return dict(cached, question=question, cached=True, fallback=False)
         
-        print("🤖 Cevap oluşturuluyor...\n")
+        with self._stage("vector_search"):
+            retrieval_results = self.retrieve(question, n_results, query_embedding=query_embedding,
+                                              filters=filters)
+        documents = retrieval_results["documents"]
+        ids = retrieval_results["ids"]
         
-        if self.use_gemini:
-            answer = self.generate_with_gemini(question, context)
-        else:
-            answer = self.generate_local(question, context)
+        with self._stage("context_build"):
+            context = self.build_context(retrieval_results)
         
-        print(f"💬 CEVAP:\n{answer}\n")
+        with self._stage("llm"):
+            answer, fell_back = self._generate_answer(question, context, use_gemini)
         
-        return {
+        total = time.perf_counter() - started_at
+        self._stage_seconds.observe(total, stage="total")
+        logger.info(f"💬 Soru cevaplandı: {len(documents)} belge, {total:.2f} sn")
+        logger.debug(f"💬 Cevap: {answer}")
+        
+        result = {
             "question": question,
             "answer": answer,
             "sources": ids,
-            "source_documents": documents
+            "source_documents": documents,
+            "source_metadata": retrieval_results["metadatas"]
+        }
+        
+        # API hatası nedeniyle üretilen yedek cevaplar önbelleğe alınmaz
+        if self.answer_cache and not fell_back:
+            self.answer_cache.store(query_embedding, result, cache_namespace)
+        
+        return dict(result, cached=False, fallback=fell_back)
+    
+    async def _stream_deltas(self, question: str, context: str, stream: AnswerStream,
+                             use_gemini: bool) -> AsyncIterator[str]:
+        """Cevap parçalarını üretir; LLM ilk parçadan önce hata verirse local cevaba düşer"""
+        started_at = time.perf_counter()
+        try:
+            if use_gemini:
+                emitted = False
+                try:
+                    async for delta in self.llm_client.stream(self._build_prompt(question, context)):
+                        emitted = True
+                        yield delta
+                    return
+                except LLMError as e:
+                    stream.fell_back = True
+                    if not self.llm_fallback:
+                        raise
+                    if emitted:
+                        logger.error(f"❌ LLM akışı yarıda kesildi: {e}")
+                        return
+                    logger.error(f"❌ LLM cevap üretemedi, local cevaba geçiliyor: {e}")
+                    self._local_fallbacks_total.inc()
+            
+            for line in self.generate_local(question, context).splitlines(keepends=True):
+                yield line
+        finally:
+            self._stage_seconds.observe(time.perf_counter() - started_at, stage="llm")
+    
+    @staticmethod
+    async def _replay(answer: str) -> AsyncIterator[str]:
+        yield answer
+    
+    def _on_stream_complete(self, stream: AnswerStream, query_embedding: List[float],
+                            cache_namespace: Tuple):
+        if stream.time_to_first_token is not None:
+            self._ttft_samples.append(stream.time_to_first_token)
+            self._ttft_seconds.observe(stream.time_to_first_token)
+        if stream.total_time is not None:
+            self._stage_seconds.observe(stream.total_time, stage="total")
+        logger.info(f"💬 Akış tamamlandı: ilk token {stream.time_to_first_token or 0:.2f} sn, "
+                    f"toplam {stream.total_time or 0:.2f} sn")
+        
+        if self.answer_cache and not stream.cached and not stream.fell_back:
+            result = stream.result()
+            del result["cached"], result["time_to_first_token"], result["fallback"]
+            self.answer_cache.store(query_embedding, result, cache_namespace)
+    
+    def stream_query(self, question: str, n_results: int = 5,
+                     use_gemini: Optional[bool] = None,
+                     filters: Optional[Dict] = None) -> AnswerStream:
+        """
+        Soruyu cevaplar, cevabı parça parça üreten bir akış döndürür.
+        
+        Retrieval bu çağrıda yapılır; cevap akış tüketildikçe üretilir.
+        Akış `async for` ile (async kod) veya `for` ile (CLI, Streamlit)
+        tüketilebilir. İlk parçanın gelme süresi `time_to_first_token`
+        alanına yazılır ve `get_stats` içinde raporlanır.
+        """
+        started_at = time.perf_counter()
+        logger.debug(f"❓ Soru: {question}")
+        self._queries_total.inc(mode="stream")
+        
+        use_gemini = self._resolve_use_gemini(use_gemini)
+        with self._stage("embed_query"):
+            query_embedding = self.embedder.embed_query(question)
+        cache_namespace = (use_gemini, n_results, filter_key(filters))
+        
+        def on_complete(stream: AnswerStream):
+            self._on_stream_complete(stream, query_embedding, cache_namespace)
+        
+        if self.answer_cache:
+            cached = self.answer_cache.lookup(query_embedding, cache_namespace)
+            if cached is not None:
+                self._cache_hits_total.inc()
+                logger.info(f"⚡ Önbellekten cevaplandı (benzerlik: {cached['similarity']:.3f})")
+                return AnswerStream(question, cached["sources"], cached["source_documents"],
+                                    lambda stream: self._replay(cached["answer"]), started_at=started_at,
+                                    on_complete=on_complete, cached=True,
+                                    source_metadata=cached.get("source_metadata"))
+        
+        with self._stage("vector_search"):
+            retrieval_results = self.retrieve(question, n_results, query_embedding=query_embedding,
+                                              filters=filters)
+        documents = retrieval_results["documents"]
+        logger.debug(f"🔍 {len(documents)} ilgili belge bulundu")
+        
+        with self._stage("context_build"):
+            context = self.build_context(retrieval_results)
+        return AnswerStream(question, retrieval_results["ids"], documents,
+                            lambda stream: self._stream_deltas(question, context, stream, use_gemini),
+                            started_at=started_at, on_complete=on_complete,
+                            source_metadata=retrieval_results["metadatas"])
+    
+    def prepare_batch(self, questions: List[str], n_results: int = 5,
+                      use_gemini: Optional[bool] = None,
+                      filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Toplu cevaplamanın ilk aşaması: sorular tek model çağrısında embed
+        edilir, önbelleğe bakılır, kalan soruların belgeleri tek bir toplu
+        aramayla getirilir.
+        
+        Dönen öğeler soruların sırasındadır; önbellekten cevaplananlar
+        "result", diğerleri "retrieval" içerir. Cevaplar `answer_prepared`
+        ile (istenirse farklı thread'lerde) üretilir.
+        """
+        if not questions:
+            return []
+        
+        use_gemini = self._resolve_use_gemini(use_gemini)
+        with self._stage("batch_embed_query"):
+            query_embeddings = self.embedder.embed_queries(questions)
+        cache_namespace = (use_gemini, n_results, filter_key(filters))
+        
+        prepared, pending = [], []
+        for question, embedding in zip(questions, query_embeddings):
+            item = {"question": question, "embedding": embedding,
+                    "use_gemini": use_gemini, "cache_namespace": cache_namespace}
+            cached = self.answer_cache.lookup(embedding, cache_namespace) if self.answer_cache else None
+            if cached is not None:
+                self._cache_hits_total.inc()
+                item["result"] = dict(cached, question=question, cached=True, fallback=False)
+            else:
+                pending.append(item)
+            prepared.append(item)
+        
+        with self._stage("batch_vector_search"):
+            retrievals = self.retrieve_batch(
+                [item["question"] for item in pending], n_results,
+                query_embeddings=[item["embedding"] for item in pending],
+                filters=filters
+            )
+        for item, retrieval in zip(pending, retrievals):
+            item["retrieval"] = retrieval
+        return prepared
+    
+    def answer_prepared(self, item: Dict) -> Dict:
+        """`prepare_batch` öğesi için cevabı üretir (önbellekten geldiyse doğrudan döner)"""
+        if "result" in item:
+            return item["result"]
+        
+        retrieval = item["retrieval"]
+        with self._stage("context_build"):
+            context = self.build_context(retrieval)
+        with self._stage("llm"):
+            answer_text, fell_back = self._generate_answer(item["question"], context, item["use_gemini"])
+        
+        result = {
+            "question": item["question"],
+            "answer": answer_text,
+            "sources": retrieval["ids"],
+            "source_documents": retrieval["documents"],
+            "source_metadata": retrieval["metadatas"]
         }
+        if self.answer_cache and not fell_back:
+            self.answer_cache.store(item["embedding"], result, item["cache_namespace"])
+        return dict(result, cached=False, fallback=fell_back)
+    
+    def query_batch(self, questions: List[str], n_results: int = 5,
+                    max_concurrency: int = 4, use_gemini: Optional[bool] = None,
+                    filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Birden fazla soruyu toplu olarak cevaplar.
+        
+        Tüm sorular tek model çağrısında embed edilir, belgeler tek bir
+        toplu aramayla getirilir; cevap üretimi en fazla `max_concurrency`
+        eşzamanlı çağrıyla yapılır. Sonuçlar soruların sırasıyla döner.
+        """
+        if not questions:
+            return []
+        
+        started_at = time.perf_counter()
+        self._queries_total.inc(len(questions), mode="batch")
+        
+        prepared = self.prepare_batch(questions, n_results, use_gemini, filters)
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            results = list(executor.map(self.answer_prepared, prepared))
+        
+        total = time.perf_counter() - started_at
+        self._stage_seconds.observe(total, stage="batch_total")
+        cached = sum(1 for item in prepared if "result" in item)
+        logger.info(f"📦 {len(questions)} soru toplu cevaplandı "
+                    f"({cached} önbellekten, {total:.2f} sn)")
+        return results
     
     def get_stats(self) -> Dict:
         """Pipeline istatistikleri"""
         return {
             "pdf_path": self.pdf_path,
-            "total_chunks": len(self.chunks),
+            "total_chunks": self.chunk_count,
             "vector_db_size": self.vector_store.get_stats()["total_documents"],
+            "chunk_store": self.chunks.get_stats() if self.chunks is not None else None,
+            "index_dir": self.index_dir,
+            "snapshot": self.snapshot.path if self.snapshot else None,
+            "vector_backend": self.vector_backend,
             "embedding_model": self.embedder.model_name,
             "embedding_dimension": self.embedder.embedding_dimension,
-            "gemini_enabled": self.use_gemini
+            "embedding_cache": self.embedder.get_cache_stats(),
+            "lexical_index": self.lexical_index.get_stats() if self.hybrid_search else None,
+            "answer_cache": self.answer_cache.get_stats() if self.answer_cache else None,
+            "context_token_budget": self.context_builder.max_tokens,
+            "gemini_enabled": self.use_gemini,
+            "gemini_available": self.llm_client is not None,
+            "llm": self.llm_client.get_stats() if self.llm_client else None,
+            "time_to_first_token_last": self._ttft_samples[-1] if self._ttft_samples else None,
+            "time_to_first_token_p50": statistics.median(self._ttft_samples) if self._ttft_samples else None,
+            "query_latency_p95": self._stage_seconds.quantile(0.95, stage="total")
         }
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""
+shared_pipeline.py
+Süreç genelinde paylaşılan, tembel oluşturulan ve thread-safe RAG pipeline
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from src.rag_pipeline import RAGPipeline
+
+
+_pipelines: Dict[Tuple, RAGPipeline] = {}
+_lock = threading.Lock()
+
+
+def get_shared_pipeline(pdf_path: str, create: bool = True, **kwargs) -> Optional[RAGPipeline]:
+    """
+    Aynı PDF ve ayarlar için süreç içinde tek bir indekslenmiş pipeline döndürür.
+
+    İlk çağrı pipeline'ı oluşturup indeksler; aynı anda gelen diğer çağrılar
+    bu işlemin bitmesini bekler ve aynı nesneyi alır. Embedding modeli ve
+    indeks böylece tüm oturumlar arasında bellekte bir kez tutulur.
+
+    Args:
+        pdf_path: İndekslenecek PDF dosyası
+        create: False ise pipeline henüz yoksa oluşturulmaz, None döner
+        **kwargs: RAGPipeline'a iletilen ayarlar
+    """
+    key = (os.path.abspath(pdf_path), tuple(sorted(kwargs.items())))
+
+    pipeline = _pipelines.get(key)
+    if pipeline is not None or not create:
+        return pipeline
+
+    with _lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is None:
+            pipeline = RAGPipeline(pdf_path=pdf_path, **kwargs)
+            pipeline.index_document()
+            # İndeks diskten açıldıysa model henüz yüklenmemiştir; ilk soruyu bekletmesin
+            pipeline.embedder.warm_up()
+            _pipelines[key] = pipeline
+
+    return pipeline
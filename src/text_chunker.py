@@ -0,0 +1,326 @@
+"""
+text_chunker.py
+Metni (başlangıç, bitiş) karakter konumları olarak chunk'lara bölen, paragraf,
+satır ve Türkçe cümle sınırlarını gözeten tek geçişli bölücü
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# Ayraç listesinde cümle sınırlarını temsil eden seviye
+SENTENCE = "<cümle>"
+
+# LangChain RecursiveCharacterTextSplitter'ın varsayılan ayraçları
+LANGCHAIN_SEPARATORS = ("\n\n", "\n", " ", "")
+DEFAULT_SEPARATORS = ("\n\n", "\n", SENTENCE, " ", "")
+
+# Cümle sonu noktalaması, ardından boşluk ve büyük harfle başlayan yeni cümle
+_SENTENCE_BREAK = re.compile(r"[.!?…]+[\"'”’)]*\s+(?=[\"'“‘(]?[A-ZÇĞİÖŞÜ])")
+# Noktadan sonra büyük harf gelse de cümleyi bitirmeyen kısaltmalar
+ABBREVIATIONS = frozenset((
+    "av", "apt", "bkz", "cad", "dr", "doç", "ed", "mah", "müh", "no", "op", "örn",
+    "prof", "sn", "sok", "st", "vb", "vd", "vs", "yrd", "çev"
+))
+# Kısaltma kontrolünde noktadan geriye bakılan en fazla karakter
+_MAX_WORD_LOOKBACK = 16
+
+Span = Tuple[int, int]
+
+
+def _is_sentence_end(text: str, punctuation: int, lower: int) -> bool:
+    """`punctuation` konumundaki işaret cümleyi bitiriyor mu? (sıra sayısı, kısaltma, baş harf değilse)"""
+    if text[punctuation] != ".":
+        return True
+    start = punctuation
+    while start > lower and punctuation - start < _MAX_WORD_LOOKBACK and not text[start - 1].isspace():
+        start -= 1
+    word = text[start:punctuation].lstrip("\"'“‘(")
+    if not word or word[-1].isdigit() or len(word) == 1 or "." in word:
+        # "3. Havalimanı", "A. Yılmaz", "T.C."
+        return False
+    return word.lower() not in ABBREVIATIONS
+
+
+class _Frame:
+    """
+    Akış halinde bölmede henüz bitmemiş bir `_split` çağrısı: metin
+    `separators[level:]` ile, `pos` konumundan itibaren bölünür. Çerçevenin
+    altında başka çerçeve varsa `pos`'tan başlayan parça büyüktür ve kendi
+    ayracına kadar alt çerçevede bölünür; `scan` o ayracın aranmaya devam
+    edileceği konumdur.
+    """
+
+    __slots__ = ("level", "pos", "scan")
+
+    def __init__(self, level: int, pos: int):
+        self.level = level
+        self.pos = pos
+        self.scan = pos
+
+
+class TextChunker:
+    """
+    Metni en fazla `chunk_size` karakterlik, ardışık olanları en fazla
+    `chunk_overlap` karakter örtüşen chunk'lara böler.
+
+    Ayraçlar öncelik sırasıyla denenir: parça içinde bulunan ilk ayraçla
+    bölünür, `chunk_size`'a sığan parçalar açgözlü biçimde birleştirilir,
+    sığmayanlar sonraki ayraçlarla bölünür. `LANGCHAIN_SEPARATORS` ile
+    çıktı LangChain `RecursiveCharacterTextSplitter`'ın (keep_separator,
+    strip_whitespace varsayılanları) çıktısıyla birebir aynıdır; varsayılan
+    ayraçlarda satırdan uzun paragraflar boşluklardan önce cümle
+    sınırlarından bölünür.
+
+    Alt metinler kopyalanmaz, yeniden birleştirilmez: her seviye parçayı bir
+    kez tarar ve yalnızca konumlar üretir. Chunk metni gerektiğinde
+    `text[start:end]` ile alınır.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 separators: Sequence[str] = DEFAULT_SEPARATORS):
+        """
+        Args:
+            chunk_size: Chunk başına en fazla karakter
+            chunk_overlap: Ardışık chunk'lar arası en fazla örtüşme
+            separators: Öncelik sırasıyla ayraçlar; `SENTENCE` cümle
+                sınırlarını, "" tek tek karakterleri temsil eder
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"❌ chunk_overlap ({chunk_overlap}) chunk_size'dan ({chunk_size}) büyük olamaz")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+        self._patterns = {separator: re.compile(re.escape(separator))
+                          for separator in self.separators if separator not in ("", SENTENCE)}
+        # Metnin sonundan bu kadar geride başlayan ayraç eşleşmeleri yeni metinle değişebilir
+        self._lookahead = max((len(separator) for separator in self._patterns), default=1)
+
+    def split_offsets(self, text: str) -> List[Span]:
+        """Chunk'ların `text` içindeki [başlangıç, bitiş) konumları, metin sırasıyla"""
+        spans: List[Span] = []
+        if text:
+            self._split(text, 0, len(text), self.separators, spans)
+        return spans
+
+    def split_text(self, text: str) -> List[str]:
+        """Chunk metinleri"""
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def iter_spans(self, parts: Iterable[str],
+                   flush_chars: Optional[int] = None) -> Iterator[Tuple[int, int, str]]:
+        """
+        Art arda gelen metin parçalarını (örn. sayfalar) birleştirilmiş metin
+        üzerinde bölerek (başlangıç, bitiş, chunk) üretir; çıktı
+        `split_offsets("".join(parts))` ile birebir aynıdır.
+
+        Her `flush_chars` karakterlik yeni metinde, sonraki metinden
+        etkilenmeyeceği kesin olan chunk'lar yayınlanır: ayraç sınırları
+        tamponun sonundan `_lookahead` kadar önce kesinleşir, açık kalan
+        `_split` çağrıları `_Frame` yığınında tutulur. Tampon en eski açık
+        konumdan itibaren korunur; bellekte birkaç chunk'lık metin kalır.
+        """
+        flush_chars = flush_chars or self.chunk_size * 8
+        frames = [_Frame(0, 0)]
+        text, base, unprocessed = "", 0, 0
+
+        for part in parts:
+            text += part
+            unprocessed += len(part)
+            if unprocessed < flush_chars:
+                continue
+            unprocessed = 0
+
+            spans: List[Span] = []
+            self._resume(text, frames, 0, None, len(text) - self._lookahead, spans)
+            for start, end in spans:
+                yield base + start, base + end, text[start:end]
+
+            keep = min(frame.scan if i < len(frames) - 1 and self.separators[frame.level] in self._patterns
+                       else frame.pos for i, frame in enumerate(frames))
+            if keep > 0:
+                text, base = text[keep:], base + keep
+                for frame in frames:
+                    frame.pos -= keep
+                    frame.scan -= keep
+
+        spans = []
+        self._resume(text, frames, 0, len(text), len(text), spans)
+        for start, end in spans:
+            yield base + start, base + end, text[start:end]
+
+    def _boundaries(self, text: str, separator: str, start: int, end: int) -> List[int]:
+        """Ayracın [start, end) içinde yeni parça başlattığı konumlar"""
+        if separator == SENTENCE:
+            return [match.end() for match in _SENTENCE_BREAK.finditer(text, start, end)
+                    if _is_sentence_end(text, match.start(), start)]
+        # Ayraç, LangChain'deki gibi sonraki parçanın başında kalır
+        return [match.start() for match in self._patterns[separator].finditer(text, start, end)]
+
+    def _split(self, text: str, start: int, end: int, separators: Sequence[str], spans: List[Span]):
+        """
+        [start, end) aralığını parçalar içinde bulunan ilk ayraçla böler.
+        Parçalar sınır listesiyle temsil edilir: i. parça
+        [bounds[i], bounds[i + 1]) aralığıdır.
+        """
+        bounds, remaining = None, ()
+        for i, separator in enumerate(separators):
+            if separator == "":
+                bounds = range(start, end + 1)
+                break
+            found = self._boundaries(text, separator, start, end)
+            if found:
+                bounds = [start] + (found[1:] if found[0] == start else found) + [end]
+                remaining = separators[i + 1:]
+                break
+        if bounds is None:
+            bounds = [start, end]
+
+        run_start = self._split_pieces(text, bounds, len(bounds) - 1, remaining, spans)
+        if len(bounds) - 1 > run_start:
+            self._merge(text, bounds, run_start, len(bounds) - 1, spans)
+
+    def _split_pieces(self, text: str, bounds: Sequence[int], count: int,
+                      remaining: Sequence[str], spans: List[Span]) -> int:
+        """
+        İlk `count` parçadan chunk_size'a sığmayanları sonraki ayraçlarla
+        böler, aralarındaki küçük parçaları birleştirir. Son büyük parçadan
+        sonraki (henüz birleştirilmemiş) parçaların ilk indeksini döndürür.
+        """
+        # chunk_size'a sığmayan parçalar birleştirilmez, sonraki ayraçlarla bölünür
+        size, run_start = self.chunk_size, 0
+        for i in [i for i in range(count) if bounds[i + 1] - bounds[i] >= size]:
+            if i > run_start:
+                self._merge(text, bounds, run_start, i, spans)
+            if remaining:
+                self._split(text, bounds[i], bounds[i + 1], remaining, spans)
+            else:
+                spans.append((bounds[i], bounds[i + 1]))
+            run_start = i + 1
+        return run_start
+
+    def _resume(self, text: str, frames: List[_Frame], depth: int, end: Optional[int],
+                horizon: int, spans: List[Span]):
+        """
+        `frames[depth:]` çerçevelerini ilerletir. `end` çerçevenin bitişidir;
+        None ise henüz bilinmez ve `horizon`'dan öncesi kesinleşmiştir.
+        Bitişi bilinen çerçeveler tamamen bölünüp yığından çıkarılır.
+        """
+        frame = frames[depth]
+        if depth + 1 < len(frames):
+            # Çerçeve büyük bir parçanın içinde; parça kendi ayracının sonraki sınırında biter
+            boundary = self._next_boundary(text, frame, horizon if end is None else end)
+            if boundary is None:
+                self._resume(text, frames, depth + 1, end, horizon, spans)
+                if end is not None:
+                    del frames[depth:]
+                return
+            self._resume(text, frames, depth + 1, boundary, horizon, spans)
+            frame.pos = frame.scan = boundary
+
+        if end is not None:
+            self._split(text, frame.pos, end, self.separators[frame.level:], spans)
+            del frames[depth:]
+        else:
+            self._advance(text, frames, horizon, spans)
+
+    def _advance(self, text: str, frames: List[_Frame], horizon: int, spans: List[Span]):
+        """
+        Bitişi bilinmeyen en içteki çerçeveyi `horizon`'a kadar kesinleşen
+        sınırlarla böler. Son parçanın sonu bilinmez (en erken `horizon`):
+        şimdiden chunk_size'ı aştıysa alt çerçeveye geçilir, aşmadıysa
+        birleştirme sonucu değişmeyen chunk'larla sınırlı kalır.
+        """
+        frame = frames[-1]
+        if frame.level >= len(self.separators):
+            return
+        separator = self.separators[frame.level]
+        if separator == "":
+            found = range(frame.pos + 1, horizon)
+        else:
+            found = [boundary for boundary in self._boundaries(text, separator, frame.pos, len(text))
+                     if frame.pos < boundary < horizon]
+        bounds = [frame.pos, *found]
+        last = len(bounds) - 1
+        remaining = () if separator == "" else self.separators[frame.level + 1:]
+        run_start = self._split_pieces(text, bounds, last, remaining, spans)
+
+        if horizon - bounds[last] >= self.chunk_size:
+            if last > run_start:
+                self._merge(text, bounds, run_start, last, spans)
+            frame.pos = frame.scan = bounds[last]
+            frames.append(_Frame(len(self.separators) - len(remaining), bounds[last]))
+            self._advance(text, frames, horizon, spans)
+        else:
+            frame.pos = bounds[self._merge_stable(text, bounds, run_start, last, horizon, spans)]
+
+    def _merge_stable(self, text: str, bounds: Sequence[int], first: int, last: int,
+                      horizon: int, spans: List[Span]) -> int:
+        """
+        `_merge`'ün son parçanın sonu bilinmezken kesinleşen adımları;
+        sıradaki chunk'ın başladığı parçanın indeksini döndürür. Bir chunk,
+        chunk_size'a sığan bölgesi `horizon`'dan önce bitiyor ve son parçaya
+        uzanmıyorsa kesindir.
+        """
+        size, overlap = self.chunk_size, self.chunk_overlap
+        while bounds[first] + size < horizon:
+            stop = bisect_right(bounds, bounds[first] + size, first + 1, last + 1) - 1
+            if stop >= last:
+                break
+            self._emit(text, bounds[first], bounds[stop], spans)
+            first = max(bisect_left(bounds, bounds[stop] - overlap, first, stop),
+                        bisect_left(bounds, bounds[stop + 1] - size, first, stop))
+        return first
+
+    def _next_boundary(self, text: str, frame: _Frame, limit: int) -> Optional[int]:
+        """Bekleyen çerçevenin ayracının `limit`'ten önceki ilk sınırı (yoksa None)"""
+        separator = self.separators[frame.level]
+        if separator not in self._patterns:
+            found = [boundary for boundary in self._boundaries(text, separator, frame.pos, len(text))
+                     if boundary > frame.pos] if separator else [frame.pos + 1]
+            return found[0] if found and found[0] < limit else None
+
+        # Sabit ayraçlarda tarama kaldığı yerden sürer; tampon `scan`'den öncesini tutmaz
+        for match in self._patterns[separator].finditer(text, frame.scan):
+            if match.start() == frame.pos:
+                continue
+            if match.start() < limit:
+                return match.start()
+            frame.scan = match.start()
+            return None
+        frame.scan = max(frame.scan, len(text) - len(separator) + 1)
+        return None
+
+    def _merge(self, text: str, bounds: Sequence[int], first: int, last: int, spans: List[Span]):
+        """
+        bounds[first]..bounds[last] arasındaki ardışık parçaları `chunk_size`'ı
+        aşmayacak şekilde açgözlü birleştirir; her yeni chunk bir öncekinin son
+        `chunk_overlap` karakterine sığan parçalarıyla başlar.
+
+        Parçalar bitişik olduğundan chunk uzunluğu sınırların farkıdır; chunk
+        sonu ve sonraki chunk'ın başı ikili aramayla bulunur, parça başına
+        işlem yapılmaz.
+        """
+        size, overlap = self.chunk_size, self.chunk_overlap
+        while True:
+            # Başlangıçtan itibaren chunk_size'a sığan son sınır
+            stop = bisect_right(bounds, bounds[first] + size, first + 1, last + 1) - 1
+            if stop >= last:
+                self._emit(text, bounds[first], bounds[last], spans)
+                return
+            self._emit(text, bounds[first], bounds[stop], spans)
+            # Sonraki chunk: son `overlap` karaktere sığan ve sonraki parçayla
+            # chunk_size'ı aşmayan ilk parçadan başlar
+            first = max(bisect_left(bounds, bounds[stop] - overlap, first, stop),
+                        bisect_left(bounds, bounds[stop + 1] - size, first, stop))
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, spans: List[Span]):
+        """Baştaki ve sondaki boşlukları atarak chunk'ı ekler (boş chunk eklenmez)"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            spans.append((start, end))
@@ -3,74 +3,205 @@ vector_store.py
 ChromaDB vector database yönetimi
 """
 
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Tuple
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Optional, Tuple
+import numpy as np
 from tqdm import tqdm
 
+from src.metadata_filter import to_chroma_where
+
+
+logger = logging.getLogger(__name__)
+
+
+def content_chunk_ids(documents: List[str], seen: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Chunk metninin SHA-256 özetinden kararlı ID'ler üretir.
+    
+    Belgeye yeni bir paragraf eklenmesi sonraki chunk'ların ID'lerini
+    kaydırmaz. Aynı metne sahip chunk'lar tekrar sırasına göre
+    "-1", "-2" ekleriyle ayrıştırılır. Chunk'lar parça parça işleniyorsa
+    aynı `seen` sözlüğü her çağrıya verilerek tekrar sayımı sürdürülür.
+    """
+    ids = []
+    seen = {} if seen is None else seen
+    for document in documents:
+        digest = hashlib.sha256(document.encode("utf-8")).hexdigest()[:32]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        ids.append(digest if occurrence == 0 else f"{digest}-{occurrence}")
+    return ids
+
 
 class VectorStore:
     """ChromaDB vector database yönetimi"""
     
-    def __init__(self, collection_name: str = "istanbul_bolge_plani"):
+    def __init__(self, collection_name: str = "istanbul_bolge_plani",
+                 persist_directory: Optional[str] = None):
+        """
+        Args:
+            collection_name: Koleksiyon adı
+            persist_directory: Verilirse indeks bu klasörde diske kalıcı olarak yazılır,
+                verilmezse bellek içi (geçici) veritabanı kullanılır
+        """
         self.collection_name = collection_name
+        self.persist_directory = persist_directory
         
-        print(f"💾 ChromaDB başlatılıyor...")
+        # chromadb importu ağırdır; yalnızca Chroma backend'i seçildiğinde yapılır
+        import chromadb
+        from chromadb.config import Settings
         
-        self.client = chromadb.Client(Settings(
+        settings = Settings(
             anonymized_telemetry=False,
             allow_reset=True
-        ))
+        )
+        
+        if persist_directory:
+            self.client = chromadb.PersistentClient(path=persist_directory, settings=settings)
+            logger.info(f"📁 Kalıcı indeks klasörü: {persist_directory}")
+        else:
+            self.client = chromadb.Client(settings)
         
         try:
             self.collection = self.client.get_collection(name=collection_name)
-            print(f"✅ Mevcut koleksiyon yüklendi: {collection_name}")
+            logger.info(f"✅ Mevcut koleksiyon yüklendi: {collection_name}")
         except:
-            self.collection = self.client.create_collection(
-                name=collection_name,
-                metadata={"description": "RAG Vector Database"}
-            )
-            print(f"✅ Yeni koleksiyon oluşturuldu: {collection_name}")
+            self.collection = self._create_collection()
+            logger.info(f"✅ Yeni koleksiyon oluşturuldu: {collection_name}")
+    
+    def _create_collection(self):
+        return self.client.create_collection(
+            name=self.collection_name,
+            metadata={"description": "RAG Vector Database"}
+        )
+    
+    def reset(self):
+        """Koleksiyonu silip boş olarak yeniden oluşturur"""
+        try:
+            self.client.delete_collection(name=self.collection_name)
+        except Exception:
+            pass
+        self.collection = self._create_collection()
+        logger.info(f"🗑️ Koleksiyon sıfırlandı: {self.collection_name}")
+    
+    @contextmanager
+    def bulk_update(self) -> Iterator["VectorStore"]:
+        """NumpyVectorStore ile uyum için; ChromaDB her yazımı kendisi kalıcı hale getirir"""
+        yield self
     
     def add_documents(self, documents: List[str], embeddings: List[List[float]], 
-                     batch_size: int = 10, metadata: List[Dict] = None):
-        """Belgeleri veritabanına ekler"""
-        print(f"\n⬆️ {len(documents)} belge ekleniyor...")
+                     batch_size: int = 10, metadata: List[Dict] = None,
+                     ids: List[str] = None):
+        """
+        Belgeleri veritabanına ekler.
         
+        ID verilmezse chunk metninin hash'inden üretilir; aynı ID'ye sahip
+        kayıtlar üzerine yazılır (upsert).
+        """
         if metadata is None:
-            metadata = [{"source": f"chunk_{i}"} for i in range(len(documents))]
+            metadata = [{"source": f"chunk_{i}", "chunk_index": i} for i in range(len(documents))]
+        if ids is None:
+            ids = content_chunk_ids(documents)
         
         for i in tqdm(range(0, len(documents), batch_size), desc="Batch'ler ekleniyor"):
-            batch_docs = documents[i:i+batch_size]
-            batch_embeddings = embeddings[i:i+batch_size]
-            batch_metadata = metadata[i:i+batch_size]
-            batch_ids = [f"chunk_{j}" for j in range(i, i+len(batch_docs))]
-            
-            self.collection.add(
-                embeddings=batch_embeddings,
-                documents=batch_docs,
-                metadatas=batch_metadata,
-                ids=batch_ids
+            self.collection.upsert(
+                embeddings=embeddings[i:i+batch_size],
+                documents=documents[i:i+batch_size],
+                metadatas=metadata[i:i+batch_size],
+                ids=ids[i:i+batch_size]
             )
         
-        print(f"✅ Toplam {len(documents)} belge eklendi!")
+        logger.info(f"⬆️ {len(documents)} belge eklendi")
     
-    def query(self, query_embedding: List[float], n_results: int = 5) -> Tuple[List[str], List[str], List[float]]:
-        """Query embedding'e en yakın belgeleri getirir"""
+    def update_metadata(self, ids: List[str], metadata: List[Dict], batch_size: int = 500):
+        """Embedding'e dokunmadan kayıtların metadata'sını günceller"""
+        for i in range(0, len(ids), batch_size):
+            self.collection.update(ids=ids[i:i+batch_size], metadatas=metadata[i:i+batch_size])
+    
+    def delete(self, ids: List[str], batch_size: int = 500):
+        """Verilen ID'lere sahip kayıtları siler"""
+        for i in range(0, len(ids), batch_size):
+            self.collection.delete(ids=ids[i:i+batch_size])
+        if ids:
+            logger.info(f"🗑️ {len(ids)} belge silindi")
+    
+    def get_ids(self) -> List[str]:
+        """Koleksiyondaki tüm kayıtların ID'leri"""
+        return self.collection.get(include=[])["ids"]
+    
+    def query(self, query_embedding: List[float], n_results: int = 5,
+              filters: Optional[Dict] = None) -> Tuple[List[str], List[str], List[float]]:
+        """
+        Query embedding'e en yakın belgeleri getirir.
+        
+        `filters` (bkz. `metadata_filter.normalize_filters`) verilirse yalnızca
+        uyan chunk'lar arasında arama yapılır.
+        """
+        return self.query_batch([query_embedding], n_results, filters)[0]
+    
+    def query_batch(self, query_embeddings: List[List[float]], n_results: int = 5,
+                    filters: Optional[Dict] = None) -> List[Tuple[List[str], List[str], List[float]]]:
+        """Birden fazla query embedding'i için tek sorguda en yakın belgeleri getirir"""
         results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=to_chroma_where(filters)
         )
         
-        documents = results['documents'][0]
-        ids = results['ids'][0]
-        distances = results['distances'][0] if 'distances' in results else []
-        
-        return documents, ids, distances
+        distances = results['distances'] if results.get('distances') else [[] for _ in query_embeddings]
+        return list(zip(results['documents'], results['ids'], distances))
+    
+    def count(self) -> int:
+        """Koleksiyondaki belge sayısı"""
+        return self.collection.count()
+    
+    def get_items(self) -> Tuple[List[str], List[str], List[Dict]]:
+        """Koleksiyondaki tüm kayıtların ID'leri, belgeleri ve metadata'ları, chunk sırasına göre"""
+        results = self.collection.get(include=["documents", "metadatas"])
+        metadatas = [item or {} for item in results["metadatas"] or [{}] * len(results["ids"])]
+        ordered = sorted(zip(results["ids"], results["documents"], metadatas),
+                         key=lambda item: item[2].get("chunk_index", 0))
+        return ([item[0] for item in ordered], [item[1] for item in ordered],
+                [item[2] for item in ordered])
+    
+    def get_records(self) -> Tuple[List[str], List[Dict]]:
+        """Koleksiyondaki tüm kayıtların ID'leri ve metadata'ları, chunk sırasına göre (belgeler okunmaz)"""
+        results = self.collection.get(include=["metadatas"])
+        metadatas = [item or {} for item in results["metadatas"] or [{}] * len(results["ids"])]
+        ordered = sorted(zip(results["ids"], metadatas), key=lambda item: item[1].get("chunk_index", 0))
+        return [item[0] for item in ordered], [item[1] for item in ordered]
+    
+    def iter_documents(self, ids: List[str], batch_size: int = 500) -> Iterator[str]:
+        """Verilen ID'lerin belgelerini aynı sırayla, `batch_size`'lık gruplar halinde okuyarak üretir"""
+        for i in range(0, len(ids), batch_size):
+            yield from self.get_by_ids(ids[i:i + batch_size])
+    
+    def get_documents(self) -> List[str]:
+        """Koleksiyondaki tüm belgeleri chunk sırasına göre döndürür"""
+        return self.get_items()[1]
+    
+    def get_by_ids(self, ids: List[str]) -> List[Optional[str]]:
+        """Verilen ID'lerin belgelerini aynı sırayla döndürür (bulunamayanlar None)"""
+        if not ids:
+            return []
+        results = self.collection.get(ids=list(ids), include=["documents"])
+        found = dict(zip(results["ids"], results["documents"]))
+        return [found.get(chunk_id) for chunk_id in ids]
+    
+    def get_embeddings(self, ids: List[str]) -> np.ndarray:
+        """Verilen ID'lerin embedding'leri, aynı sırayla float32 matris olarak"""
+        if not ids:
+            return np.zeros((0, 0), dtype=np.float32)
+        results = self.collection.get(ids=list(ids), include=["embeddings"])
+        found = dict(zip(results["ids"], results["embeddings"]))
+        return np.asarray([found[chunk_id] for chunk_id in ids], dtype=np.float32)
     
     def get_stats(self) -> Dict:
         """Veritabanı istatistiklerini döndürür"""
         return {
             "collection_name": self.collection_name,
-            "total_documents": self.collection.count()
+            "total_documents": self.collection.count(),
+            "persist_directory": self.persist_directory
         }
\ No newline at end of file
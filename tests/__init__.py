@@ -0,0 +1,2 @@
+# tests/__init__.py
+"""AKBANK RAG Chatbot testleri"""
@@ -0,0 +1,72 @@
+"""
+test_chunk_store.py
+ChunkStore sıkıştırması: silinen ve değişen satırların baytlarının geri kazanılması
+"""
+
+import random
+
+import pytest
+
+from src.chunk_store import ChunkStore
+
+
+def overlapping_chunks(rng: random.Random):
+    """Kaynak metinden örtüşen chunk'lar ve karakter başlangıçları"""
+    text = "".join(rng.choice("abc çğü\n.") for _ in range(rng.randint(1, 3000)))
+    texts, starts, position = [], [], 0
+    while position < len(text):
+        length = rng.randint(1, 120)
+        start = max(0, position - rng.randint(0, length - 1))
+        texts.append(text[start:start + length])
+        starts.append(start)
+        position = start + length
+    return texts, starts
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_compact_keeps_rows_and_reclaims_dead_bytes(seed, tmp_path):
+    rng = random.Random(seed)
+    texts, starts = overlapping_chunks(rng)
+    path = str(tmp_path / "chunks") if seed % 2 else None
+    store = ChunkStore.from_texts(texts, starts, path=path)
+
+    for _ in range(3):
+        rows = rng.sample(range(len(store)), min(3, len(store)))
+        store.extend(["yeni"] * rng.randint(0, 2), replace={row: f"değişti {row}" for row in rows})
+        length = rng.randint(len(store) // 2, len(store))
+        # Sondaki satırlar silinir
+        store.move_rows([], [], length)
+    expected = list(store)
+    size = len(store.buffer)
+    dead = store.dead_bytes()
+
+    assert store.compact(max_dead_ratio=0.0) == (dead > 0)
+    assert list(store) == expected
+    assert store.dead_bytes() == 0
+    assert len(store.buffer) == size - dead
+    if path:
+        store.flush()
+        assert list(ChunkStore.open(path)) == expected
+
+    store.extend(["son"])
+    assert list(store) == expected + ["son"]
+
+
+def test_compact_preserves_shared_overlap():
+    texts, starts = overlapping_chunks(random.Random(7))
+    store = ChunkStore.from_texts(texts, starts)
+    shared_size = len(store.buffer)
+
+    store.move_rows([], [], len(store) - 1)
+    store.compact(max_dead_ratio=0.0)
+    assert list(store) == texts[:-1]
+    assert len(store.buffer) <= shared_size
+
+
+def test_compact_waits_for_threshold():
+    store = ChunkStore.from_texts(["a" * 100, "b" * 100])
+    store.move_rows([], [], 1)
+    assert not store.compact(max_dead_ratio=0.5)
+    assert len(store.buffer) == 200
+    assert store.compact(max_dead_ratio=0.4)
+    assert store.buffer == b"a" * 100
@@ -0,0 +1,91 @@
+"""
+test_data_processor.py
+Akışlı (`iter_chunks`) ve toplu (`split_pages`) chunk'lamanın eşdeğerliği
+"""
+
+import random
+
+import pytest
+
+from src.data_processor import PDFProcessor
+from src.text_chunker import DEFAULT_SEPARATORS, LANGCHAIN_SEPARATORS, TextChunker
+
+
+WORDS = ("İstanbul bölge planı ulaşım Metro hattı çevre politikaları Dr. vb. 3. A. "
+         "Kentsel dönüşüm Ekonomik kalkınma yeşil alan").split()
+
+
+def random_page(rng: random.Random) -> str:
+    """Paragraf, satır, cümle, uzun kelime ve boşluk düzenlerini karıştıran sayfa"""
+    parts = []
+    for _ in range(rng.randint(0, 300)):
+        roll = rng.random()
+        if roll < 0.6:
+            parts.append(rng.choice(WORDS))
+        elif roll < 0.7:
+            parts.append(rng.choice([". ", "! ", "? ", ".\n", "… "]))
+        elif roll < 0.8:
+            parts.append("\n")
+        elif roll < 0.87:
+            parts.append("\n" * rng.randint(2, 4))
+        elif roll < 0.93:
+            parts.append("x" * rng.randint(1, 400))
+        else:
+            parts.append(" " * rng.randint(1, 5))
+        parts.append(" " if rng.random() < 0.7 else "")
+    return "".join(parts)
+
+
+def realistic_page(rng: random.Random) -> str:
+    """Satırları sayfa genişliğinde kırılmış, ara sıra boş satırlı sayfa"""
+    lines = []
+    for _ in range(rng.randint(5, 50)):
+        if rng.random() < 0.05:
+            lines.append("")
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 14)))
+        lines.append(line + rng.choice([".", "", ",", ":"]))
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_iter_chunks_matches_split_pages(seed):
+    rng = random.Random(seed)
+    chunk_size = rng.choice([50, 120, 400, 1000])
+    processor = PDFProcessor(chunk_size=chunk_size, chunk_overlap=rng.randint(0, chunk_size // 2),
+                             separators=rng.choice([DEFAULT_SEPARATORS, LANGCHAIN_SEPARATORS]))
+    make_page = random_page if seed % 2 else realistic_page
+    pages = [make_page(rng) if rng.random() > 0.1 else "" for _ in range(rng.randint(0, 80))]
+
+    chunks, metadatas = processor.split_pages(pages, document_id="plan")
+    assert list(processor.iter_chunks(pages, document_id="plan")) == list(zip(chunks, metadatas))
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_iter_spans_matches_split_offsets(seed):
+    rng = random.Random(seed)
+    chunk_size = rng.choice([10, 40, 200])
+    overlap = chunk_size if seed % 10 == 0 else rng.randint(0, chunk_size // 2)
+    separators = rng.choice([DEFAULT_SEPARATORS, LANGCHAIN_SEPARATORS, ("\n\n", "\n", " "), (". ", "\n")])
+    chunker = TextChunker(chunk_size, overlap, separators)
+    parts = [random_page(rng) for _ in range(rng.randint(0, 20))]
+    text = "".join(parts)
+
+    spans = list(chunker.iter_spans(parts, flush_chars=rng.choice([1, chunk_size, None])))
+    assert [(start, end) for start, end, _ in spans] == chunker.split_offsets(text)
+    assert all(chunk == text[start:end] for start, end, chunk in spans)
+
+
+def test_iter_chunks_streams_with_bounded_buffer():
+    rng = random.Random(0)
+    pages = [realistic_page(rng) for _ in range(300)]
+    consumed = []
+
+    def page_stream():
+        for page in pages:
+            consumed.append(page)
+            yield page
+
+    processor = PDFProcessor()
+    first = next(processor.iter_chunks(page_stream()))
+    assert len(consumed) < len(pages) // 10
+    assert first == next(processor.iter_chunks(pages))
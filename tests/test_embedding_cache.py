@@ -0,0 +1,48 @@
+"""
+test_embedding_cache.py
+Embedding önbelleği: yazmayan okumalar, LRU silme ve kayıt sayısı
+"""
+
+from src.embedding_cache import EmbeddingCache
+
+
+def vectors(n: int, value: float = 1.0):
+    return [[value] * 4 for _ in range(n)]
+
+
+def test_hits_do_not_write(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many("model", ["a", "b"], vectors(2))
+    changes = cache._conn.total_changes
+
+    for _ in range(10):
+        assert cache.get_many("model", ["a", "b", "c"])[:2] == vectors(2)
+    assert cache._conn.total_changes == changes
+    assert (cache.hits, cache.misses) == (20, 10)
+
+    cache.flush()
+    assert cache._conn.total_changes == changes + 2
+
+
+def test_eviction_uses_buffered_last_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    for i in range(10):
+        cache.put_many("model", [f"eski {i}"], vectors(1))
+    cache.get_many("model", ["eski 0", "eski 1"])
+
+    cache.put_many("model", [f"yeni {i}" for i in range(5)], vectors(5))
+    kept = cache.get_many("model", [f"eski {i}" for i in range(10)])
+    assert [vector is not None for vector in kept] == [True, True] + [False] * 5 + [True] * 3
+
+
+def test_entry_count_tracks_inserts_replacements_and_evictions(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path, max_entries=50)
+    cache.put_many("model", [f"metin {i}" for i in range(40)], vectors(40))
+    cache.put_many("model", [f"metin {i}" for i in range(30, 60)] + ["metin 59"], vectors(31, 2.0))
+
+    assert cache.get_stats()["entries"] == cache._count() == 50
+    assert EmbeddingCache(path).get_stats()["entries"] == 50
+
+    cache.clear()
+    assert cache.get_stats()["entries"] == 0
@@ -0,0 +1,129 @@
+"""
+test_ivf_vector_store.py
+IVF araması: tam nprobe'da brute-force ile eşitlik, recall ve ekleme/silme
+sonrası ters listelerin tutarlılığı
+"""
+
+import numpy as np
+import pytest
+
+from src.ivf_vector_store import IVFVectorStore
+from src.numpy_vector_store import NumpyVectorStore
+
+
+DIMENSION = 16
+
+
+def clustered_vectors(rng: np.random.Generator, n: int, n_clusters: int = 12) -> np.ndarray:
+    centers = rng.normal(size=(n_clusters, DIMENSION)) * 4
+    return (centers[rng.integers(n_clusters, size=n)]
+            + rng.normal(size=(n, DIMENSION))).astype(np.float32)
+
+
+def add(store, vectors: np.ndarray, ids):
+    store.add_documents([f"metin {chunk_id}" for chunk_id in ids], vectors.tolist(),
+                        metadata=[{"chunk_index": i} for i in range(len(ids))], ids=list(ids))
+
+
+def make_stores(rng, n: int, quantization: str = "float32", **options):
+    vectors = clustered_vectors(rng, n)
+    ids = [f"c{i}" for i in range(n)]
+    ivf = IVFVectorStore(quantization=quantization, n_lists=16, min_train_size=64, **options)
+    flat = NumpyVectorStore(quantization=quantization)
+    for store in (ivf, flat):
+        add(store, vectors, ids)
+    return ivf, flat
+
+
+def check_lists(store: IVFVectorStore):
+    """Her satır tam olarak bir listede, atandığı listede ve kaydedilen yerinde bulunur"""
+    rows = np.concatenate([store._lists[i][:size] for i, size in enumerate(store._list_sizes)])
+    assert sorted(rows.tolist()) == list(range(store.count()))
+    for list_id, size in enumerate(store._list_sizes):
+        members = store._lists[list_id][:size]
+        assert (store._row_list[members] == list_id).all()
+        assert (store._row_slot[members] == np.arange(size)).all()
+    assert (store._row_list[:store.count()] == store._assign(np.arange(store.count()))).all()
+
+
+def assert_same_results(ivf: IVFVectorStore, flat: NumpyVectorStore, queries: np.ndarray, k: int):
+    for (_, ivf_ids, ivf_distances), (_, flat_ids, flat_distances) in zip(
+            ivf.query_batch(queries.tolist(), k, nprobe=len(ivf._centroids)),
+            flat.query_batch(queries.tolist(), k)):
+        assert ivf_ids == flat_ids
+        assert np.allclose(ivf_distances, flat_distances, rtol=1e-4, atol=1e-3)
+
+
+@pytest.mark.parametrize("quantization", ["float32", "float16", "int8"])
+def test_full_nprobe_matches_brute_force(quantization):
+    rng = np.random.default_rng(0)
+    ivf, flat = make_stores(rng, 600, quantization)
+    assert ivf.is_trained
+
+    assert_same_results(ivf, flat, clustered_vectors(rng, 40), k=10)
+
+
+def test_recall_grows_with_nprobe():
+    rng = np.random.default_rng(1)
+    ivf, flat = make_stores(rng, 2000)
+    queries = clustered_vectors(rng, 50).tolist()
+    exact = [set(ids) for _, ids, _ in flat.query_batch(queries, 10)]
+
+    recalls = []
+    for nprobe in (1, 4, 16):
+        found = ivf.query_batch(queries, 10, nprobe=nprobe)
+        recalls.append(np.mean([len(truth & set(ids)) / 10 for truth, (_, ids, _) in zip(exact, found)]))
+    assert recalls == sorted(recalls)
+    assert recalls[1] >= 0.8
+    assert recalls[2] == 1.0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_inserts_and_deletes_keep_lists_consistent(seed, tmp_path):
+    rng = np.random.default_rng(seed)
+    ivf, flat = make_stores(rng, 300, persist_directory=str(tmp_path), retrain_factor=100.0)
+    next_id = 300
+
+    for _ in range(12):
+        action = rng.integers(3)
+        if action == 0:
+            n = int(rng.integers(1, 40))
+            ids = [f"c{next_id + i}" for i in range(n)]
+            next_id += n
+            vectors = clustered_vectors(rng, n)
+        elif action == 1:
+            # Mevcut ID'lerin embedding'i değişir (upsert)
+            ids = list(rng.choice(ivf.get_ids(), size=int(rng.integers(1, 20)), replace=False))
+            vectors = clustered_vectors(rng, len(ids))
+        else:
+            ids = list(rng.choice(ivf.get_ids(), size=int(rng.integers(1, 60)), replace=False))
+            for store in (ivf, flat):
+                store.delete(ids)
+            vectors = None
+        if vectors is not None:
+            for store in (ivf, flat):
+                add(store, vectors, ids)
+
+        assert ivf.get_ids() == flat.get_ids()
+        check_lists(ivf)
+        assert_same_results(ivf, flat, clustered_vectors(rng, 10), k=8)
+
+    reloaded = IVFVectorStore(persist_directory=str(tmp_path), n_lists=16, min_train_size=64,
+                              retrain_factor=100.0)
+    check_lists(reloaded)
+    assert [sorted(members[:size].tolist()) for members, size in zip(reloaded._lists, reloaded._list_sizes)] \
+        == [sorted(members[:size].tolist()) for members, size in zip(ivf._lists, ivf._list_sizes)]
+
+
+def test_small_collection_is_searched_exactly():
+    rng = np.random.default_rng(2)
+    ivf = IVFVectorStore(n_lists=16, min_train_size=1000)
+    flat = NumpyVectorStore()
+    vectors = clustered_vectors(rng, 100)
+    for store in (ivf, flat):
+        add(store, vectors, [f"c{i}" for i in range(100)])
+
+    assert not ivf.is_trained
+    queries = clustered_vectors(rng, 5).tolist()
+    assert [ids for _, ids, _ in ivf.query_batch(queries, 5)] == \
+        [ids for _, ids, _ in flat.query_batch(queries, 5)]
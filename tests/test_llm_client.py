@@ -0,0 +1,239 @@
+"""
+test_llm_client.py
+LLM çağrı katmanı: backend süre sınırları, yeniden deneme, aynı prompt'ların
+birleştirilmesi ve token bucket hız sınırı
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import src.llm_client
+from src.llm_client import LLMBackend, LLMClient, LLMError, LLMTimeoutError, ModelBackend, TokenBucket
+
+
+class StubClient:
+    """`genai.GenerativeModel._client` yerine; isteği ağa göndermeden cevaplar"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = []
+
+    def generate_content(self, request):
+        from google.ai import generativelanguage as glm
+
+        self.requests.append(request)
+        time.sleep(self.delay)
+        text = "cevap: " + request.contents[0].parts[0].text
+        return glm.GenerateContentResponse(candidates=[
+            glm.Candidate(content=glm.Content(parts=[glm.Part(text=text)]))])
+
+
+class StubStreamModel:
+    """google-generativeai 0.3.x imzasıyla akışlı cevap veren model"""
+
+    def __init__(self, parts, part_delay: float = 0.0):
+        self.parts = parts
+        self.part_delay = part_delay
+
+    async def generate_content_async(self, contents, *, generation_config=None,
+                                     safety_settings=None, stream=False, **kwargs):
+        if kwargs:
+            raise ValueError(f"Unknown field for GenerateContentRequest: {', '.join(kwargs)}")
+
+        async def chunks():
+            for part in self.parts:
+                await asyncio.sleep(self.part_delay)
+                yield type("Chunk", (), {"text": part})()
+
+        return chunks()
+
+
+def gemini_model(delay: float = 0.0):
+    genai = pytest.importorskip("google.generativeai")
+    model = genai.GenerativeModel("gemini-1.5-flash")
+    model._client = StubClient(delay)
+    return model
+
+
+async def collect(stream):
+    return [delta async for delta in stream]
+
+
+def test_gemini_generate_with_timeout_uses_supported_arguments():
+    model = gemini_model()
+    client = LLMClient(ModelBackend(model), max_retries=0)
+
+    assert client.generate("merhaba", timeout=5) == "cevap: merhaba"
+    assert len(model._client.requests) == 1
+
+
+def test_gemini_generate_timeout_is_enforced_and_retryable():
+    backend = ModelBackend(gemini_model(delay=0.5))
+
+    started_at = time.monotonic()
+    with pytest.raises(TimeoutError) as error:
+        backend.generate("yavaş", timeout=0.05)
+    assert time.monotonic() - started_at < 0.4
+    assert backend.is_retryable(error.value)
+
+    client = LLMClient(backend, max_retries=3, base_delay=0.01, seed=0)
+    with pytest.raises(LLMTimeoutError):
+        client.generate("yavaş", timeout=0.2)
+
+
+def test_stream_with_timeout_uses_supported_arguments():
+    backend = ModelBackend(StubStreamModel(["a", "", "b"]))
+    assert asyncio.run(collect(backend.stream("soru", timeout=5))) == ["a", "b"]
+    assert asyncio.run(collect(backend.stream("soru"))) == ["a", "b"]
+
+
+def test_stream_timeout_covers_slow_parts():
+    backend = ModelBackend(StubStreamModel(["a", "b", "c"], part_delay=0.1))
+    client = LLMClient(backend, max_retries=0)
+
+    with pytest.raises(LLMError):
+        asyncio.run(collect(client.stream("soru", timeout=0.15)))
+
+
+def test_generate_without_timeout_runs_in_caller_thread():
+    seen = []
+
+    class Model:
+        def generate_content(self, contents, *, generation_config=None, safety_settings=None,
+                             stream=False, **kwargs):
+            assert not kwargs
+            seen.append(threading.current_thread())
+            return type("Response", (), {"text": contents})()
+
+    assert ModelBackend(Model()).generate("x") == "x"
+    assert seen == [threading.current_thread()]
+
+
+class ScriptedBackend(LLMBackend):
+    """Sıradaki hatayı yükselten, hatalar bitince prompt'u cevap olarak dönen backend"""
+
+    name = "scripted"
+
+    def __init__(self, errors=(), release: threading.Event = None):
+        self.errors = list(errors)
+        self.release = release
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout=None):
+        with self._lock:
+            self.calls += 1
+            error = self.errors.pop(0) if self.errors else None
+        if self.release is not None:
+            self.release.wait(5)
+        if error is not None:
+            raise error
+        return f"cevap: {prompt}"
+
+    def is_retryable(self, error):
+        return isinstance(error, ConnectionError)
+
+
+class FakeClock:
+    """`time` modülü yerine; `sleep` beklemeden saati ilerletir"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def fast_client(backend, **options):
+    return LLMClient(backend, requests_per_second=None, base_delay=0.001, max_delay=0.01,
+                     seed=0, **options)
+
+
+def test_retryable_errors_are_retried():
+    backend = ScriptedBackend([ConnectionError("ağ"), ConnectionError("ağ")])
+    client = fast_client(backend, max_retries=3)
+
+    assert client.generate("soru") == "cevap: soru"
+    assert backend.calls == 3
+    stats = client.get_stats()
+    assert (stats["calls"], stats["errors"], stats["retries"]) == (3, 2, 2)
+
+
+def test_non_retryable_error_is_raised_without_retry():
+    backend = ScriptedBackend([ValueError("geçersiz istek")])
+    client = fast_client(backend, max_retries=3)
+
+    with pytest.raises(LLMError, match="geçersiz istek"):
+        client.generate("soru")
+    assert backend.calls == 1
+    assert client.get_stats()["retries"] == 0
+
+
+def test_retries_stop_at_max_retries():
+    backend = ScriptedBackend([ConnectionError("ağ")] * 5)
+    client = fast_client(backend, max_retries=2)
+
+    with pytest.raises(LLMError, match="3 deneme"):
+        client.generate("soru")
+    assert backend.calls == 3
+
+
+def test_identical_inflight_prompts_share_one_call():
+    release = threading.Event()
+    backend = ScriptedBackend(release=release)
+    client = fast_client(backend)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(client.generate("aynı soru")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while client.get_stats()["coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["cevap: aynı soru"] * 8
+    assert backend.calls == 1
+    assert client.get_stats()["coalesced"] == 7
+    # Çağrı bitince aynı prompt yeniden backend'e gider
+    assert client.generate("aynı soru") == "cevap: aynı soru"
+    assert backend.calls == 2
+
+
+def test_token_bucket_reserves_in_order(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(src.llm_client, "time", clock)
+    bucket = TokenBucket(rate=2.0, capacity=2)
+
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    # Token 1.5 sn sonra dolacağından 1 sn beklemeye razı olan çağrıya ayrılmaz
+    assert bucket.reserve(max_wait=1.0) is None
+    clock.now += 1.5
+    assert bucket.reserve(max_wait=1.0) == 0.0
+
+
+def test_client_throttles_to_requests_per_second(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(src.llm_client, "time", clock)
+    backend = ScriptedBackend()
+    client = LLMClient(backend, requests_per_second=4.0, burst=1)
+
+    started_at = clock.now
+    for i in range(9):
+        client.generate(f"soru {i}")
+    assert backend.calls == 9
+    assert clock.now - started_at == pytest.approx(2.0)
+
+    with pytest.raises(LLMTimeoutError):
+        client.generate("acele", timeout=0.1)